@@ -6,6 +6,8 @@ from flask_pymongo import PyMongo
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from dotenv import load_dotenv
+from .observabilidade import logs, metricas, consultas_lentas, operacoes_db
+from . import cache
 
 # Carrega variáveis do .env logo no início
 load_dotenv()
@@ -15,17 +17,90 @@ jwt = JWTManager()
 timezone = None  # será configurado dentro de criar_app
 
 
+def conectar_mongo(app):
+    """
+    Cria o MongoClient com os ouvintes de observabilidade e o pool configurado.
+    O cliente não é seguro entre forks: com o app pré-carregado (gunicorn preload_app),
+    cada worker chama esta função de novo após o fork (ver gunicorn.conf.py).
+    """
+    ouvintes = metricas.ouvintes_mongo()
+    if app.config["SLOW_QUERY_MS"] > 0:
+        ouvintes.append(consultas_lentas.OuvinteConsultasLentas(
+            app.config["SLOW_QUERY_MS"], explain=app.config["SLOW_QUERY_EXPLAIN"], obter_cliente=lambda: mongo.cx
+        ))
+    if app.config["DB_OPS_TRACKING"]:
+        ouvintes.append(operacoes_db.OuvinteOperacoes())
+    if app.config["CACHE_RESULTADOS"]:
+        from .cache import resultados
+        ouvintes.append(resultados.OuvinteEscritas())
+    mongo.init_app(
+        app,
+        event_listeners=ouvintes,
+        maxPoolSize=app.config["MONGO_MAX_POOL_SIZE"],
+        minPoolSize=app.config["MONGO_MIN_POOL_SIZE"],
+        waitQueueTimeoutMS=app.config["MONGO_WAIT_QUEUE_TIMEOUT_MS"] or None,
+        serverSelectionTimeoutMS=app.config["MONGO_SERVER_SELECTION_TIMEOUT_MS"],
+    )
+
+
 def criar_app():
     app = Flask(__name__)
+    logs.configurar(app)
 
     # Configurações do app a partir do .env
     app.config["MONGO_URI"] = os.getenv("MONGO_URI")
     # Tenta pegar JWT_SECRET_KEY primeiro, senão usa SECRET_KEY
     app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY") or os.getenv("SECRET_KEY")
     app.config["TIMEZONE"] = os.getenv("TIMEZONE", "America/Sao_Paulo")
+    # Formato de armazenamento das presenças: 'documentos', 'embutido' ou 'duplo' (migração)
+    app.config["PRESENCA_STORAGE"] = os.getenv("PRESENCA_STORAGE", "documentos")
+    # Comandos do MongoDB acima deste tempo (ms) são registrados como lentos (0 desativa)
+    app.config["SLOW_QUERY_MS"] = int(os.getenv("SLOW_QUERY_MS", "200"))
+    # Reexecuta as consultas lentas com explain("executionStats") e guarda o plano em `consultas_lentas`
+    app.config["SLOW_QUERY_EXPLAIN"] = os.getenv("SLOW_QUERY_EXPLAIN", "false").lower() in ("1", "true", "sim")
+    # Conta as operações do MongoDB por requisição (cabeçalho X-Db-Ops). Apenas para dev/testes.
+    app.config["DB_OPS_TRACKING"] = os.getenv("DB_OPS_TRACKING", "false").lower() in ("1", "true", "sim")
+    # Perfilamento (cProfile): 1 a cada N requisições de cada endpoint (0 = só sob demanda, via X-Profile)
+    app.config["PROFILE_SAMPLE_N"] = int(os.getenv("PROFILE_SAMPLE_N", "0"))
+    app.config["PROFILE_DIR"] = os.getenv("PROFILE_DIR") or os.path.join(app.instance_path, "perfis")
+    app.config["PROFILE_MAX_ARQUIVOS"] = int(os.getenv("PROFILE_MAX_ARQUIVOS", "200"))
+    # Token do coletor de métricas (Authorization: Bearer ...); sem ele, /api/metrics exige um admin
+    app.config["METRICS_TOKEN"] = os.getenv("METRICS_TOKEN")
+    # Pré-carrega as bibliotecas de exportação (PDF/XLSX) em segundo plano, após a primeira requisição
+    app.config["EXPORT_WARMUP"] = os.getenv("EXPORT_WARMUP", "false").lower() in ("1", "true", "sim")
+    # Intervalo do ping de fundo que alimenta /api/health/ready
+    app.config["HEALTH_PING_INTERVALO_S"] = float(os.getenv("HEALTH_PING_INTERVALO_S", "5"))
+    # Cache de esportes/categorias: intervalo de verificação da versão e uso de change stream (replica set)
+    app.config["REFERENCIA_VERIFICACAO_S"] = float(os.getenv("REFERENCIA_VERIFICACAO_S", "2"))
+    app.config["REFERENCIA_CHANGE_STREAM"] = os.getenv("REFERENCIA_CHANGE_STREAM", "true").lower() in ("1", "true", "sim")
+    # Pool de conexões do MongoDB, por processo (os padrões são os do PyMongo; 0 = sem limite de espera)
+    app.config["MONGO_MAX_POOL_SIZE"] = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+    app.config["MONGO_MIN_POOL_SIZE"] = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    app.config["MONGO_WAIT_QUEUE_TIMEOUT_MS"] = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "0"))
+    app.config["MONGO_SERVER_SELECTION_TIMEOUT_MS"] = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "30000"))
+    # Cache dos serviços: 'memoria' (por processo) ou 'sqlite' (compartilhado pelos workers da máquina)
+    app.config["CACHE_BACKEND"] = os.getenv("CACHE_BACKEND", "memoria")
+    app.config["CACHE_SQLITE_PATH"] = os.getenv("CACHE_SQLITE_PATH") or os.path.join(app.instance_path, "cache.sqlite3")
+    app.config["CACHE_MAX_ITENS"] = int(os.getenv("CACHE_MAX_ITENS", "10000"))
+    app.config["CACHE_TTL_S"] = float(os.getenv("CACHE_TTL_S", "300"))
+    app.config["CACHE_MAX_MB"] = float(os.getenv("CACHE_MAX_MB", "64"))
+    # Resultados de leituras com @em_cache, invalidados pelas escritas nas coleções de que dependem.
+    # Ligado por padrão só com o backend sqlite: com 'memoria', cada worker só vê as próprias escritas
+    padrao_resultados = "true" if app.config["CACHE_BACKEND"] == "sqlite" else "false"
+    app.config["CACHE_RESULTADOS"] = os.getenv("CACHE_RESULTADOS", padrao_resultados).lower() in ("1", "true", "sim")
+    app.config["CACHE_RESULTADOS_TTL_S"] = float(os.getenv("CACHE_RESULTADOS_TTL_S", "30"))
+    # /api/sync: documentos por coleção em cada resposta, atraso do token e período de aulas/presenças
+    app.config["SYNC_LIMITE"] = int(os.getenv("SYNC_LIMITE", "500"))
+    app.config["SYNC_JANELA_S"] = int(os.getenv("SYNC_JANELA_S", "5"))
+    app.config["SYNC_DIAS_AULAS"] = int(os.getenv("SYNC_DIAS_AULAS", "60"))
+    # /api/batch: sub-requisições por lote e threads do pool usado com "paralelo": true (0 = sempre em série)
+    app.config["BATCH_MAX_REQUISICOES"] = int(os.getenv("BATCH_MAX_REQUISICOES", "20"))
+    app.config["BATCH_THREADS"] = int(os.getenv("BATCH_THREADS", "4"))
 
     if not app.config["MONGO_URI"] or not app.config["JWT_SECRET_KEY"]:
         raise ValueError("MONGO_URI e JWT_SECRET_KEY (ou SECRET_KEY) devem ser definidos no arquivo .env")
+    if app.config["PRESENCA_STORAGE"] not in ("documentos", "embutido", "duplo"):
+        raise ValueError("PRESENCA_STORAGE deve ser 'documentos', 'embutido' ou 'duplo'.")
 
     # Configuração do CORS
     origins = [
@@ -37,12 +112,17 @@ def criar_app():
         resources={r"/api/*": {"origins": origins}},
         supports_credentials=True,
         methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        allow_headers=["Content-Type", "Authorization"]
+        allow_headers=["Content-Type", "Authorization", "X-Profile", "X-Request-Id"],
+        expose_headers=["X-Profile-Id", "X-Request-Id"]
     )
 
     # Inicializa extensões
-    mongo.init_app(app)
+    conectar_mongo(app)
+    cache.configurar(app)
     jwt.init_app(app)
+    metricas.init_app(app)
+    if app.config["DB_OPS_TRACKING"]:
+        operacoes_db.init_app(app)
 
     # Configura timezone global
     global timezone
@@ -55,7 +135,7 @@ def criar_app():
             response = make_response("", 200)
             response.headers["Access-Control-Allow-Origin"] = request.headers.get("Origin", "*")
             response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
-            response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
+            response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, X-Profile, X-Request-Id"
             response.headers["Access-Control-Allow-Credentials"] = "true"
             return response
 
@@ -70,6 +150,12 @@ def criar_app():
         from .routes.dashboard_routes import dashboard_bp
         from .routes.categoria_routes import categoria_bp
         from .routes.presenca_routes import presenca_bp
+        from .routes.frequencia_routes import frequencia_bp
+        from .routes.diagnostico_routes import diagnostico_bp
+        from .routes.sync_routes import sync_bp
+        from .routes.professor_routes import professor_bp
+        from .routes.batch_routes import batch_bp
+        from .routes.busca_routes import busca_bp
 
         app.register_blueprint(health_check_bp, url_prefix="/api")
         app.register_blueprint(auth_bp, url_prefix="/api/auth")
@@ -80,5 +166,87 @@ def criar_app():
         app.register_blueprint(dashboard_bp, url_prefix="/api/dashboard")
         app.register_blueprint(categoria_bp, url_prefix="/api/categorias")
         app.register_blueprint(presenca_bp, url_prefix="/api/presencas")
+        app.register_blueprint(frequencia_bp, url_prefix="/api/frequencia")
+        app.register_blueprint(diagnostico_bp, url_prefix="/api")
+        app.register_blueprint(sync_bp, url_prefix="/api")
+        app.register_blueprint(professor_bp, url_prefix="/api/professor")
+        app.register_blueprint(batch_bp, url_prefix="/api")
+        app.register_blueprint(busca_bp, url_prefix="/api")
+
+    # Aquecimento e ping de fundo, uma vez por processo (o gunicorn já inicia em post_fork)
+    from .observabilidade import saude
+
+    @app.before_request
+    def iniciar_saude():
+        saude.iniciar(app)
+
+    if app.config["EXPORT_WARMUP"]:
+        aquecimento_iniciado = []
+
+        @app.before_request
+        def aquecer_exportacao():
+            # Uma vez por processo, com o worker já atendendo (após o fork do gunicorn)
+            if not aquecimento_iniciado:
+                aquecimento_iniciado.append(True)
+                from .services import export_service
+                export_service.iniciar_aquecimento()
+
+    # Comandos de manutenção (flask <comando>)
+    @app.cli.command("criar-indices")
+    def criar_indices_command():
+        """Cria os índices usados pelas consultas dos serviços."""
+        from .services import indices_service
+        criados = indices_service.garantir_indices()
+        for colecao, nomes in criados.items():
+            print(f"{colecao}: {', '.join(nomes) or 'nenhum índice criado'}")
+
+    @app.cli.command("migrar-presencas")
+    def migrar_presencas_command():
+        """Copia a coleção `presencas` para o mapa `chamada` embutido nas aulas."""
+        from .services import chamada_service
+        total = chamada_service.migrar_presencas_para_chamada()
+        print(f"{total} aula(s) migrada(s).")
+
+    @app.cli.command("reconstruir-frequencia")
+    def reconstruir_frequencia_command():
+        """Recria o índice de frequência (bitsets) a partir das presenças."""
+        from .services import frequencia_service
+        total = frequencia_service.reconstruir_indice()
+        print(f"{total} registro(s) de frequência gerado(s).")
+
+    @app.cli.command("recalcular-risco")
+    def recalcular_risco_command():
+        """Recalcula a pontuação de risco de todos os alunos ativos."""
+        from .services import risco_service
+        total = risco_service.recalcular_todos()
+        print(f"Risco recalculado para {total} aluno(s).")
+
+    @app.cli.command("carimbar-atualizacoes")
+    def carimbar_atualizacoes_command():
+        """Grava `updated_at` nos documentos antigos, para a sincronização incremental."""
+        from .services import sincronizacao_service
+        for colecao, total in sincronizacao_service.carimbar_existentes().items():
+            print(f"{colecao}: {total} documento(s) carimbado(s).")
+
+    @app.cli.command("preencher-professor-aulas")
+    def preencher_professor_aulas_command():
+        """Copia o professor de cada turma para as aulas que ainda não o têm (aulas.professor_id)."""
+        from .services import aula_service
+        total = aula_service.preencher_professor_nas_aulas()
+        print(f"{total} aula(s) atualizada(s).")
+
+    @app.cli.command("normalizar-nomes")
+    def normalizar_nomes_command():
+        """Grava `nome_normalizado` (sem acentos) nos usuários antigos, para a busca e a ordenação por nome."""
+        from .services import usuario_service
+        total = usuario_service.normalizar_nomes()
+        print(f"{total} usuário(s) atualizado(s).")
+
+    @app.cli.command("indexar-busca")
+    def indexar_busca_command():
+        """Recalcula as chaves de busca (busca_chaves) de usuários e turmas."""
+        from .services import busca_service
+        for colecao, total in busca_service.indexar_existentes().items():
+            print(f"{colecao}: {total} documento(s) indexado(s).")
 
     return app
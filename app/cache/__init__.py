@@ -0,0 +1,131 @@
+# app/cache/__init__.py
+"""
+Cache plugável para os serviços.
+
+Backends (CACHE_BACKEND):
+- 'memoria' (padrão): LRU em memória, próprio de cada processo;
+- 'sqlite': arquivo SQLite compartilhado pelos workers da mesma máquina (CACHE_SQLITE_PATH),
+  para que um valor calculado por um worker sirva aos demais.
+
+Todos suportam TTL por item (padrão CACHE_TTL_S), limites de itens e de memória
+(CACHE_MAX_ITENS e CACHE_MAX_MB, com remoção dos menos recentes) e invalidação de um namespace inteiro. Acertos, faltas e
+remoções são contados nas métricas `cache_acessos_total` e `cache_remocoes_total`.
+
+Cada invalidação avança a geração do namespace. `obter_ou_calcular` anota a geração antes
+de calcular e só grava o valor se ela não mudou: um cálculo que leu o banco antes de uma
+escrita não fica no cache depois dela.
+
+Uso nos serviços:
+
+    from app import cache
+    turmas = cache.namespace('turmas')
+    valor = turmas.obter_ou_calcular(chave, lambda: calcular(...), ttl=60)
+    turmas.invalidar()  # após uma escrita
+
+Os valores do backend em memória são compartilhados entre as chamadas: não os altere.
+
+Para funções de leitura que dependem só de algumas coleções, o decorador
+`app.cache.resultados.em_cache` cuida da chave e da invalidação (ver o módulo).
+"""
+
+import threading
+
+from app.observabilidade import metricas
+
+_backend = None
+_lock = threading.Lock()
+_AUSENTE = object()
+
+
+class Backend:
+    """
+    Interface dos backends. `obter` devolve AUSENTE quando a chave não existe ou expirou.
+    `definir` com `geracao` só grava se a geração do namespace ainda for essa; `geracao`
+    devolve AUSENTE quando não é possível consultá-la (o valor então não é gravado).
+    """
+
+    AUSENTE = _AUSENTE
+
+    def obter(self, namespace, chave):
+        raise NotImplementedError
+
+    def geracao(self, namespace):
+        raise NotImplementedError
+
+    def definir(self, namespace, chave, valor, ttl, geracao=None):
+        raise NotImplementedError
+
+    def remover(self, namespace, chave):
+        raise NotImplementedError
+
+    def invalidar(self, namespace):
+        raise NotImplementedError
+
+    def limpar(self):
+        raise NotImplementedError
+
+
+class Namespace:
+    """Acesso a um namespace do backend configurado, com métricas de acerto/falta."""
+
+    def __init__(self, nome, ttl=None):
+        self.nome = nome
+        self.ttl = ttl
+
+    def obter(self, chave, padrao=None):
+        valor = backend().obter(self.nome, chave)
+        metricas.CACHE_ACESSOS.incrementar(self.nome, 'falta' if valor is _AUSENTE else 'acerto')
+        return padrao if valor is _AUSENTE else valor
+
+    def definir(self, chave, valor, ttl=None, geracao=None):
+        backend().definir(self.nome, chave, valor, ttl if ttl is not None else self.ttl, geracao)
+
+    def remover(self, chave):
+        backend().remover(self.nome, chave)
+
+    def invalidar(self):
+        backend().invalidar(self.nome)
+
+    def obter_ou_calcular(self, chave, calcular, ttl=None):
+        valor = backend().obter(self.nome, chave)
+        if valor is not _AUSENTE:
+            metricas.CACHE_ACESSOS.incrementar(self.nome, 'acerto')
+            return valor
+        metricas.CACHE_ACESSOS.incrementar(self.nome, 'falta')
+        geracao = backend().geracao(self.nome)
+        valor = calcular()
+        if geracao is not _AUSENTE:
+            self.definir(chave, valor, ttl, geracao)
+        return valor
+
+
+def namespace(nome, ttl=None):
+    return Namespace(nome, ttl)
+
+
+def configurar(app):
+    """Cria o backend definido em CACHE_BACKEND (chamado por criar_app)."""
+    global _backend
+    tipo = app.config["CACHE_BACKEND"]
+    max_bytes = int(app.config["CACHE_MAX_MB"] * 1024 * 1024)
+    if tipo == 'sqlite':
+        from app.cache.sqlite import BackendSqlite
+        novo = BackendSqlite(
+            app.config["CACHE_SQLITE_PATH"], app.config["CACHE_MAX_ITENS"], app.config["CACHE_TTL_S"], max_bytes
+        )
+    elif tipo == 'memoria':
+        from app.cache.memoria import BackendMemoria
+        novo = BackendMemoria(app.config["CACHE_MAX_ITENS"], app.config["CACHE_TTL_S"], max_bytes)
+    else:
+        raise ValueError("CACHE_BACKEND deve ser 'memoria' ou 'sqlite'.")
+    with _lock:
+        _backend = novo
+
+    from app.cache import resultados
+    resultados.configurar(app)
+
+
+def backend():
+    if _backend is None:
+        raise RuntimeError("Cache não configurado: chame cache.configurar(app) em criar_app().")
+    return _backend
@@ -0,0 +1,98 @@
+# app/cache/memoria.py
+"""
+Backend LRU em memória (por processo).
+
+A invalidação de um namespace apenas incrementa a sua geração: as entradas antigas
+deixam de ser encontradas e saem pelo LRU, sem varrer o dicionário. As gerações nunca
+voltam atrás (nem em `limpar`), para que uma gravação condicionada a uma geração antiga
+não volte a valer.
+
+Com limite de memória (max_bytes), o tamanho de cada valor é estimado pelo seu pickle
+no momento da gravação.
+"""
+
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from app.cache import Backend
+from app.observabilidade import metricas
+
+
+class BackendMemoria(Backend):
+
+    def __init__(self, max_itens, ttl_padrao, max_bytes=0):
+        self.max_itens = max_itens
+        self.ttl_padrao = ttl_padrao
+        self.max_bytes = max_bytes
+        self._itens = OrderedDict()  # (namespace, geração, chave) -> (expira_em, valor, tamanho)
+        self._geracoes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _tamanho(self, valor):
+        if not self.max_bytes:
+            return 0
+        try:
+            return len(pickle.dumps(valor, pickle.HIGHEST_PROTOCOL))
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return sys.getsizeof(valor)
+
+    def _retirar(self, chave_interna):
+        _, _, tamanho = self._itens.pop(chave_interna)
+        self._bytes -= tamanho
+
+    def _chave(self, namespace, chave):
+        return (namespace, self._geracoes.get(namespace, 0), chave)
+
+    def obter(self, namespace, chave):
+        with self._lock:
+            chave_interna = self._chave(namespace, chave)
+            item = self._itens.get(chave_interna)
+            if item is None:
+                return self.AUSENTE
+            expira_em, valor, _ = item
+            if expira_em is not None and expira_em <= time.monotonic():
+                self._retirar(chave_interna)
+                metricas.CACHE_REMOCOES.incrementar(namespace, 'expirado')
+                return self.AUSENTE
+            self._itens.move_to_end(chave_interna)
+            return valor
+
+    def geracao(self, namespace):
+        with self._lock:
+            return self._geracoes.get(namespace, 0)
+
+    def definir(self, namespace, chave, valor, ttl, geracao=None):
+        ttl = self.ttl_padrao if ttl is None else ttl
+        expira_em = time.monotonic() + ttl if ttl else None
+        tamanho = self._tamanho(valor)
+        with self._lock:
+            if geracao is not None and geracao != self._geracoes.get(namespace, 0):
+                return  # invalidado durante o cálculo do valor
+            chave_interna = self._chave(namespace, chave)
+            if chave_interna in self._itens:
+                self._retirar(chave_interna)
+            self._itens[chave_interna] = (expira_em, valor, tamanho)
+            self._bytes += tamanho
+            while len(self._itens) > self.max_itens or (self.max_bytes and self._bytes > self.max_bytes):
+                (namespace_removido, _, _), (_, _, tamanho_removido) = self._itens.popitem(last=False)
+                self._bytes -= tamanho_removido
+                metricas.CACHE_REMOCOES.incrementar(namespace_removido, 'limite')
+
+    def remover(self, namespace, chave):
+        with self._lock:
+            chave_interna = self._chave(namespace, chave)
+            if chave_interna in self._itens:
+                self._retirar(chave_interna)
+
+    def invalidar(self, namespace):
+        with self._lock:
+            self._geracoes[namespace] = self._geracoes.get(namespace, 0) + 1
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._bytes = 0
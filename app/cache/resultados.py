@@ -0,0 +1,127 @@
+# app/cache/resultados.py
+"""
+Cache de resultados de funções de leitura com invalidação por coleção.
+
+    @em_cache('turmas', 'usuarios', 'esportes')
+    def listar_turmas():
+        ...
+
+- A chave combina a impressão digital da função (módulo, nome, bytecode e constantes,
+  o que inclui o pipeline literal) com a repr dos argumentos. Alterar o pipeline muda o
+  namespace, então um backend compartilhado nunca serve resultado de código antigo.
+- As coleções declaradas são a dependência do resultado: o OuvinteEscritas (registrado
+  no MongoClient por conectar_mongo) observa insert/update/delete/findAndModify, drop e
+  aggregate com $out/$merge e invalida uma vez os namespaces que dependem da coleção
+  escrita, quando o comando termina (com sucesso ou falha). Uma leitura só grava o
+  resultado se a geração do namespace não mudou desde o início do cálculo, então uma
+  leitura concorrente à escrita não fica (ver `app.cache`).
+- Ninguém precisa invalidar à mão. O ouvinte só vê as escritas do próprio processo:
+  com CACHE_BACKEND=sqlite a invalidação vale para todos os workers; com 'memoria', os
+  outros workers servem o resultado antigo até o TTL (CACHE_RESULTADOS_TTL_S).
+- Por isso o decorador só vem ligado com CACHE_BACKEND=sqlite. CACHE_RESULTADOS=true o
+  liga com 'memoria' (adequado a um único processo); CACHE_RESULTADOS=false o desliga.
+- Limites de itens e memória são os do backend (CACHE_MAX_ITENS, CACHE_MAX_MB).
+
+Os resultados são compartilhados entre as chamadas: não os altere.
+"""
+
+import functools
+import hashlib
+import logging
+from collections import defaultdict
+
+from pymongo import monitoring
+
+from app import cache
+from app.observabilidade.metricas import nome_colecao
+
+COMANDOS_DE_ESCRITA = ('insert', 'update', 'delete', 'findAndModify', 'drop')
+
+logger = logging.getLogger(__name__)
+
+_ativo = False
+_ttl = None
+_dependentes = defaultdict(set)  # coleção -> namespaces
+
+
+def configurar(app):
+    global _ativo, _ttl
+    _ativo = app.config["CACHE_RESULTADOS"]
+    _ttl = app.config["CACHE_RESULTADOS_TTL_S"]
+
+
+def _impressao(funcao):
+    codigo = funcao.__code__
+    resumo = hashlib.sha1(f"{funcao.__module__}.{funcao.__qualname__}".encode())
+    resumo.update(codigo.co_code)
+    resumo.update(repr(codigo.co_consts).encode())
+    return resumo.hexdigest()[:12]
+
+
+def em_cache(*colecoes, ttl=None):
+    """Guarda o resultado da função até uma escrita em `colecoes` ou o fim do TTL."""
+    def decorador(funcao):
+        nome = f"resultado:{funcao.__module__}.{funcao.__qualname__}:{_impressao(funcao)}"
+        for colecao in colecoes:
+            _dependentes[colecao].add(nome)
+
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            if not _ativo:
+                return funcao(*args, **kwargs)
+            chave = repr((args, sorted(kwargs.items())))
+            return cache.namespace(nome, ttl if ttl is not None else _ttl).obter_ou_calcular(
+                chave, lambda: funcao(*args, **kwargs)
+            )
+
+        envolvida.namespace = nome
+        return envolvida
+    return decorador
+
+
+def invalidar_colecao(colecao):
+    for nome in _dependentes.get(colecao, ()):
+        cache.backend().invalidar(nome)
+
+
+def colecao_escrita(evento):
+    """Coleção alterada pelo comando (None para leituras)."""
+    if evento.command_name in COMANDOS_DE_ESCRITA:
+        return nome_colecao(evento)
+    if evento.command_name == 'aggregate':
+        ultimo = (evento.command.get('pipeline') or [{}])[-1]
+        destino = ultimo.get('$out') or ultimo.get('$merge')
+        if isinstance(destino, dict):
+            destino = destino.get('into') or destino.get('coll')
+        return destino if isinstance(destino, str) else None
+    return None
+
+
+class OuvinteEscritas(monitoring.CommandListener):
+    """Invalida os resultados em cache que dependem da coleção escrita."""
+
+    def __init__(self):
+        self._em_andamento = {}
+
+    def started(self, event):
+        # Só anota: a invalidação (escrita no backend) acontece uma vez, ao fim do comando
+        colecao = colecao_escrita(event)
+        if colecao in _dependentes:
+            self._em_andamento[(event.request_id, event.connection_id)] = colecao
+
+    def succeeded(self, event):
+        colecao = self._em_andamento.pop((event.request_id, event.connection_id), None)
+        if colecao:
+            self._invalidar(colecao)
+
+    def failed(self, event):
+        colecao = self._em_andamento.pop((event.request_id, event.connection_id), None)
+        if colecao:
+            self._invalidar(colecao)
+
+    def _invalidar(self, colecao):
+        try:
+            invalidar_colecao(colecao)
+        except Exception:
+            # Exceções em ouvintes são engolidas pelo PyMongo; registra para não passar em branco
+            logger.exception("Falha ao invalidar o cache de resultados da coleção '%s'.", colecao)
@@ -0,0 +1,176 @@
+# app/cache/sqlite.py
+"""
+Backend compartilhado entre processos em um arquivo SQLite (modo WAL).
+
+- Os valores são serializados com pickle; o arquivo deve ficar em um diretório acessível
+  apenas à aplicação (padrão: instance/cache.sqlite3).
+- Cada thread de cada processo abre a sua conexão (conexões SQLite não atravessam fork).
+- Os limites de itens e de bytes (tamanho dos valores serializados) são aplicados periodicamente: saem primeiro os expirados e depois os
+  acessados há mais tempo. O horário de acesso é atualizado no máximo a cada
+  ATUALIZAR_ACESSO_S segundos por item, para que as leituras não virem escritas.
+- A invalidação de um namespace apaga os seus itens e avança a sua geração (tabela
+  `geracoes`); a gravação condicionada a uma geração é um único INSERT ... SELECT que
+  confere a geração atual.
+- Falhas do SQLite são registradas e tratadas como falta: o cache nunca derruba a requisição.
+"""
+
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from app.cache import Backend
+from app.observabilidade import metricas
+
+ATUALIZAR_ACESSO_S = 30
+TIMEOUT_BLOQUEIO_S = 5
+
+logger = logging.getLogger(__name__)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS itens (
+    namespace TEXT NOT NULL,
+    chave TEXT NOT NULL,
+    valor BLOB NOT NULL,
+    expira_em REAL,
+    acessado_em REAL NOT NULL,
+    PRIMARY KEY (namespace, chave)
+);
+CREATE INDEX IF NOT EXISTS itens_acessado_em ON itens (acessado_em);
+CREATE TABLE IF NOT EXISTS geracoes (
+    namespace TEXT PRIMARY KEY,
+    geracao INTEGER NOT NULL
+);
+"""
+
+
+def _texto(chave):
+    return chave if isinstance(chave, str) else repr(chave)
+
+
+class BackendSqlite(Backend):
+
+    def __init__(self, caminho, max_itens, ttl_padrao, max_bytes=0):
+        self.caminho = caminho
+        self.max_itens = max_itens
+        self.ttl_padrao = ttl_padrao
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._escritas = 0
+        # Verifica o limite a cada ~1% do tamanho máximo em gravações deste processo
+        self._verificar_a_cada = max(1, max_itens // 100)
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        with self._conexao() as conexao:
+            conexao.executescript(ESQUEMA)
+
+    def _conexao(self):
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None or self._local.pid != os.getpid():
+            conexao = sqlite3.connect(self.caminho, timeout=TIMEOUT_BLOQUEIO_S, isolation_level=None)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = conexao
+            self._local.pid = os.getpid()
+        return conexao
+
+    def obter(self, namespace, chave):
+        agora = time.time()
+        try:
+            conexao = self._conexao()
+            linha = conexao.execute(
+                "SELECT valor, expira_em, acessado_em FROM itens WHERE namespace = ? AND chave = ?",
+                (namespace, _texto(chave))
+            ).fetchone()
+            if linha is None:
+                return self.AUSENTE
+            valor, expira_em, acessado_em = linha
+            if expira_em is not None and expira_em <= agora:
+                conexao.execute("DELETE FROM itens WHERE namespace = ? AND chave = ?", (namespace, _texto(chave)))
+                metricas.CACHE_REMOCOES.incrementar(namespace, 'expirado')
+                return self.AUSENTE
+            if agora - acessado_em > ATUALIZAR_ACESSO_S:
+                conexao.execute(
+                    "UPDATE itens SET acessado_em = ? WHERE namespace = ? AND chave = ?",
+                    (agora, namespace, _texto(chave))
+                )
+            return pickle.loads(valor)
+        except (sqlite3.Error, pickle.UnpicklingError) as e:
+            logger.warning("Falha ao ler o cache '%s': %s", namespace, e)
+            return self.AUSENTE
+
+    def geracao(self, namespace):
+        try:
+            linha = self._conexao().execute("SELECT geracao FROM geracoes WHERE namespace = ?", (namespace,)).fetchone()
+            return linha[0] if linha else 0
+        except sqlite3.Error as e:
+            logger.warning("Falha ao ler a geração do cache '%s': %s", namespace, e)
+            return self.AUSENTE
+
+    def definir(self, namespace, chave, valor, ttl, geracao=None):
+        ttl = self.ttl_padrao if ttl is None else ttl
+        agora = time.time()
+        try:
+            conexao = self._conexao()
+            parametros = (namespace, _texto(chave), pickle.dumps(valor, pickle.HIGHEST_PROTOCOL), agora + ttl if ttl else None, agora)
+            if geracao is None:
+                conexao.execute(
+                    "INSERT OR REPLACE INTO itens (namespace, chave, valor, expira_em, acessado_em) VALUES (?, ?, ?, ?, ?)",
+                    parametros
+                )
+            else:
+                conexao.execute(
+                    "INSERT OR REPLACE INTO itens (namespace, chave, valor, expira_em, acessado_em) SELECT ?, ?, ?, ?, ? "
+                    "WHERE COALESCE((SELECT geracao FROM geracoes WHERE namespace = ?), 0) = ?",
+                    (*parametros, namespace, geracao)
+                )
+            self._escritas += 1
+            if self._escritas % self._verificar_a_cada == 0:
+                self._aplicar_limite(conexao, agora)
+        except sqlite3.Error as e:
+            logger.warning("Falha ao gravar no cache '%s': %s", namespace, e)
+
+    def _aplicar_limite(self, conexao, agora):
+        expirados = conexao.execute("DELETE FROM itens WHERE expira_em IS NOT NULL AND expira_em <= ?", (agora,))
+        if expirados.rowcount:
+            metricas.CACHE_REMOCOES.incrementar('*', 'expirado', valor=expirados.rowcount)
+        total, bytes_total = conexao.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(valor)), 0) FROM itens").fetchone()
+        excesso = max(0, total - self.max_itens)
+        if self.max_bytes and bytes_total > self.max_bytes:
+            # Conta quantos dos menos recentes precisam sair para caber no limite de bytes
+            a_liberar = bytes_total - self.max_bytes
+            for removidos, (tamanho,) in enumerate(
+                conexao.execute("SELECT LENGTH(valor) FROM itens ORDER BY acessado_em"), start=1
+            ):
+                a_liberar -= tamanho
+                if a_liberar <= 0:
+                    break
+            excesso = max(excesso, removidos)
+        if excesso > 0:
+            conexao.execute(
+                "DELETE FROM itens WHERE rowid IN (SELECT rowid FROM itens ORDER BY acessado_em LIMIT ?)", (excesso,)
+            )
+            metricas.CACHE_REMOCOES.incrementar('*', 'limite', valor=excesso)
+
+    def remover(self, namespace, chave):
+        try:
+            self._conexao().execute("DELETE FROM itens WHERE namespace = ? AND chave = ?", (namespace, _texto(chave)))
+        except sqlite3.Error as e:
+            logger.warning("Falha ao remover do cache '%s': %s", namespace, e)
+
+    def invalidar(self, namespace):
+        try:
+            conexao = self._conexao()
+            # Primeiro a geração: uma gravação condicionada à geração anterior já não passa
+            conexao.execute(
+                "INSERT INTO geracoes (namespace, geracao) VALUES (?, 1) "
+                "ON CONFLICT (namespace) DO UPDATE SET geracao = geracao + 1",
+                (namespace,)
+            )
+            conexao.execute("DELETE FROM itens WHERE namespace = ?", (namespace,))
+        except sqlite3.Error as e:
+            logger.warning("Falha ao invalidar o cache '%s': %s", namespace, e)
+
+    def limpar(self):
+        self._conexao().execute("DELETE FROM itens")
@@ -1,6 +1,7 @@
 from functools import wraps
-from flask import jsonify
+from flask import g, jsonify
 from flask_jwt_extended import verify_jwt_in_request, get_jwt
+from app.observabilidade import perfilador
 
 def role_required(roles):
     """
@@ -12,7 +13,9 @@ def role_required(roles):
         def decorator(*args, **kwargs):
             # 1. Verifica se um token JWT válido está presente na requisição.
             # Esta função é inteligente e não gera erro para requisições OPTIONS.
-            verify_jwt_in_request()
+            # Sub-requisições de /api/batch já recebem o token verificado pelo lote.
+            if not g.get('lote_autenticado'):
+                verify_jwt_in_request()
             
             # 2. Se a verificação passou, pega os dados (claims) do token.
             claims = get_jwt()
@@ -22,7 +25,11 @@ def role_required(roles):
             if user_role not in roles:
                 return jsonify({"mensagem": f"Acesso restrito. Perfis permitidos: {', '.join(roles)}."}), 403
             
-            # 4. Se tudo estiver OK, executa a função da rota original.
+            # 4. Perfilamento sob demanda (admin com X-Profile) ou por amostragem.
+            if perfilador.deve_perfilar(user_role):
+                return perfilador.perfilar(fn, *args, **kwargs)
+
+            # 5. Se tudo estiver OK, executa a função da rota original.
             return fn(*args, **kwargs)
         return decorator
     return wrapper
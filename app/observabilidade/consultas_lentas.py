@@ -0,0 +1,191 @@
+# app/observabilidade/consultas_lentas.py
+"""
+Registro de comandos lentos do MongoDB.
+
+Todo comando que ultrapassa SLOW_QUERY_MS é registrado no logger 'ciaf.consultas_lentas',
+com a rota de origem, o formato do comando (valores literais trocados por '?'), a duração
+e os documentos retornados no campo `dados` do log estruturado. Com SLOW_QUERY_EXPLAIN ativo, o comando de leitura
+é reexecutado com `explain("executionStats")` em uma thread de fundo e o resultado
+(documentos/chaves examinados e plano vencedor) é guardado na coleção limitada
+`consultas_lentas`, consultável pelos administradores.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import has_request_context, request
+from pymongo import monitoring
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+from app.observabilidade.metricas import documentos_da_resposta, nome_colecao
+
+COLECAO = 'consultas_lentas'
+TAMANHO_COLECAO_BYTES = 16 * 1024 * 1024
+COMANDOS_EXPLICAVEIS = ('find', 'aggregate', 'count', 'distinct')
+CAMPOS_DE_SESSAO = ('lsid', '$clusterTime', '$db', 'txnNumber', '$readPreference', 'readConcern', 'apiVersion')
+MAX_EXPLAIN_PENDENTES = 20
+
+logger = logging.getLogger('ciaf.consultas_lentas')
+
+
+# Opções dos estágios cujo valor é nome de coleção ou campo (estrutura do comando, não dado)
+OPCOES_ESTRUTURAIS = {
+    '$lookup': ('from', 'localField', 'foreignField', 'as'),
+    '$graphLookup': ('from', 'connectFromField', 'connectToField', 'as', 'depthField'),
+    '$unwind': ('path', 'includeArrayIndex'),
+    '$merge': ('into', 'db', 'coll'),
+    '$out': ('db', 'coll'),
+}
+# Estágios cujo próprio valor é nome de coleção ou campo ({"$count": "total"}, {"$unset": [...]})
+ESTAGIOS_COM_NOMES = ('$count', '$unset', '$out')
+# Projeções e ordenações: os números (1, 0, -1) dizem o formato, não são dados
+CHAVES_DE_FORMA = ('projection', 'sort', 'hint', '$project', '$sort')
+
+
+def redigir(valor, chave=None, forma=False, estruturais=()):
+    """Troca os valores literais por '?', preservando campos, coleções, operadores e estágios."""
+    if isinstance(valor, dict):
+        forma = forma or chave in CHAVES_DE_FORMA
+        opcoes = OPCOES_ESTRUTURAIS.get(chave, ())
+        return {item_chave: redigir(item, item_chave, forma, opcoes) for item_chave, item in valor.items()}
+    nome = chave in ESTAGIOS_COM_NOMES or chave in estruturais
+    if isinstance(valor, (list, tuple)):
+        if nome or any(isinstance(item, dict) for item in valor):
+            return [redigir(item, chave, forma, estruturais) for item in valor]
+        return '?'
+    if isinstance(valor, str) and (valor.startswith('$') or nome):
+        return valor  # referência a campo ("$turma.nome"), variável ou nome de coleção/campo
+    if forma and isinstance(valor, (bool, int, float)):
+        return valor
+    return '?'
+
+
+def formato_comando(comando, nome_comando):
+    """Parte relevante do comando, sem metadados de sessão e com literais redigidos."""
+    formato = {}
+    for chave, item in comando.items():
+        if chave in CAMPOS_DE_SESSAO or chave == nome_comando:
+            continue
+        formato[chave] = redigir(item, chave)
+    return formato
+
+
+class OuvinteConsultasLentas(monitoring.CommandListener):
+    """Mede cada comando e registra os que passam do limite configurado."""
+
+    def __init__(self, limiar_ms, explain=False, obter_cliente=None):
+        self.limiar_micros = limiar_ms * 1000
+        self.explain = explain and obter_cliente is not None
+        self._obter_cliente = obter_cliente
+        self._em_andamento = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='explain') if self.explain else None
+        self._vagas = threading.BoundedSemaphore(MAX_EXPLAIN_PENDENTES)
+        self._colecao_criada = False
+
+    def started(self, event):
+        if event.command_name == 'explain':
+            return
+        rota = (request.endpoint, request.method) if has_request_context() else (None, None)
+        self._em_andamento[(event.request_id, event.connection_id)] = (nome_colecao(event), event.command, rota)
+
+    def succeeded(self, event):
+        inicio = self._em_andamento.pop((event.request_id, event.connection_id), None)
+        if inicio is None or event.duration_micros < self.limiar_micros:
+            return
+        self._registrar(event, inicio, documentos_da_resposta(event.reply))
+
+    def failed(self, event):
+        self._em_andamento.pop((event.request_id, event.connection_id), None)
+
+    def _registrar(self, event, inicio, documentos):
+        colecao, comando, (endpoint, metodo) = inicio
+        if colecao == COLECAO:
+            return
+
+        registro = {
+            "data": datetime.utcnow(),
+            "banco": event.database_name,
+            "colecao": colecao,
+            "comando": event.command_name,
+            "duracao_ms": round(event.duration_micros / 1000, 2),
+            "documentos_retornados": documentos,
+            "rota": endpoint,
+            "metodo": metodo,
+            "formato": formato_comando(comando, event.command_name),
+        }
+        logger.warning(
+            "Comando lento: %s.%s em %.1f ms", colecao, event.command_name, registro["duracao_ms"],
+            extra={"dados": dict(registro)}
+        )
+
+        if self.explain and event.command_name in COMANDOS_EXPLICAVEIS and self._vagas.acquire(blocking=False):
+            self._executor.submit(self._explicar, event.database_name, comando, registro)
+
+    def _explicar(self, banco, comando, registro):
+        """Executa em segundo plano: roda explain e guarda o plano na coleção limitada."""
+        try:
+            db = self._obter_cliente()[banco]
+            comando_limpo = {chave: valor for chave, valor in comando.items() if chave not in CAMPOS_DE_SESSAO}
+            plano = db.command({"explain": comando_limpo, "verbosity": "executionStats"})
+            estatisticas = _estatisticas_execucao(plano)
+            registro.update(estatisticas)
+            registro["plano_vencedor"] = redigir_plano(_plano_vencedor(plano))
+
+            if not self._colecao_criada:
+                try:
+                    db.create_collection(COLECAO, capped=True, size=TAMANHO_COLECAO_BYTES)
+                except CollectionInvalid:
+                    pass  # já existe
+                self._colecao_criada = True
+            db[COLECAO].insert_one(registro)
+        except PyMongoError as e:
+            logger.error("Falha ao executar explain de consulta lenta: %s", e)
+        finally:
+            self._vagas.release()
+
+
+def _plano_vencedor(plano):
+    """Localiza o winningPlan em explains de find ou de aggregate (com $cursor / shards)."""
+    if 'queryPlanner' in plano:
+        return plano['queryPlanner'].get('winningPlan')
+    for estagio in plano.get('stages', []):
+        if '$cursor' in estagio:
+            return estagio['$cursor'].get('queryPlanner', {}).get('winningPlan')
+    return None
+
+
+def _estatisticas_execucao(plano):
+    """Extrai totalKeysExamined/totalDocsExamined/executionTimeMillis do explain."""
+    stats = plano.get('executionStats')
+    if stats is None:
+        for estagio in plano.get('stages', []):
+            if '$cursor' in estagio:
+                stats = estagio['$cursor'].get('executionStats')
+                break
+    stats = stats or {}
+    return {
+        "chaves_examinadas": stats.get('totalKeysExamined'),
+        "documentos_examinados": stats.get('totalDocsExamined'),
+        "tempo_explain_ms": stats.get('executionTimeMillis'),
+    }
+
+
+def redigir_plano(plano):
+    """Mantém a árvore de estágios do plano, redigindo os filtros e limites de índice."""
+    if isinstance(plano, dict):
+        return {
+            chave: (redigir(valor) if chave in ('filter', 'indexBounds', 'parsedQuery') else redigir_plano(valor))
+            for chave, valor in plano.items()
+        }
+    if isinstance(plano, list):
+        return [redigir_plano(item) for item in plano]
+    return plano
+
+
+def listar(db, limite=50):
+    """Registros mais recentes da coleção de consultas lentas."""
+    if COLECAO not in db.list_collection_names(filter={"name": COLECAO}):
+        return []
+    return list(db[COLECAO].find().sort("$natural", -1).limit(limite))
@@ -0,0 +1,150 @@
+# app/observabilidade/logs.py
+"""
+Configuração de logs da aplicação.
+
+- Cada registro sai como uma linha JSON (LOG_FORMAT=json, padrão) ou texto (LOG_FORMAT=texto)
+  com o id da requisição, o usuário autenticado e a rota.
+- O emissor da requisição apenas coloca o registro em uma fila (QueueHandler); a formatação
+  e a escrita no stderr acontecem na thread do QueueListener, sem bloquear a requisição.
+- O nível vem de LOG_LEVEL (padrão INFO): chamadas `logger.debug("... %s", x)` custam
+  apenas a checagem de nível quando DEBUG está desligado. O pymongo usa LOG_LEVEL_PYMONGO
+  (padrão WARNING).
+
+Use `logging.getLogger(__name__)` nos módulos do pacote `app`: os loggers ficam abaixo
+do `app.logger` do Flask e herdam esta configuração. Dados estruturados podem ser
+anexados com `extra={"dados": {...}}`.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, has_request_context, request
+from flask.logging import default_handler
+from flask_jwt_extended import get_jwt_identity
+
+CABECALHO_REQUEST_ID = 'X-Request-Id'
+
+_fila = None
+_manipuladores = ()
+_ouvinte = None
+
+
+class FiltroContexto(logging.Filter):
+    """Anexa request id, usuário e rota ao registro (executa na thread da requisição)."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.rota = request.endpoint
+            record.metodo = request.method
+            try:
+                record.usuario_id = get_jwt_identity()
+            except RuntimeError:
+                record.usuario_id = None  # rota sem JWT ou token ainda não verificado
+        return True
+
+
+class ManipuladorFila(QueueHandler):
+    """
+    QueueHandler que resolve a mensagem e o traceback na thread de origem, mas deixa a
+    serialização (JSON ou texto) para a thread do QueueListener.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+class FormatadorJson(logging.Formatter):
+
+    def format(self, record):
+        saida = {
+            "data": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensagem": record.getMessage(),
+        }
+        for campo in ('request_id', 'usuario_id', 'rota', 'metodo'):
+            valor = getattr(record, campo, None)
+            if valor is not None:
+                saida[campo] = valor
+        if getattr(record, 'dados', None) is not None:
+            saida["dados"] = record.dados
+        if record.exc_text:
+            saida["excecao"] = record.exc_text
+        return json.dumps(saida, default=str, ensure_ascii=False)
+
+
+class FormatadorTexto(logging.Formatter):
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(name)s] %(mensagem_contexto)s%(message)s")
+
+    def format(self, record):
+        partes = [str(getattr(record, campo)) for campo in ('request_id', 'usuario_id', 'rota')
+                  if getattr(record, campo, None)]
+        record.mensagem_contexto = f"({' '.join(partes)}) " if partes else ''
+        return super().format(record)
+
+
+def _iniciar_ouvinte():
+    global _ouvinte
+    _ouvinte = QueueListener(_fila, *_manipuladores, respect_handler_level=True)
+    _ouvinte.start()
+
+
+def _parar_ouvinte():
+    if _ouvinte is not None:
+        _ouvinte.stop()
+
+
+def configurar(app):
+    """Instala o handler em fila no logger raiz (uma vez por processo) e o id de requisição."""
+    global _fila, _manipuladores
+
+    nivel = os.getenv("LOG_LEVEL", "INFO").upper()
+    if _fila is None:
+        saida = logging.StreamHandler(sys.stderr)
+        saida.setFormatter(FormatadorTexto() if os.getenv("LOG_FORMAT", "json") == "texto" else FormatadorJson())
+        _manipuladores = (saida,)
+        _fila = queue.SimpleQueue()
+
+        manipulador = ManipuladorFila(_fila)
+        manipulador.addFilter(FiltroContexto())
+        raiz = logging.getLogger()
+        raiz.addHandler(manipulador)
+        raiz.setLevel(nivel)
+        # O pymongo registra cada comando em DEBUG; só aparece se pedido explicitamente
+        logging.getLogger("pymongo").setLevel(os.getenv("LOG_LEVEL_PYMONGO", "WARNING").upper())
+
+        _iniciar_ouvinte()
+        atexit.register(_parar_ouvinte)
+        # A thread do listener não sobrevive ao fork dos workers (ex.: gunicorn com preload)
+        os.register_at_fork(after_in_child=_iniciar_ouvinte)
+
+    app.logger.removeHandler(default_handler)
+    app.logger.setLevel(nivel)
+
+    @app.before_request
+    def _definir_request_id():
+        g.request_id = request.headers.get(CABECALHO_REQUEST_ID) or uuid.uuid4().hex
+
+    @app.after_request
+    def _devolver_request_id(response):
+        if 'request_id' in g:
+            response.headers[CABECALHO_REQUEST_ID] = g.request_id
+        return response
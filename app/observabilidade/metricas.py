@@ -0,0 +1,295 @@
+# app/observabilidade/metricas.py
+"""
+Métricas da aplicação no formato de texto do Prometheus.
+
+- Latência das requisições HTTP por blueprint, endpoint, método e status.
+- Latência dos comandos do MongoDB por coleção e comando, e documentos retornados
+  (via `pymongo.monitoring.CommandListener`).
+- Estatísticas do pool de conexões (abertas, em uso, tempo de espera no checkout).
+
+Os valores ficam em memória e são por processo: em implantações com vários workers,
+cada worker expõe as próprias séries (o Prometheus agrega por instância).
+"""
+
+import bisect
+import threading
+import time
+
+from flask import g, request
+from pymongo import monitoring
+
+BUCKETS_PADRAO = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatar_rotulos(nomes, valores, extra=None):
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._lock = threading.Lock()
+
+    def _cabecalho(self):
+        return [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+
+
+class Contador(_Metrica):
+    tipo = 'counter'
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        super().__init__(nome, ajuda, rotulos)
+        self._valores = {}
+
+    def incrementar(self, *rotulos, valor=1):
+        with self._lock:
+            self._valores[rotulos] = self._valores.get(rotulos, 0) + valor
+
+    def renderizar(self):
+        linhas = self._cabecalho()
+        with self._lock:
+            for rotulos, valor in self._valores.items():
+                linhas.append(f"{self.nome}{_formatar_rotulos(self.rotulos, rotulos)} {valor}")
+        return linhas
+
+
+class Medidor(Contador):
+    """Valor instantâneo (gauge) que pode subir e descer."""
+    tipo = 'gauge'
+
+    def ajustar(self, *rotulos, delta=1):
+        with self._lock:
+            self._valores[rotulos] = self._valores.get(rotulos, 0) + delta
+
+    def definir(self, *rotulos, valor):
+        with self._lock:
+            self._valores[rotulos] = valor
+
+
+class Histograma(_Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos=(), buckets=BUCKETS_PADRAO):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # rotulos -> [contagens por bucket..., +Inf, soma]
+
+    def observar(self, valor, *rotulos):
+        posicao = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(rotulos)
+            if serie is None:
+                serie = self._series[rotulos] = [0] * (len(self.buckets) + 2)
+            serie[posicao] += 1
+            serie[-1] += valor
+
+    def renderizar(self):
+        linhas = self._cabecalho()
+        with self._lock:
+            series = {rotulos: list(serie) for rotulos, serie in self._series.items()}
+        for rotulos, serie in series.items():
+            acumulado = 0
+            for limite, contagem in zip(self.buckets, serie):
+                acumulado += contagem
+                le = 'le="%s"' % limite
+                linhas.append(f"{self.nome}_bucket{_formatar_rotulos(self.rotulos, rotulos, le)} {acumulado}")
+            acumulado += serie[len(self.buckets)]
+            le = 'le="+Inf"'
+            linhas.append(f"{self.nome}_bucket{_formatar_rotulos(self.rotulos, rotulos, le)} {acumulado}")
+            linhas.append(f"{self.nome}_sum{_formatar_rotulos(self.rotulos, rotulos)} {serie[-1]}")
+            linhas.append(f"{self.nome}_count{_formatar_rotulos(self.rotulos, rotulos)} {acumulado}")
+        return linhas
+
+
+class Registro:
+    """Conjunto de métricas expostas em /api/metrics."""
+
+    def __init__(self):
+        self._metricas = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, classe, nome, *args, **kwargs):
+        with self._lock:
+            if nome not in self._metricas:
+                self._metricas[nome] = classe(nome, *args, **kwargs)
+            return self._metricas[nome]
+
+    def contador(self, nome, ajuda, rotulos=()):
+        return self._registrar(Contador, nome, ajuda, rotulos)
+
+    def medidor(self, nome, ajuda, rotulos=()):
+        return self._registrar(Medidor, nome, ajuda, rotulos)
+
+    def histograma(self, nome, ajuda, rotulos=(), buckets=BUCKETS_PADRAO):
+        return self._registrar(Histograma, nome, ajuda, rotulos, buckets)
+
+    def renderizar(self):
+        linhas = []
+        with self._lock:
+            metricas = list(self._metricas.values())
+        for metrica in metricas:
+            linhas.extend(metrica.renderizar())
+        return '\n'.join(linhas) + '\n'
+
+
+REGISTRO = Registro()
+
+HTTP_DURACAO = REGISTRO.histograma(
+    'http_requisicao_duracao_segundos', 'Latência das requisições HTTP.',
+    ('blueprint', 'endpoint', 'metodo', 'status')
+)
+MONGO_DURACAO = REGISTRO.histograma(
+    'mongo_comando_duracao_segundos', 'Latência dos comandos enviados ao MongoDB.', ('colecao', 'comando')
+)
+MONGO_DOCUMENTOS = REGISTRO.contador(
+    'mongo_documentos_retornados_total', 'Documentos retornados (ou afetados) pelos comandos do MongoDB.',
+    ('colecao', 'comando')
+)
+MONGO_FALHAS = REGISTRO.contador(
+    'mongo_comando_falhas_total', 'Comandos do MongoDB que falharam.', ('colecao', 'comando')
+)
+POOL_CONEXOES = REGISTRO.medidor(
+    'mongo_pool_conexoes', 'Conexões abertas no pool do MongoDB.', ('endereco',)
+)
+POOL_EM_USO = REGISTRO.medidor(
+    'mongo_pool_conexoes_em_uso', 'Conexões do pool atualmente emprestadas (checked out).', ('endereco',)
+)
+POOL_ESPERA = REGISTRO.histograma(
+    'mongo_pool_espera_segundos', 'Tempo de espera para obter uma conexão do pool.', ('endereco',)
+)
+POOL_FALHAS = REGISTRO.contador(
+    'mongo_pool_falhas_checkout_total', 'Falhas ao obter conexão do pool.', ('endereco', 'motivo')
+)
+EXPORTACOES_EM_ANDAMENTO = REGISTRO.medidor(
+    'exportacoes_em_andamento', 'Exportações (PDF/XLSX) sendo geradas neste processo.', ('formato',)
+)
+CACHE_ACESSOS = REGISTRO.contador(
+    'cache_acessos_total', 'Leituras do cache dos serviços por resultado (acerto/falta).', ('namespace', 'resultado')
+)
+CACHE_REMOCOES = REGISTRO.contador(
+    'cache_remocoes_total', 'Itens removidos do cache por expiração ou limite de tamanho.', ('namespace', 'motivo')
+)
+
+
+# --- MONGODB ---
+
+def nome_colecao(evento):
+    """Coleção alvo de um CommandStartedEvent (None para comandos de administração)."""
+    alvo = evento.command.get(evento.command_name)
+    if evento.command_name == 'getMore':
+        return evento.command.get('collection')
+    return alvo if isinstance(alvo, str) else None
+
+
+def documentos_da_resposta(resposta):
+    cursor = resposta.get('cursor')
+    if isinstance(cursor, dict):
+        return len(cursor.get('firstBatch') or cursor.get('nextBatch') or [])
+    n = resposta.get('n')
+    return n if isinstance(n, int) else 0
+
+
+class OuvinteComandos(monitoring.CommandListener):
+    """Registra latência e volume de cada comando enviado ao MongoDB."""
+
+    def __init__(self):
+        self._em_andamento = {}
+
+    def started(self, event):
+        chave = (event.request_id, event.connection_id)
+        self._em_andamento[chave] = (nome_colecao(event) or '-', event.command_name)
+
+    def succeeded(self, event):
+        colecao, comando = self._em_andamento.pop((event.request_id, event.connection_id), ('-', event.command_name))
+        MONGO_DURACAO.observar(event.duration_micros / 1e6, colecao, comando)
+        documentos = documentos_da_resposta(event.reply)
+        if documentos:
+            MONGO_DOCUMENTOS.incrementar(colecao, comando, valor=documentos)
+
+    def failed(self, event):
+        colecao, comando = self._em_andamento.pop((event.request_id, event.connection_id), ('-', event.command_name))
+        MONGO_DURACAO.observar(event.duration_micros / 1e6, colecao, comando)
+        MONGO_FALHAS.incrementar(colecao, comando)
+
+
+class OuvintePool(monitoring.ConnectionPoolListener):
+    """Acompanha o tamanho e a ocupação do pool de conexões."""
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_created(self, event):
+        POOL_CONEXOES.ajustar(str(event.address), delta=1)
+
+    def connection_closed(self, event):
+        POOL_CONEXOES.ajustar(str(event.address), delta=-1)
+
+    def connection_checked_out(self, event):
+        POOL_EM_USO.ajustar(str(event.address), delta=1)
+        if getattr(event, 'duration', None) is not None:
+            POOL_ESPERA.observar(event.duration, str(event.address))
+
+    def connection_checked_in(self, event):
+        POOL_EM_USO.ajustar(str(event.address), delta=-1)
+
+    def connection_check_out_failed(self, event):
+        POOL_FALHAS.incrementar(str(event.address), str(event.reason))
+
+
+_OUVINTES = [OuvinteComandos(), OuvintePool()]
+
+
+def ouvintes_mongo():
+    """Ouvintes a serem passados ao MongoClient (`event_listeners`)."""
+    return list(_OUVINTES)
+
+
+# --- FLASK ---
+
+def init_app(app):
+    """Registra a medição de latência das requisições HTTP."""
+
+    @app.before_request
+    def _iniciar_cronometro():
+        g._metricas_inicio = time.perf_counter()
+
+    @app.after_request
+    def _registrar_latencia(response):
+        inicio = g.pop('_metricas_inicio', None)
+        if inicio is not None:
+            HTTP_DURACAO.observar(
+                time.perf_counter() - inicio,
+                request.blueprint or '-', request.endpoint or 'nao_encontrado',
+                request.method, response.status_code
+            )
+        return response
+
+
+def renderizar():
+    return REGISTRO.renderizar()
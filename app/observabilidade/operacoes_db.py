@@ -0,0 +1,84 @@
+# app/observabilidade/operacoes_db.py
+"""
+Contagem de operações do MongoDB por requisição (modo de desenvolvimento e testes).
+
+Com DB_OPS_TRACKING ativo, cada comando enviado durante uma requisição é anotado em `g`
+e a resposta recebe:
+- X-Db-Ops: total de idas ao banco na requisição;
+- X-Db-Ops-Repetidas: comandos idênticos (mesmo filtro e valores) enviados mais de uma
+  vez na mesma requisição, no formato "colecao.comando x<vezes>" — o sintoma de N+1.
+
+Os orçamentos por endpoint ficam no harness `benchmarks/orcamento_operacoes.py`.
+Desativado, o ouvinte nem é registrado no MongoClient.
+"""
+
+import logging
+from collections import Counter
+
+from bson import json_util
+from flask import g, has_request_context, request
+from pymongo import monitoring
+
+from app.observabilidade.consultas_lentas import CAMPOS_DE_SESSAO
+from app.observabilidade.metricas import nome_colecao
+
+CABECALHO_TOTAL = 'X-Db-Ops'
+CABECALHO_REPETIDAS = 'X-Db-Ops-Repetidas'
+# Comandos de controle de cursor/sessão: contam como ida ao banco, mas não como repetição
+SEM_ASSINATURA = ('getMore', 'killCursors', 'endSessions')
+
+logger = logging.getLogger('ciaf.operacoes_db')
+
+
+def _assinatura(event):
+    if event.command_name in SEM_ASSINATURA:
+        return None
+    comando = {chave: valor for chave, valor in event.command.items() if chave not in CAMPOS_DE_SESSAO}
+    return json_util.dumps(comando, sort_keys=True)
+
+
+class OuvinteOperacoes(monitoring.CommandListener):
+    """Anota em `g` os comandos enviados durante a requisição atual."""
+
+    def started(self, event):
+        if not has_request_context():
+            return
+        operacoes = g.get('_operacoes_db')
+        if operacoes is not None:
+            operacoes.append((nome_colecao(event) or '-', event.command_name, _assinatura(event)))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def repetidas(operacoes):
+    """Comandos idênticos enviados mais de uma vez: {"colecao.comando": vezes}."""
+    contagem = Counter(op for op in operacoes if op[2] is not None)
+    resultado = Counter()
+    for (colecao, comando, _), vezes in contagem.items():
+        if vezes > 1:
+            resultado[f"{colecao}.{comando}"] += vezes
+    return dict(resultado)
+
+
+def init_app(app):
+    """Inicia a contagem a cada requisição e publica o total nos cabeçalhos da resposta."""
+
+    @app.before_request
+    def _iniciar_contagem():
+        g._operacoes_db = []
+
+    @app.after_request
+    def _publicar_contagem(response):
+        operacoes = g.pop('_operacoes_db', None)
+        if operacoes is None:
+            return response
+        response.headers[CABECALHO_TOTAL] = str(len(operacoes))
+        duplicadas = repetidas(operacoes)
+        if duplicadas:
+            response.headers[CABECALHO_REPETIDAS] = ', '.join(f"{nome} x{vezes}" for nome, vezes in duplicadas.items())
+            logger.warning("Consultas repetidas em %s: %s", request.endpoint, response.headers[CABECALHO_REPETIDAS])
+        return response
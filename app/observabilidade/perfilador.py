@@ -0,0 +1,112 @@
+# app/observabilidade/perfilador.py
+"""
+Perfilamento sob demanda das requisições com cProfile.
+
+Uma requisição é perfilada quando:
+- o usuário autenticado é admin e envia o cabeçalho `X-Profile: 1` (ou `?profile=1`;
+  valem "1", "true" e "sim", como nas flags de configuração);
+  como o perfil vem do JWT assinado, não há como um usuário comum ativar o perfilador;
+- ou pela amostragem de 1 a cada PROFILE_SAMPLE_N requisições de cada endpoint.
+
+A decisão é tomada em `role_required`, de modo que as demais requisições apenas
+consultam um cabeçalho e um contador. O resultado é gravado como arquivo .pstats em
+PROFILE_DIR (mantendo os PROFILE_MAX_ARQUIVOS mais recentes) e o nome do arquivo volta
+no cabeçalho X-Profile-Id. Os arquivos são listados e baixados em /api/diagnostico/perfis.
+"""
+
+import cProfile
+import io
+import itertools
+import logging
+import os
+import pstats
+import re
+import uuid
+from collections import defaultdict
+from datetime import datetime
+
+from flask import current_app, make_response, request
+
+CABECALHO = 'X-Profile'
+PARAMETRO = 'profile'
+EXTENSAO = '.pstats'
+NOME_VALIDO = re.compile(r'^[\w.-]+\.pstats$')
+VALORES_ATIVOS = ('1', 'true', 'sim')
+
+logger = logging.getLogger('ciaf.perfilador')
+_contadores = defaultdict(itertools.count)
+
+
+def _pedido(valor):
+    return (valor or '').strip().lower() in VALORES_ATIVOS
+
+
+def deve_perfilar(perfil):
+    """Decide se a requisição atual deve ser perfilada (chamada após a checagem de perfil)."""
+    if perfil == 'admin' and (_pedido(request.headers.get(CABECALHO)) or _pedido(request.args.get(PARAMETRO))):
+        return True
+    n = current_app.config.get('PROFILE_SAMPLE_N', 0)
+    return n > 0 and next(_contadores[request.endpoint]) % n == 0
+
+
+def perfilar(fn, *args, **kwargs):
+    """Executa a view sob o cProfile, grava o .pstats e devolve a resposta com X-Profile-Id."""
+    perfil = cProfile.Profile()
+    try:
+        perfil.enable()
+    except ValueError:
+        # Outro perfilador já está ativo nesta thread: segue sem perfilar
+        return fn(*args, **kwargs)
+    try:
+        resposta = make_response(fn(*args, **kwargs))
+    finally:
+        perfil.disable()
+
+    nome = f"{datetime.utcnow():%Y%m%dT%H%M%S}_{request.endpoint}_{uuid.uuid4().hex[:8]}{EXTENSAO}"
+    diretorio = current_app.config['PROFILE_DIR']
+    try:
+        os.makedirs(diretorio, exist_ok=True)
+        perfil.dump_stats(os.path.join(diretorio, nome))
+        _limitar_arquivos(diretorio, current_app.config.get('PROFILE_MAX_ARQUIVOS', 200))
+        resposta.headers['X-Profile-Id'] = nome
+    except OSError as e:
+        logger.error("Falha ao gravar o perfil %s: %s", nome, e)
+    return resposta
+
+
+def _limitar_arquivos(diretorio, maximo):
+    arquivos = sorted(listar(diretorio), key=lambda a: a['data'])
+    for arquivo in arquivos[:max(0, len(arquivos) - maximo)]:
+        try:
+            os.remove(os.path.join(diretorio, arquivo['nome']))
+        except OSError:
+            pass
+
+
+def listar(diretorio):
+    """Perfis gravados, do mais recente para o mais antigo."""
+    if not os.path.isdir(diretorio):
+        return []
+    arquivos = []
+    with os.scandir(diretorio) as entradas:
+        for entrada in entradas:
+            if entrada.is_file() and entrada.name.endswith(EXTENSAO):
+                info = entrada.stat()
+                arquivos.append({
+                    "nome": entrada.name,
+                    "endpoint": entrada.name.split('_', 1)[-1].rsplit('_', 1)[0],
+                    "tamanho_bytes": info.st_size,
+                    "data": datetime.utcfromtimestamp(info.st_mtime),
+                })
+    return sorted(arquivos, key=lambda a: a['data'], reverse=True)
+
+
+def nome_valido(nome):
+    return bool(NOME_VALIDO.match(nome))
+
+
+def resumo_texto(caminho, ordenacao='cumulative', limite=40):
+    """Relatório de texto do pstats (as `limite` funções mais caras pela `ordenacao`)."""
+    saida = io.StringIO()
+    pstats.Stats(caminho, stream=saida).strip_dirs().sort_stats(ordenacao).print_stats(limite)
+    return saida.getvalue()
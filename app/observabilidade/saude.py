@@ -0,0 +1,133 @@
+# app/observabilidade/saude.py
+"""
+Estado de saúde do processo para as sondas de liveness e readiness.
+
+- Uma thread de fundo por processo executa as tarefas de aquecimento registradas com
+  `@aquecimento(nome)` (pool do MongoDB, template do relatório, caches de referência) e,
+  em seguida, faz `ping` no banco a cada HEALTH_PING_INTERVALO_S segundos.
+- As rotas de saúde apenas leem o estado guardado aqui: sondas frequentes de vários
+  balanceadores não geram tráfego no banco e não se acumulam quando ele está lento.
+- O processo está pronto quando o aquecimento terminou e o último ping bem-sucedido
+  é recente (até 3 intervalos).
+
+A thread é iniciada por `iniciar(app)` uma vez por processo: no gunicorn, em `post_fork`
+(depois de o worker recriar o MongoClient); nos demais servidores, na primeira requisição.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import mongo
+
+logger = logging.getLogger(__name__)
+
+_tarefas = []
+_lock = threading.Lock()
+_pid = None
+_estado = {}
+
+
+def aquecimento(nome):
+    """Registra `funcao(app)` para ser executada antes de o processo ficar pronto."""
+    def decorador(funcao):
+        _tarefas.append((nome, funcao))
+        return funcao
+    return decorador
+
+
+def _estado_inicial():
+    return {
+        "aquecido": False,
+        "aquecimento": {},
+        "banco_ok": None,
+        "banco_erro": None,
+        "latencia_ping_ms": None,
+        "ultimo_ping": None,
+        "ultimo_ping_ok": None,
+    }
+
+
+def _pingar():
+    inicio = time.perf_counter()
+    try:
+        mongo.db.command('ping')
+        erro = None
+    except Exception as e:
+        erro = str(e)
+    agora = time.time()
+    with _lock:
+        _estado["ultimo_ping"] = agora
+        _estado["banco_ok"] = erro is None
+        _estado["banco_erro"] = erro
+        if erro is None:
+            _estado["ultimo_ping_ok"] = agora
+            _estado["latencia_ping_ms"] = round((time.perf_counter() - inicio) * 1000, 2)
+    if erro and _estado.get("aquecido"):
+        logger.warning("Ping do MongoDB falhou: %s", erro)
+
+
+def _aquecer(app):
+    with app.app_context():
+        for nome, funcao in _tarefas:
+            inicio = time.perf_counter()
+            try:
+                funcao(app)
+                resultado = {"ok": True}
+            except Exception as e:
+                logger.exception("Falha no aquecimento '%s'.", nome)
+                resultado = {"ok": False, "erro": str(e)}
+            resultado["duracao_ms"] = round((time.perf_counter() - inicio) * 1000, 2)
+            with _lock:
+                _estado["aquecimento"][nome] = resultado
+    with _lock:
+        _estado["aquecido"] = True
+    logger.info("Aquecimento concluído.", extra={"dados": dict(_estado["aquecimento"])})
+
+
+def _executar(app, intervalo):
+    _aquecer(app)
+    while True:
+        _pingar()
+        time.sleep(intervalo)
+
+
+def iniciar(app):
+    """Inicia o aquecimento e o ping periódico neste processo (chamadas repetidas são ignoradas)."""
+    global _pid
+    if _pid == os.getpid():
+        return
+    with _lock:
+        if _pid == os.getpid():
+            return
+        _pid = os.getpid()
+        _estado.clear()
+        _estado.update(_estado_inicial())
+    threading.Thread(
+        target=_executar, args=(app, app.config["HEALTH_PING_INTERVALO_S"]), name='saude', daemon=True
+    ).start()
+
+
+def estado():
+    with _lock:
+        return {**_estado, "aquecimento": dict(_estado.get("aquecimento", {}))}
+
+
+def pronto(intervalo):
+    """Aquecido e com um ping bem-sucedido nos últimos 3 intervalos."""
+    atual = estado()
+    ultimo_ok = atual.get("ultimo_ping_ok")
+    return bool(
+        atual.get("aquecido") and atual.get("banco_ok")
+        and ultimo_ok is not None and time.time() - ultimo_ok <= 3 * intervalo
+    )
+
+
+@aquecimento('pool_mongo')
+def _aquecer_pool(app):
+    """Abre MONGO_MIN_POOL_SIZE conexões (ao menos uma) com pings simultâneos."""
+    conexoes = max(1, app.config["MONGO_MIN_POOL_SIZE"])
+    with ThreadPoolExecutor(max_workers=conexoes) as executor:
+        list(executor.map(lambda _: mongo.db.command('ping'), range(conexoes)))
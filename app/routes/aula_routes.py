@@ -6,13 +6,14 @@ from bson import ObjectId, json_util
 from flask_jwt_extended import get_jwt_identity, get_jwt
 import json
 from flask import Blueprint, request, jsonify
-import traceback
+import logging
 from flask_jwt_extended import get_jwt
 from datetime import datetime
 
 
 # Garante que o Blueprint está definido corretamente
 aula_bp = Blueprint('aula_bp', __name__)
+logger = logging.getLogger(__name__)
 
 @aula_bp.before_request
 def handle_aula_preflight():
@@ -28,60 +29,40 @@ def handle_aula_preflight():
 def _verificar_permissao_professor(turma_id):
     """
     Verifica se o usuário logado é o professor da turma ou um admin.
-    Versão com LOGS DE DIAGNÓSTICO para depuração.
+    Os detalhes da verificação são registrados no nível DEBUG.
     """
-    print("\n--- INICIANDO VERIFICAÇÃO DE PERMISSÃO ---")
     claims = get_jwt()
     
     if claims.get("perfil") == "admin":
-        print("[DEBUG] Usuário é ADMIN. Permissão concedida.")
-        print("--- FIM DA VERIFICAÇÃO ---")
         return True
 
     try:
         turma_obj_id = ObjectId(turma_id)
-        print(f"[DEBUG] ID da Turma a ser verificado: {turma_obj_id}")
     except Exception:
-        print(f"[ERRO] ID da Turma '{turma_id}' é inválido.")
-        print("--- FIM DA VERIFICAÇÃO ---")
+        logger.debug("Permissão negada: ID da turma '%s' é inválido.", turma_id)
         return False
 
-    turma = mongo.db.turmas.find_one({"_id": turma_obj_id})
+    turma = mongo.db.turmas.find_one({"_id": turma_obj_id}, {"professor_id": 1, "professor._id": 1})
     if not turma:
-        print(f"[ERRO] Turma com ID '{turma_obj_id}' não encontrada no banco de dados.")
-        print("--- FIM DA VERIFICAÇÃO ---")
+        logger.debug("Permissão negada: turma %s não encontrada.", turma_obj_id)
         return False
         
     id_professor_logado = get_jwt_identity()
-    print(f"[DEBUG] ID do Professor logado (do token JWT): {id_professor_logado}")
 
-    id_professor_na_turma = None
-    
-    # Tentativa 1: Busca pelo campo novo e correto 'professor_id'
-    if 'professor_id' in turma:
-        id_professor_na_turma = turma.get('professor_id')
-        print(f"[DEBUG] Encontrado campo 'professor_id': {id_professor_na_turma}")
-    
-    # Tentativa 2: Busca pelo formato antigo aninhado 'professor._id'
-    elif 'professor' in turma and isinstance(turma.get('professor'), dict):
-        id_professor_na_turma = turma.get('professor', {}).get('_id')
-        print(f"[DEBUG] Encontrado campo aninhado 'professor._id': {id_professor_na_turma}")
+    # Campo atual 'professor_id' ou o formato antigo aninhado 'professor._id'
+    id_professor_na_turma = turma.get('professor_id')
+    if id_professor_na_turma is None and isinstance(turma.get('professor'), dict):
+        id_professor_na_turma = turma['professor'].get('_id')
 
     if not id_professor_na_turma:
-        print("[ERRO] Não foi possível encontrar a referência do professor na turma (nem 'professor_id', nem 'professor._id').")
-        print("--- FIM DA VERIFICAÇÃO ---")
+        logger.debug("Permissão negada: turma %s sem referência ao professor.", turma_obj_id)
         return False
     
-    print(f"[DEBUG] ID do Professor na Turma (do banco): {id_professor_na_turma}")
-    
-    # Comparação final
     permissao_concedida = str(id_professor_na_turma) == id_professor_logado
-    if permissao_concedida:
-        print("[DEBUG] IDs correspondem. Permissão concedida.")
-    else:
-        print(f"[ERRO] IDs NÃO correspondem: Logado='{id_professor_logado}', Na Turma='{id_professor_na_turma}'. Acesso negado.")
-    
-    print("--- FIM DA VERIFICAÇÃO ---")
+    if not permissao_concedida:
+        logger.debug(
+            "Permissão negada: professor logado %s, professor da turma %s.", id_professor_logado, id_professor_na_turma
+        )
     return permissao_concedida
 
 
@@ -110,7 +91,7 @@ def registrar_presencas(aula_id):
         total_modificado = aula_service.marcar_presenca_lote(aula_id, lista_presencas)
         return jsonify({"mensagem": f"Presença registrada para {total_modificado} aluno(s).", "aula_status": "Realizada"}), 200
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Erro ao registrar presenças da aula %s.", aula_id)
         return jsonify({"mensagem": "Erro interno ao registrar presença.", "detalhes": str(e)}), 500
 
 @aula_bp.route('/', methods=['POST'])
@@ -207,8 +188,8 @@ def exportar_presenca(aula_id):
             download_name=nome_arquivo,
             mimetype=mimetype
         )
-    except Exception as e:
-        print(f"Erro ao gerar arquivo para aula {aula_id}: {e}")
+    except Exception:
+        logger.exception("Erro ao gerar arquivo %s para a aula %s.", formato, aula_id)
         return jsonify({"mensagem": "Ocorreu um erro interno ao gerar o arquivo."}), 500
 @aula_bp.route('/turma/<string:turma_id>/agendar', methods=['POST', 'OPTIONS'])
 @admin_required()
@@ -222,10 +203,7 @@ def agendar_novas_aulas(turma_id):
     except ValueError as e:
         return jsonify({"mensagem": str(e)}), 400
     except Exception as e:
-        # Este bloco irá capturar e imprimir o erro detalhado no terminal
-        print("!!!!!!!!!! ERRO AO AGENDAR AULAS !!!!!!!!!!")
-        traceback.print_exc() # Imprime o traceback completo
-        print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+        logger.exception("Erro ao agendar aulas da turma %s.", turma_id)
         return jsonify({"mensagem": "Erro interno ao agendar aulas.", "detalhes": str(e)}), 500
 
 @aula_bp.route('/historico', methods=['GET'])
@@ -265,7 +243,7 @@ def get_or_create_aula():
         return json.loads(json_util.dumps(aula)), 200
     except ValueError as e:
         return jsonify({"mensagem": str(e)}), 400
-    except Exception as e:
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Erro ao buscar ou criar aula da turma %s.", dados.get('turma_id'))
         return jsonify({"mensagem": "Erro interno ao buscar ou criar aula."}), 500
     
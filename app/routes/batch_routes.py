@@ -0,0 +1,121 @@
+"""
+/api/batch: várias leituras (GET) da API em uma única requisição HTTP.
+
+Cada sub-requisição passa pelo mapa de URLs e pelos hooks do Flask como uma requisição
+normal (métricas, logs, perfilador), mas o JWT é verificado uma vez só, no lote: o token
+decodificado é copiado para o `g` de cada sub-requisição e `role_required` confia nele
+(`g.lote_autenticado`). Com "paralelo": true, as sub-requisições rodam em um pool de
+BATCH_THREADS threads por processo; a ordem das respostas é sempre a do pedido.
+"""
+
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from flask import Blueprint, current_app, g, jsonify, request
+from app.decorators.auth_decorators import role_required
+
+batch_bp = Blueprint('batch_bp', __name__)
+logger = logging.getLogger(__name__)
+
+PREFIXO = '/api/'
+# Estado do flask_jwt_extended preenchido por verify_jwt_in_request
+ESTADO_JWT = ('_jwt_extended_jwt', '_jwt_extended_jwt_header', '_jwt_extended_jwt_user', '_jwt_extended_jwt_location')
+CABECALHOS_REPASSADOS = ('Authorization', 'X-Profile')
+
+_executor = None
+_pid = None
+_lock = threading.Lock()
+
+
+def _pool(threads):
+    """ThreadPoolExecutor do processo (recriado após o fork dos workers)."""
+    global _executor, _pid
+    with _lock:
+        if _pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='batch')
+            _pid = os.getpid()
+        return _executor
+
+
+def _validar(requisicoes, maximo):
+    """Lista de (id, caminho, query string) ou ValueError com a mensagem para o cliente."""
+    if not isinstance(requisicoes, list) or not requisicoes:
+        raise ValueError("Envie 'requisicoes' como uma lista não vazia.")
+    if len(requisicoes) > maximo:
+        raise ValueError(f"No máximo {maximo} requisições por lote.")
+
+    validas = []
+    for indice, item in enumerate(requisicoes):
+        if isinstance(item, str):
+            item = {"url": item}
+        if not isinstance(item, dict) or not isinstance(item.get("url"), str):
+            raise ValueError(f"Requisição {indice}: informe 'url'.")
+        if item.get("metodo", "GET").upper() != "GET":
+            raise ValueError(f"Requisição {indice}: apenas GET é permitido em lote.")
+        url = urlsplit(item["url"])
+        if url.scheme or url.netloc or not url.path.startswith(PREFIXO):
+            raise ValueError(f"Requisição {indice}: a url deve começar com {PREFIXO}.")
+        if url.path.rstrip('/') == request.path.rstrip('/'):
+            raise ValueError(f"Requisição {indice}: lotes não podem ser aninhados.")
+        validas.append((item.get("id", indice), url.path, url.query))
+    return validas
+
+
+def _executar(app, estado_jwt, cabecalhos, caminho, query):
+    """Despacha uma sub-requisição GET e devolve (status, corpo)."""
+    # app_context próprio: cada sub-requisição tem o seu `g`, mesmo na thread do lote
+    with app.app_context(), app.test_request_context(caminho, method='GET', query_string=query, headers=cabecalhos):
+        for nome, valor in estado_jwt.items():
+            setattr(g, nome, valor)
+        g.lote_autenticado = True
+        try:
+            resposta = app.full_dispatch_request()
+        except Exception:
+            logger.exception("Falha na sub-requisição %s do lote.", caminho)
+            return 500, {"mensagem": "Erro interno."}
+        corpo = resposta.get_data(as_text=True)
+        if resposta.is_json:
+            corpo = json.loads(corpo) if corpo else None
+        return resposta.status_code, corpo
+
+
+@batch_bp.route('/batch', methods=['POST'])
+@role_required(roles=['admin', 'professor', 'aluno'])
+def executar_lote():
+    """
+    Executa várias leituras de uma vez. Corpo:
+    {"requisicoes": [{"id": "turmas", "url": "/api/turmas/?x=1"}, ...], "paralelo": false}
+    (também aceita só as urls). Resposta: {"respostas": [{"id", "status", "corpo"}, ...]},
+    na ordem do pedido; cada item tem o seu status, o do lote é 200.
+    """
+    dados = request.get_json(silent=True) or {}
+    config = current_app.config
+    try:
+        requisicoes = _validar(dados.get("requisicoes"), config["BATCH_MAX_REQUISICOES"])
+    except ValueError as e:
+        return jsonify({"mensagem": str(e)}), 400
+
+    app = current_app._get_current_object()
+    estado_jwt = {nome: g.get(nome) for nome in ESTADO_JWT}
+    id_lote = g.get('request_id')
+    cabecalhos = {nome: request.headers[nome] for nome in CABECALHOS_REPASSADOS if nome in request.headers}
+
+    def despachar(indice, caminho, query):
+        sub_cabecalhos = {**cabecalhos, "X-Request-Id": f"{id_lote}.{indice}"} if id_lote else cabecalhos
+        return _executar(app, estado_jwt, sub_cabecalhos, caminho, query)
+
+    threads = config["BATCH_THREADS"]
+    if dados.get("paralelo") and threads > 0 and len(requisicoes) > 1:
+        futuros = [_pool(threads).submit(despachar, i, caminho, query) for i, (_, caminho, query) in enumerate(requisicoes)]
+        resultados = [futuro.result() for futuro in futuros]
+    else:
+        resultados = [despachar(i, caminho, query) for i, (_, caminho, query) in enumerate(requisicoes)]
+
+    return jsonify({"respostas": [
+        {"id": id_requisicao, "status": status, "corpo": corpo}
+        for (id_requisicao, _, _), (status, corpo) in zip(requisicoes, resultados)
+    ]}), 200
@@ -0,0 +1,24 @@
+from flask import Blueprint, request, jsonify
+from app.services import busca_service, projecao_service
+from app.decorators.auth_decorators import admin_required
+from bson import json_util
+import json
+
+busca_bp = Blueprint('busca_bp', __name__)
+
+@busca_bp.route('/busca', methods=['GET'])
+@admin_required()
+def buscar():
+    """
+    [ADMIN] Typeahead: alunos, professores, admins e turmas cujo nome (ou email) tem
+    palavras começando pelos termos de ?q=, sem acentos, em ordem de relevância.
+    Aceita ?limite=10 (até 50) e ?tipos=aluno,professor,admin,turma.
+    """
+    try:
+        limite = min(max(int(request.args.get('limite', 10)), 1), 50)
+        tipos = projecao_service.ler_lista(request.args.get('tipos'), busca_service.TIPOS, 'tipos')
+    except ValueError as e:
+        return jsonify({"mensagem": str(e)}), 400
+
+    resultados = busca_service.buscar(request.args.get('q', ''), limite, tipos)
+    return json.loads(json_util.dumps({"resultados": resultados})), 200
@@ -1,8 +1,10 @@
 # app/routes/dashboard_routes.py
 
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from app.decorators.auth_decorators import admin_required
-from app.services import dashboard_service
+from app.services import dashboard_service, risco_service
+from bson import json_util
+import json
 
 dashboard_bp = Blueprint('dashboard_bp', __name__)
 
@@ -16,4 +18,19 @@ def get_dashboard_stats():
     if summary_data is None:
         return jsonify({"mensagem": "Erro ao buscar dados do dashboard."}), 500
     
-    return jsonify(summary_data), 200
\ No newline at end of file
+    return jsonify(summary_data), 200
+
+@dashboard_bp.route('/alunos-em-risco', methods=['GET'])
+@admin_required()
+def get_alunos_em_risco():
+    """
+    [ADMIN] Lista os alunos em risco de evasão, do maior para o menor score.
+    Paginação por cursor: ?limite=20&apos=<proximo da página anterior>.
+    """
+    try:
+        limite = min(max(int(request.args.get('limite', 20)), 1), 100)
+        itens, proximo = risco_service.listar_alunos_em_risco(limite, request.args.get('apos'))
+    except ValueError as e:
+        return jsonify({"mensagem": str(e)}), 400
+
+    return json.loads(json_util.dumps({"itens": itens, "proximo": proximo})), 200
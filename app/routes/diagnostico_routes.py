@@ -0,0 +1,72 @@
+import hmac
+import os
+from flask import Blueprint, Response, request, jsonify, current_app, send_from_directory
+from app import mongo
+from app.observabilidade import metricas, consultas_lentas, perfilador
+from app.decorators.auth_decorators import admin_required
+from bson import json_util
+import json
+
+# Rotas de observabilidade da API (métricas, diagnósticos)
+diagnostico_bp = Blueprint('diagnostico_bp', __name__)
+
+def _renderizar_metricas():
+    return Response(metricas.renderizar(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+_renderizar_metricas_admin = admin_required()(_renderizar_metricas)
+
+@diagnostico_bp.route('/metrics', methods=['GET'])
+def get_metricas():
+    """
+    [ADMIN] Métricas do processo no formato de texto do Prometheus.
+    O coletor pode usar `Authorization: Bearer <METRICS_TOKEN>` em vez do JWT de um admin.
+    """
+    token = current_app.config["METRICS_TOKEN"]
+    cabecalho = request.headers.get('Authorization', '')
+    if token and hmac.compare_digest(cabecalho.encode(), f"Bearer {token}".encode()):
+        return _renderizar_metricas()
+    return _renderizar_metricas_admin()
+
+@diagnostico_bp.route('/diagnostico/consultas-lentas', methods=['GET'])
+@admin_required()
+def get_consultas_lentas():
+    """
+    [ADMIN] Consultas lentas mais recentes com o plano de execução (requer SLOW_QUERY_EXPLAIN).
+    Aceita ?limite=50.
+    """
+    try:
+        limite = min(int(request.args.get('limite', 50)), 500)
+    except ValueError:
+        return jsonify({"mensagem": "Parâmetro 'limite' inválido."}), 400
+    registros = consultas_lentas.listar(mongo.db, limite)
+    return json.loads(json_util.dumps(registros)), 200
+
+@diagnostico_bp.route('/diagnostico/perfis', methods=['GET'])
+@admin_required()
+def get_perfis():
+    """
+    [ADMIN] Lista os perfis (cProfile) gravados, do mais recente para o mais antigo.
+    """
+    arquivos = perfilador.listar(current_app.config['PROFILE_DIR'])
+    return json.loads(json_util.dumps(arquivos)), 200
+
+@diagnostico_bp.route('/diagnostico/perfis/<string:nome>', methods=['GET'])
+@admin_required()
+def baixar_perfil(nome):
+    """
+    [ADMIN] Baixa um arquivo .pstats. Com ?formato=texto, devolve o relatório do pstats
+    (aceita ?ordenacao=cumulative|tottime|calls e ?limite=40).
+    """
+    diretorio = current_app.config['PROFILE_DIR']
+    if not perfilador.nome_valido(nome) or not os.path.isfile(os.path.join(diretorio, nome)):
+        return jsonify({"mensagem": "Perfil não encontrado."}), 404
+
+    if request.args.get('formato') == 'texto':
+        ordenacao = request.args.get('ordenacao', 'cumulative')
+        if ordenacao not in ('cumulative', 'tottime', 'calls'):
+            return jsonify({"mensagem": "Ordenação inválida."}), 400
+        limite = request.args.get('limite', 40, type=int)
+        relatorio = perfilador.resumo_texto(os.path.join(diretorio, nome), ordenacao, limite)
+        return Response(relatorio, mimetype='text/plain; charset=utf-8')
+
+    return send_from_directory(diretorio, nome, as_attachment=True, mimetype='application/octet-stream')
@@ -3,11 +3,11 @@ from app.services import esporte_service
 from app.decorators.auth_decorators import admin_required, role_required
 from bson import json_util
 import json
-import traceback
-from app import mongo
+import logging
 
 # Cria o Blueprint para as rotas de esporte
 esporte_bp = Blueprint('esporte_bp', __name__)
+logger = logging.getLogger(__name__)
 
 @esporte_bp.before_request
 def handle_esporte_preflight():
@@ -59,29 +59,10 @@ def get_esportes_com_categorias():
     de suas categorias cadastradas.
     """
     try:
-        pipeline = [
-            {
-                "$lookup": {
-                    "from": "categorias",
-                    "localField": "_id",
-                    "foreignField": "esporte_id",
-                    "as": "categorias"
-                }
-            },
-            {
-                "$project": {
-                    "nome": 1,
-                    "categorias.nome": 1,
-                    "categorias._id": 1
-                }
-            }
-        ]
-        esportes = list(mongo.db.esportes.aggregate(pipeline))
+        esportes = esporte_service.listar_esportes_com_categorias()
         return json.loads(json_util.dumps(esportes)), 200
     except Exception as e:
-        print("!!!!!!!!!! ERRO AO BUSCAR ESPORTES COM CATEGORIAS !!!!!!!!!!")
-        traceback.print_exc()
-        print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+        logger.exception("Erro ao buscar esportes com categorias.")
         return jsonify({"mensagem": "Erro interno ao buscar esportes com categorias.", "detalhes": str(e)}), 500
 
 @esporte_bp.route('/<string:esporte_id>', methods=['GET'])
@@ -0,0 +1,83 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from app.services import frequencia_service
+from app.decorators.auth_decorators import admin_required, role_required
+from app import mongo
+from bson import ObjectId, json_util
+from datetime import datetime
+import json
+
+frequencia_bp = Blueprint('frequencia_bp', __name__)
+
+@frequencia_bp.before_request
+def handle_frequencia_preflight():
+    if request.method.upper() == 'OPTIONS':
+        return '', 204
+
+def _ler_periodo():
+    """Lê os parâmetros ?inicio=AAAA-MM-DD&fim=AAAA-MM-DD (opcionais)."""
+    periodo = []
+    for nome in ('inicio', 'fim'):
+        valor = request.args.get(nome)
+        periodo.append(datetime.strptime(valor, '%Y-%m-%d').date() if valor else None)
+    return periodo
+
+@frequencia_bp.route('/turma/<string:turma_id>', methods=['GET'])
+@role_required(roles=['admin', 'professor'])
+def get_frequencia_turma(turma_id):
+    """
+    [ADMIN, PROFESSOR] Taxa de presença e sequências de faltas de cada aluno da turma.
+    Aceita ?inicio=AAAA-MM-DD&fim=AAAA-MM-DD.
+    """
+    try:
+        inicio, fim = _ler_periodo()
+        turma = mongo.db.turmas.find_one({"_id": ObjectId(turma_id)}, {"professor_id": 1})
+    except ValueError:
+        return jsonify({"mensagem": "Parâmetros inválidos. Use AAAA-MM-DD para as datas."}), 400
+    except Exception:
+        return jsonify({"mensagem": "ID de turma inválido."}), 400
+
+    if not turma:
+        return jsonify({"mensagem": "Turma não encontrada."}), 404
+    if get_jwt().get("perfil") != "admin" and str(turma.get('professor_id')) != get_jwt_identity():
+        return jsonify({"mensagem": "Acesso negado."}), 403
+
+    resumo = frequencia_service.resumo_turma(turma_id, inicio, fim)
+    return json.loads(json_util.dumps(resumo)), 200
+
+@frequencia_bp.route('/aluno/<string:aluno_id>', methods=['GET'])
+@admin_required()
+def get_frequencia_aluno(aluno_id):
+    """
+    [ADMIN] Frequência de um aluno em cada uma das suas turmas.
+    Aceita ?inicio=AAAA-MM-DD&fim=AAAA-MM-DD.
+    """
+    try:
+        inicio, fim = _ler_periodo()
+        resumo = frequencia_service.resumo_aluno(aluno_id, inicio, fim)
+    except Exception:
+        return jsonify({"mensagem": "Parâmetros inválidos."}), 400
+    return json.loads(json_util.dumps(resumo)), 200
+
+@frequencia_bp.route('/faltas-consecutivas', methods=['GET'])
+@admin_required()
+def get_alunos_faltosos():
+    """
+    [ADMIN] Alunos com N ou mais faltas seguidas nas aulas mais recentes.
+    Aceita ?minimo=3 e ?turma_id=<id> (opcional).
+    """
+    try:
+        minimo = int(request.args.get('minimo', 3))
+        alunos = frequencia_service.alunos_com_faltas_consecutivas(minimo, request.args.get('turma_id'))
+    except Exception:
+        return jsonify({"mensagem": "Parâmetros inválidos."}), 400
+    return json.loads(json_util.dumps(alunos)), 200
+
+@frequencia_bp.route('/reconstruir', methods=['POST'])
+@admin_required()
+def reconstruir_indice_frequencia():
+    """
+    [ADMIN] Recria o índice de frequência a partir das presenças registradas.
+    """
+    total = frequencia_service.reconstruir_indice()
+    return jsonify({"mensagem": f"Índice de frequência reconstruído com {total} registro(s)."}), 200
@@ -1,28 +1,57 @@
-from flask import Blueprint, jsonify
-from app import mongo
+from flask import Blueprint, current_app, jsonify
 import datetime
 from app import timezone
+from app.observabilidade import saude
 
 # Cria um Blueprint. "health_check_bp" é o nome do blueprint.
 health_check_bp = Blueprint('health_check_bp', __name__)
 
+
+def _status_banco(estado):
+    if estado.get("banco_ok") is None:
+        return "verificando"
+    return "conectado" if estado["banco_ok"] else f"erro: {estado['banco_erro']}"
+
+
 @health_check_bp.route('/health', methods=['GET'])
 def health_check():
     """
     Verifica a saúde da API e a conexão com o banco de dados.
+    O status do banco vem do ping de fundo (não consulta o banco a cada chamada).
     """
-    try:
-        # O comando 'ping' é uma forma leve de verificar a conexão com o MongoDB
-        mongo.db.command('ping')
-        status_db = "conectado"
-    except Exception as e:
-        status_db = f"erro: {e}"
-
     agora = datetime.datetime.now(timezone).strftime('%d/%m/%Y %H:%M:%S')
 
     return jsonify({
         "status_api": "operacional",
-        "status_banco_dados": status_db,
+        "status_banco_dados": _status_banco(saude.estado()),
         "timestamp_servidor": agora,
         "timezone_servidor": str(timezone)
-    }), 200
\ No newline at end of file
+    }), 200
+
+
+@health_check_bp.route('/health/live', methods=['GET'])
+def liveness():
+    """
+    Liveness: o processo está respondendo. Não depende do banco, para que uma
+    indisponibilidade do MongoDB não faça o orquestrador reiniciar os workers.
+    """
+    return jsonify({"status": "vivo"}), 200
+
+
+@health_check_bp.route('/health/ready', methods=['GET'])
+def readiness():
+    """
+    Readiness: aquecimento concluído e último ping do banco recente e bem-sucedido.
+    Responde 503 enquanto o processo não deve receber tráfego.
+    """
+    estado = saude.estado()
+    pronto = saude.pronto(current_app.config["HEALTH_PING_INTERVALO_S"])
+    ultimo_ping = estado.get("ultimo_ping")
+    return jsonify({
+        "status": "pronto" if pronto else "indisponivel",
+        "aquecido": estado.get("aquecido", False),
+        "aquecimento": estado.get("aquecimento", {}),
+        "status_banco_dados": _status_banco(estado),
+        "latencia_ping_ms": estado.get("latencia_ping_ms"),
+        "segundos_desde_ping": round(datetime.datetime.now().timestamp() - ultimo_ping, 1) if ultimo_ping else None,
+    }), 200 if pronto else 503
@@ -0,0 +1,26 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import get_jwt_identity
+from app.services import professor_service
+from app.decorators.auth_decorators import role_required
+from app import timezone
+from bson import ObjectId, json_util
+from datetime import datetime
+import json
+
+professor_bp = Blueprint('professor_bp', __name__)
+
+@professor_bp.route('/hoje', methods=['GET'])
+@role_required(roles=['professor', 'admin'])
+def get_dia_do_professor():
+    """
+    [PROFESSOR] Turmas do professor logado, a aula de cada uma no dia (criada se preciso)
+    e os alunos com o status de presença. Aceita ?data=AAAA-MM-DD (padrão: hoje).
+    """
+    data_str = request.args.get('data')
+    try:
+        dia = datetime.strptime(data_str, '%Y-%m-%d').date() if data_str else datetime.now(timezone).date()
+    except ValueError:
+        return jsonify({"mensagem": "Formato de data inválido. Use AAAA-MM-DD."}), 400
+
+    resumo = professor_service.resumo_do_dia(ObjectId(get_jwt_identity()), dia)
+    return json.loads(json_util.dumps(resumo)), 200
@@ -0,0 +1,24 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from app.services import sincronizacao_service
+from app.decorators.auth_decorators import role_required
+from bson import json_util
+import json
+
+sync_bp = Blueprint('sync_bp', __name__)
+
+@sync_bp.route('/sync', methods=['GET'])
+@role_required(roles=['admin', 'professor', 'aluno'])
+def get_alteracoes():
+    """
+    Sincronização incremental: turmas, aulas, usuários e presências do escopo do usuário
+    alterados desde ?since=<token>, com as exclusões. Sem `since`, devolve a carga completa.
+    A resposta traz o próximo `token`; com `mais: true`, chame de novo antes de parar.
+    """
+    try:
+        resposta = sincronizacao_service.alteracoes(get_jwt_identity(), get_jwt().get("perfil"), request.args.get('since'))
+    except ValueError as e:
+        return jsonify({"mensagem": str(e)}), 400
+    except sincronizacao_service.MigracaoPendente as e:
+        return jsonify({"mensagem": str(e)}), 503
+    return json.loads(json_util.dumps(resposta)), 200
@@ -1,13 +1,14 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import get_jwt_identity
-from app.services import turma_service
+from app.services import projecao_service, turma_service
 from app.decorators.auth_decorators import admin_required, role_required
 from bson import json_util
 import json
-import traceback
+import logging
 
 # Cria o Blueprint para as rotas de turma
 turma_bp = Blueprint('turma_bp', __name__)
+logger = logging.getLogger(__name__)
 
 @turma_bp.before_request
 def handle_turma_preflight():
@@ -25,25 +26,25 @@ def criar_nova_turma():
     [ADMIN] Endpoint para criar uma nova turma.
     """
     dados = request.get_json()
-    print(f"DEBUG: Dados recebidos para criar turma: {dados}")
+    logger.debug("Dados recebidos para criar turma: %s", dados)
 
     try:
         turma_id = turma_service.criar_turma(dados)
         return jsonify({"mensagem": "Turma criada com sucesso!", "turma_id": str(turma_id)}), 201
     except ValueError as ve:
         # Erro de validação tratado no service, como "campos ausentes"
-        print(f"!!!!!!!!!! ERRO DE VALIDAÇÃO AO CRIAR TURMA !!!!!!!!!!\n{ve}")
+        logger.info("Erro de validação ao criar turma: %s", ve)
         return jsonify({"mensagem": str(ve)}), 400
     except Exception as e:
-        print(f"!!!!!!!!!! ERRO INTERNO AO CRIAR TURMA !!!!!!!!!!")
-        traceback.print_exc()
+        logger.exception("Erro interno ao criar turma.")
         return jsonify({"mensagem": f"Erro interno no servidor: {e}"}), 500
 
 @turma_bp.route('/', methods=['GET'])
 @admin_required()
 def obter_todas_turmas():
     """
-    [ADMIN] Lista turmas. Suporta filtro por esporte_id e categoria.
+    [ADMIN] Lista turmas. Suporta filtro por esporte_id e categoria,
+    ?fields= (campos da resposta) e ?expand=professor,esporte,alunos.
     """
     filtros = {}
     esporte_id = request.args.get('esporte_id')
@@ -54,10 +55,11 @@ def obter_todas_turmas():
     if categoria:
         filtros['categoria'] = categoria
 
-    if not filtros:
-        turmas = turma_service.listar_turmas()
-    else:
-        turmas = turma_service.listar_turmas_filtradas(filtros)
+    try:
+        campos, expandir = projecao_service.ler_opcoes(request.args, turma_service.CAMPOS, turma_service.EXPANSOES)
+        turmas = turma_service.listar_turmas(filtros or None, campos, expandir)
+    except ValueError as e:
+        return jsonify({"mensagem": str(e)}), 400
         
     # Usar json_util para serializar corretamente os tipos do MongoDB (ObjectId, etc.)
     return json.loads(json_util.dumps(turmas)), 200
@@ -67,18 +69,20 @@ def obter_todas_turmas():
 def obter_turma_por_id(turma_id):
     """
     [ADMIN] Endpoint para obter detalhes de uma turma específica.
+    Aceita ?fields= e ?expand= como a listagem.
     """
     try:
+        campos, expandir = projecao_service.ler_opcoes(request.args, turma_service.CAMPOS, turma_service.EXPANSOES)
         # ✅ CORREÇÃO APLICADA AQUI
         # O nome da função foi corrigido de 'encontrar_turma_por_id' para 'buscar_turma_por_id'.
-        turma = turma_service.buscar_turma_por_id(turma_id)
+        turma = turma_service.buscar_turma_por_id(turma_id, campos, expandir)
         if not turma:
             return jsonify({"mensagem": "Turma não encontrada."}), 404
         return json.loads(json_util.dumps(turma)), 200
     except ValueError as e:
         return jsonify({"mensagem": str(e)}), 400
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Erro ao buscar a turma %s.", turma_id)
         return jsonify({"mensagem": f"Erro interno no servidor: {e}"}), 500
 
 @turma_bp.route('/<string:turma_id>', methods=['PUT'])
@@ -97,7 +101,7 @@ def atualizar_turma_existente(turma_id):
     except ValueError as e:
         return jsonify({"mensagem": str(e)}), 400
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Erro ao atualizar a turma %s.", turma_id)
         return jsonify({"mensagem": f"Erro interno no servidor: {e}"}), 500
 
 @turma_bp.route('/<string:turma_id>', methods=['DELETE'])
@@ -110,11 +114,30 @@ def deletar_turma_existente(turma_id):
     except ValueError as e:
         return jsonify({"mensagem": str(e)}), 404
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Erro ao deletar a turma %s.", turma_id)
         return jsonify({"mensagem": f"Erro interno no servidor: {e}"}), 500
 
 # --- Rotas específicas para gerenciar alunos em uma turma ---
 
+@turma_bp.route('/matriculas', methods=['POST'])
+@admin_required()
+def mover_alunos_em_lote():
+    """
+    [ADMIN] Move vários alunos entre turmas de uma só vez.
+    Corpo: {"movimentos": [{"aluno_id": "...", "turma_id": "..." ou null}]}
+    """
+    dados = request.get_json()
+    if not dados or not isinstance(dados.get('movimentos'), list):
+        return jsonify({"mensagem": "O campo 'movimentos' deve ser uma lista."}), 400
+    try:
+        resumo = turma_service.mover_alunos_em_lote(dados['movimentos'])
+        return jsonify({"mensagem": "Matrículas atualizadas com sucesso.", **resumo}), 200
+    except ValueError as e:
+        return jsonify({"mensagem": str(e)}), 400
+    except Exception as e:
+        logger.exception("Erro ao mover alunos entre turmas.")
+        return jsonify({"mensagem": f"Erro interno no servidor: {e}"}), 500
+
 @turma_bp.route('/<string:turma_id>/alunos', methods=['POST'])
 @admin_required()
 def adicionar_aluno_na_turma(turma_id):
@@ -141,8 +164,12 @@ def remover_aluno_da_turma(turma_id, aluno_id):
 @role_required(roles=['professor', 'admin'])
 def get_minhas_turmas():
     """
-    Retorna apenas as turmas associadas ao professor logado.
+    Retorna apenas as turmas associadas ao professor logado (aceita ?fields= e ?expand=).
     """
+    try:
+        campos, expandir = projecao_service.ler_opcoes(request.args, turma_service.CAMPOS, turma_service.EXPANSOES)
+    except ValueError as e:
+        return jsonify({"mensagem": str(e)}), 400
     id_professor_logado = get_jwt_identity()
-    turmas = turma_service.listar_turmas_por_professor(id_professor_logado)
+    turmas = turma_service.listar_turmas_por_professor(id_professor_logado, campos, expandir)
     return json.loads(json_util.dumps(turmas)), 200
\ No newline at end of file
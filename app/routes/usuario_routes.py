@@ -1,6 +1,6 @@
 from flask import Blueprint, jsonify, request
 from app.decorators.auth_decorators import admin_required
-from app.services import usuario_service
+from app.services import usuario_service, importacao_service, projecao_service
 from bson import json_util
 import json
 from bson import ObjectId
@@ -9,6 +9,9 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 
 usuario_bp = Blueprint('usuario_bp', __name__)
 
+# Qualquer um destes na query string torna a listagem de usuários paginada
+PARAMETROS_DE_PAGINACAO = ('limite', 'apos', 'pagina', 'ordem', 'busca')
+
 def formatar_usuario(usuario):
     """Função utilitária para formatar a saída do usuário para JSON."""
     if not usuario:
@@ -26,7 +29,7 @@ def formatar_usuario(usuario):
 @jwt_required()
 def obter_perfil_pessoal():
     usuario_id_atual = get_jwt_identity()
-    usuario = usuario_service.encontrar_usuario_por_id(usuario_id_atual) # Supondo que esta função exista
+    usuario = usuario_service.encontrar_usuario_por_id(usuario_id_atual)
     if not usuario:
         return jsonify({"mensagem": "Usuário não encontrado."}), 404
     return json.loads(json_util.dumps(usuario)), 200
@@ -53,11 +56,43 @@ def criar_novo_usuario():
         return jsonify({"mensagem": "Erro interno.", "erro": str(e)}), 500
 
 
+@usuario_bp.route('/importar', methods=['POST'])
+@admin_required()
+def importar_usuarios():
+    """
+    [ADMIN] Importa usuários de uma planilha (.csv ou .xlsx) enviada no campo 'arquivo'.
+    Colunas: nome_completo, email, senha, perfil, data_nascimento, telefone, responsavel, turma_id.
+    O campo de formulário opcional 'turma_id' matricula os alunos sem turma na linha.
+    """
+    arquivo = request.files.get('arquivo')
+    if not arquivo or not arquivo.filename:
+        return jsonify({"mensagem": "Envie a planilha no campo 'arquivo'."}), 400
+
+    try:
+        relatorio = importacao_service.importar_usuarios(
+            arquivo.read(), arquivo.filename, request.form.get('turma_id')
+        )
+    except ValueError as e:
+        return jsonify({"mensagem": str(e)}), 400
+    except Exception as e:
+        return jsonify({"mensagem": "Erro interno.", "erro": str(e)}), 500
+
+    status_code = 201 if relatorio['criados'] else 400
+    return json.loads(json_util.dumps(relatorio)), status_code
+
+
 @usuario_bp.route('/', methods=['GET'])
 @admin_required()
 def obter_todos_usuarios():
     """
-    [ADMIN] Lista todos os usuários do sistema, com suporte a filtros.
+    [ADMIN] Lista todos os usuários do sistema, com suporte a filtros,
+    ?fields= (campos da resposta) e ?expand=turmas.
+
+    Com ?limite, ?apos, ?pagina, ?ordem ou ?busca, a lista é paginada:
+    ?ordem=-data_criacao,nome  ?busca=joao (prefixo do nome, sem acentos)
+    ?limite=50&apos=<proximo da página anterior> (ou &pagina=N).
+    Resposta: {"itens", "proximo"}, mais "total" e "contagens" por perfil e status de
+    pagamento na primeira página (sem ?apos).
     """
     filtros = {}
     perfil_query = request.args.get('perfil')
@@ -67,17 +102,43 @@ def obter_todos_usuarios():
     if pagamento_query:
         filtros['status_pagamento'] = pagamento_query
 
-    usuarios = usuario_service.listar_usuarios(filtros)
-    
-    # --- CORREÇÃO PRINCIPAL APLICADA AQUI ---
-    # Usamos json_util para serializar a lista inteira, preservando o formato do ObjectId
-    return json.loads(json_util.dumps(usuarios)), 200
+    try:
+        campos, expandir = projecao_service.ler_opcoes(request.args, usuario_service.CAMPOS, usuario_service.EXPANSOES)
+        if not any(p in request.args for p in PARAMETROS_DE_PAGINACAO):
+            usuarios = usuario_service.listar_usuarios(filtros, campos, expandir)
+            # --- CORREÇÃO PRINCIPAL APLICADA AQUI ---
+            # Usamos json_util para serializar a lista inteira, preservando o formato do ObjectId
+            return json.loads(json_util.dumps(usuarios)), 200
+
+        if request.args.get('busca'):
+            filtros['busca'] = request.args['busca']
+        limite = min(max(int(request.args.get('limite', 50)), 1), 200)
+        pagina = int(request.args['pagina']) if request.args.get('pagina') else None
+        if pagina is not None and pagina < 1:
+            raise ValueError("O parâmetro 'pagina' começa em 1.")
+        apos = request.args.get('apos')
+        itens, proximo = usuario_service.paginar_usuarios(
+            filtros, request.args.get('ordem'), limite, apos, pagina, campos, expandir
+        )
+    except ValueError as e:
+        return jsonify({"mensagem": str(e)}), 400
+
+    resposta = {"itens": itens, "proximo": proximo}
+    if not apos:
+        contagens = usuario_service.contar_usuarios(filtros)
+        resposta["total"] = contagens.pop("total")
+        resposta["contagens"] = contagens
+    return json.loads(json_util.dumps(resposta)), 200
 
 
 @usuario_bp.route('/<string:usuario_id>', methods=['GET'])
 @admin_required()
 def obter_usuario_por_id(usuario_id):
-    usuario = usuario_service.encontrar_usuario_por_id(usuario_id) # Supondo que esta função exista
+    try:
+        campos, expandir = projecao_service.ler_opcoes(request.args, usuario_service.CAMPOS, usuario_service.EXPANSOES)
+    except ValueError as e:
+        return jsonify({"mensagem": str(e)}), 400
+    usuario = usuario_service.encontrar_usuario_por_id(usuario_id, campos, expandir)
     if not usuario:
         return jsonify({"mensagem": "Usuário não encontrado."}), 404
     return json.loads(json_util.dumps(usuario)), 200
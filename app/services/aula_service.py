@@ -6,6 +6,9 @@ from datetime import datetime, time
 import calendar
 from pymongo import UpdateOne
 from flask import current_app
+from app.services import busca_service, chamada_service, frequencia_service, referencia_service, risco_service, sincronizacao_service
+
+DIAS_DA_SEMANA = ('segunda', 'terca', 'quarta', 'quinta', 'sexta', 'sabado', 'domingo')
 
 # --- FUNÇÕES DE LÓGICA DE NEGÓCIO ---
 
@@ -18,7 +21,7 @@ def agendar_aulas_para_turma(turma_id):
         turma_obj_id = ObjectId(turma_id)
         turma = mongo.db.turmas.find_one({"_id": turma_obj_id})
         if not turma or not turma.get('horarios'):
-            current_app.logger.warning(f"Turma {turma_id} não encontrada ou sem horários.")
+            current_app.logger.warning("Turma %s não encontrada ou sem horários.", turma_id)
             return 0
 
         dias_semana_map = {
@@ -50,6 +53,7 @@ def agendar_aulas_para_turma(turma_id):
                         update = {
                             "$setOnInsert": {
                                 "turma_id": turma_obj_id,
+                                "professor_id": turma.get('professor_id'),
                                 "data": data_aula,
                                 "status": "agendada", # Padronizando para minúsculas
                                 "data_criacao": datetime.now(timezone)
@@ -57,19 +61,21 @@ def agendar_aulas_para_turma(turma_id):
                         }
                         operacoes.append(UpdateOne(filtro, update, upsert=True))
                     except (ValueError, TypeError) as e:
-                        current_app.logger.error(f"Erro ao processar horário para turma {turma_id}: {e}")
+                        current_app.logger.error("Erro ao processar horário para turma %s: %s", turma_id, e)
                         continue
         
         if not operacoes:
             return 0
             
         resultado = mongo.db.aulas.bulk_write(operacoes)
+        # Só as aulas criadas entram na sincronização; as já existentes ficam intactas
+        sincronizacao_service.carimbar_inseridos('aulas', resultado.upserted_ids.values())
         aulas_criadas = resultado.upserted_count
-        current_app.logger.info(f"{aulas_criadas} nova(s) aula(s) agendada(s) para a turma {turma_id}.")
+        current_app.logger.info("%s nova(s) aula(s) agendada(s) para a turma %s.", aulas_criadas, turma_id)
         return aulas_criadas
         
     except Exception as e:
-        current_app.logger.error(f"Erro geral ao agendar aulas para turma {turma_id}: {e}")
+        current_app.logger.exception("Erro geral ao agendar aulas para turma %s.", turma_id)
         raise
 
 def buscar_ou_criar_aula_por_data(turma_id, data_aula):
@@ -111,54 +117,122 @@ def buscar_ou_criar_aula_por_data(turma_id, data_aula):
     except (ValueError, TypeError):
         raise ValueError(f"Formato de hora inválido ('{hora_inicio_str}') na turma {turma_id}.")
 
-    nova_aula = {
+    nova_aula = sincronizacao_service.novo_documento({
         "turma_id": turma_obj_id,
+        "professor_id": turma.get('professor_id'),
         "data": data_aula_com_hora,
         "status": "agendada",
         "data_criacao": datetime.now(timezone)
-    }
+    })
     resultado = mongo.db.aulas.insert_one(nova_aula)
     
     return mongo.db.aulas.find_one({"_id": resultado.inserted_id})
 
 
+def criar_aulas_do_dia(turmas, dia):
+    """
+    Cria em lote as aulas de `dia` para as turmas que têm horário nesse dia da semana
+    (uma aula por turma, no primeiro horário do dia, como em buscar_ou_criar_aula_por_data).
+    As turmas devem trazer `horarios` e `professor_id`, e não devem ter aula no dia.
+    Retorna {turma_id: aula}.
+    """
+    dia_semana = DIAS_DA_SEMANA[dia.weekday()]
+    novas = {}
+    for turma in turmas:
+        horario = next((h for h in turma.get('horarios', []) if h and h.get('dia_semana') == dia_semana), None)
+        try:
+            hora, minuto = map(int, horario.get('hora_inicio').split(':'))
+            data_aula = timezone.localize(datetime.combine(dia, time(hora, minuto)))
+        except (AttributeError, ValueError, TypeError):
+            continue  # sem horário válido no dia
+        novas[turma['_id']] = {
+            "turma_id": turma['_id'],
+            "professor_id": turma.get('professor_id'),
+            "data": data_aula,
+            "status": "agendada",
+        }
+    if not novas:
+        return {}
+
+    agora = datetime.now(timezone)
+    operacoes = [
+        UpdateOne(
+            {"turma_id": aula["turma_id"], "data": aula["data"]},
+            {"$setOnInsert": {**aula, "data_criacao": agora}},
+            upsert=True
+        )
+        for aula in novas.values()
+    ]
+    resultado = mongo.db.aulas.bulk_write(operacoes, ordered=False)
+    sincronizacao_service.carimbar_inseridos('aulas', resultado.upserted_ids.values())
+
+    aulas = list(novas.values())
+    for indice, aula_id in resultado.upserted_ids.items():
+        aulas[indice]["_id"] = aula_id
+    # Aulas criadas ao mesmo tempo por outra requisição (o upsert apenas as encontrou)
+    existentes = [aula for aula in aulas if "_id" not in aula]
+    if existentes:
+        encontradas = mongo.db.aulas.find({"$or": [{"turma_id": a["turma_id"], "data": a["data"]} for a in existentes]})
+        for aula in encontradas:
+            novas[aula["turma_id"]] = aula
+    current_app.logger.info("%s aula(s) criada(s) para %s.", len(resultado.upserted_ids), dia)
+    return novas
+
+
+def _a_partir_de_hoje():
+    return {"$gte": timezone.localize(datetime.combine(datetime.now(timezone).date(), time.min))}
+
+
+def atualizar_professor_das_aulas(turmas_ids, professor_id):
+    """
+    Copia o professor da turma (ou o remove, com None) para as aulas de hoje em diante.
+    As aulas passadas mantêm quem as ministrou.
+    """
+    if not turmas_ids:
+        return
+    filtro = {"turma_id": {"$in": list(turmas_ids)}, "data": _a_partir_de_hoje()}
+    atualizacao = {"$set": {"professor_id": professor_id}} if professor_id else {"$unset": {"professor_id": ""}}
+    mongo.db.aulas.update_many(filtro, sincronizacao_service.carimbar(atualizacao))
+
+
+def desvincular_professor_das_aulas(professor_id):
+    """Remove o professor das suas aulas de hoje em diante (professor desativado)."""
+    mongo.db.aulas.update_many(
+        {"professor_id": professor_id, "data": _a_partir_de_hoje()},
+        sincronizacao_service.carimbar({"$unset": {"professor_id": ""}})
+    )
+
+
+def preencher_professor_nas_aulas():
+    """Grava o professor da turma nas aulas que ainda não o têm (migração). Retorna o total."""
+    total = 0
+    for turma in mongo.db.turmas.find({"professor_id": {"$exists": True}}, {"professor_id": 1}):
+        total += mongo.db.aulas.update_many(
+            {"turma_id": turma["_id"], "professor_id": {"$exists": False}},
+            sincronizacao_service.carimbar({"$set": {"professor_id": turma["professor_id"]}})
+        ).modified_count
+    return total
+
+
 def marcar_presenca_lote(aula_id, lista_presencas):
     """Cria ou atualiza múltiplos registros de presença para uma aula."""
     aula_obj_id = ObjectId(aula_id)
     agora = datetime.now(timezone)
-    
-    operacoes = []
+
+    registros = []
     for p in lista_presencas:
         if not p.get('aluno_id') or not p.get('status'):
             continue  # Ignora entradas inválidas
+        registros.append((ObjectId(p['aluno_id']), p['status']))
 
-        operacao = UpdateOne(
-            {"aula_id": aula_obj_id, "aluno_id": ObjectId(p['aluno_id'])},
-            {
-                "$set": {
-                    "status": p['status'], 
-                    "data_modificacao": agora
-                },
-                "$setOnInsert": {
-                    "data_registro": agora
-                }
-            },
-            upsert=True
-        )
-        operacoes.append(operacao)
-        
-
-    if not operacoes:
+    if not registros:
         return 0
 
-    resultado = mongo.db.presencas.bulk_write(operacoes)
-    
-    mongo.db.aulas.update_one(
-        {"_id": aula_obj_id},
-        {"$set": {"status": "realizada", "data_modificacao": agora}}
-    )
-    
-    return resultado.upserted_count + resultado.modified_count
+    total, aula = chamada_service.gravar_presencas(aula_obj_id, registros, agora, chamada_service.STATUS_AULA_REALIZADA)
+    if aula:
+        frequencia = frequencia_service.registrar_chamada(aula.get('turma_id'), aula.get('data'), registros, aula_obj_id)
+        risco_service.atualizar_frequencia(aula.get('turma_id'), frequencia)
+    return total
 
 # --- FUNÇÕES DE CONSULTA ---
 
@@ -174,18 +248,22 @@ def listar_aulas_por_data(data_filtro):
         {"$match": {"data": {"$gte": inicio_dia, "$lte": fim_dia}}},
         {"$lookup": {"from": "turmas", "localField": "turma_id", "foreignField": "_id", "as": "turma"}},
         {"$unwind": "$turma"},
-        {"$lookup": {"from": "esportes", "localField": "turma.esporte_id", "foreignField": "_id", "as": "esporte"}},
-        {"$unwind": "$esporte"},
-        {"$lookup": {"from": "presencas", "localField": "_id", "foreignField": "aula_id", "as": "presencas"}},
+        *chamada_service.estagios_presencas("presencas"),
         {
             "$project": {
-                "data": 1, "status": 1, "turma_nome": "$turma.nome", "esporte_nome": "$esporte.nome",
+                "data": 1, "status": 1, "turma_nome": "$turma.nome", "esporte_id": "$turma.esporte_id",
                 "total_alunos_na_turma": {"$size": "$turma.alunos_ids"},
                 "total_presentes": {"$size": {"$filter": {"input": "$presencas", "as": "p", "cond": {"$eq": ["$$p.status", "presente"]}}}}
             }
         }
     ]
-    return list(mongo.db.aulas.aggregate(pipeline))
+    aulas = []
+    for aula in mongo.db.aulas.aggregate(pipeline):
+        esporte = referencia_service.esporte(aula.pop('esporte_id', None))
+        if esporte:  # aulas de turmas sem esporte ficam de fora, como no $unwind anterior
+            aula['esporte_nome'] = esporte.get('nome')
+            aulas.append(aula)
+    return aulas
 
 def buscar_detalhes_aula(aula_id):
     """
@@ -197,14 +275,13 @@ def buscar_detalhes_aula(aula_id):
         # Join com Turmas
         {"$lookup": {"from": "turmas", "localField": "turma_id", "foreignField": "_id", "as": "turma_info"}},
         {"$unwind": "$turma_info"},
-        # Join com Esportes a partir da turma
-        {"$lookup": {"from": "esportes", "localField": "turma_info.esporte_id", "foreignField": "_id", "as": "esporte_info"}},
-        {"$unwind": {"path": "$esporte_info", "preserveNullAndEmptyArrays": True}},
         # Join com Professor a partir da turma
         {"$lookup": {"from": "usuarios", "localField": "turma_info.professor_id", "foreignField": "_id", "as": "professor_info"}},
         {"$unwind": {"path": "$professor_info", "preserveNullAndEmptyArrays": True}},
         # Join com os Alunos da turma
         {"$lookup": {"from": "usuarios", "localField": "turma_info.alunos_ids", "foreignField": "_id", "as": "alunos_info"}},
+        # Registros de presença da aula (coleção `presencas` ou mapa `chamada`)
+        *chamada_service.estagios_presencas("presencas"),
         # Projeta os campos necessários no formato final
         {
             "$project": {
@@ -212,7 +289,7 @@ def buscar_detalhes_aula(aula_id):
                 "status": 1,
                 "turma_id": 1,
                 "turma_nome": "$turma_info.nome",
-                "esporte": "$esporte_info.nome",
+                "esporte_id": "$turma_info.esporte_id",
                 "categoria": "$turma_info.categoria",
                 "professor": "$professor_info.nome_completo",
                 "alunos": {
@@ -240,55 +317,40 @@ def buscar_detalhes_aula(aula_id):
                     }
                 }
             }
-        },
-        {"$lookup": {"from": "presencas", "localField": "_id", "foreignField": "aula_id", "as": "presencas_gerais"}},
-        {
-            "$addFields": {
-                "alunos": {
-                    "$map": {
-                        "input": "$alunos",
-                        "as": "aluno",
-                        "in": {
-                            "_id": "$$aluno._id",
-                            "nome_completo": "$$aluno.nome_completo",
-                            "presenca": {
-                                "$let": {
-                                    "vars": {
-                                        "presenca_aluno": {
-                                            "$filter": {
-                                                "input": "$presencas_gerais",
-                                                "as": "p",
-                                                "cond": {"$eq": ["$$p.aluno_id", "$$aluno._id"]}
-                                            }
-                                        }
-                                    },
-                                    "in": {"$arrayElemAt": ["$$presenca_aluno", 0]}
-                                }
-                            }
-                        }
-                    }
-                }
-            }
         }
     ]
     resultado = list(mongo.db.aulas.aggregate(pipeline))
-    
-    return resultado[0] if resultado else None
+    if not resultado:
+        return None
+
+    # Nome do esporte a partir do cache de referência
+    aula = resultado[0]
+    esporte = referencia_service.esporte(aula.pop('esporte_id', None))
+    if esporte and 'nome' in esporte:
+        aula['esporte'] = esporte['nome']
+    return aula
 def listar_historico_aulas(data_filtro=None, nome_turma=None):
     """
     Busca no banco de dados um histórico de aulas com base nos filtros.
     Se nenhum filtro for fornecido, retorna apenas as aulas já realizadas.
+    `nome_turma` casa com as turmas cujo nome tem palavras começando pelos termos
+    informados, sem acentos nem maiúsculas (índice busca_chaves de turmas).
     """
     pipeline = []
     match_stage = {}
 
     if not data_filtro and not nome_turma:
-        match_stage['status'] = 'Realizada'
+        # 'realizada' em minúsculas: aulas com chamada em lote gravada antes da constante
+        match_stage['status'] = {'$in': [chamada_service.STATUS_AULA_REALIZADA, 'realizada']}
     
     if data_filtro:
         inicio_dia = timezone.localize(datetime.combine(data_filtro.date(), time.min))
         fim_dia = timezone.localize(datetime.combine(data_filtro.date(), time.max))
         match_stage['data'] = {'$gte': inicio_dia, '$lte': fim_dia}
+
+    if nome_turma:
+        # Resolve o nome nas turmas antes: o $match em aulas usa o índice turma_data
+        match_stage['turma_id'] = {'$in': busca_service.ids_de_turmas(nome_turma)}
     
     if match_stage:
         pipeline.append({"$match": match_stage})
@@ -299,14 +361,9 @@ def listar_historico_aulas(data_filtro=None, nome_turma=None):
         {"$unwind": "$turma_info"}
     ])
 
-    if nome_turma:
-        pipeline.append({
-            "$match": {"turma_info.nome": {"$regex": nome_turma, "$options": "i"}}
-        })
-        
     # Adiciona junção com presenças e projeta os dados finais
     pipeline.extend([
-        {"$lookup": {"from": "presencas", "localField": "_id", "foreignField": "aula_id", "as": "presencas"}},
+        *chamada_service.estagios_presencas("presencas"),
         {
             "$project": {
                 "_id": 1, "data": 1, "status": 1,
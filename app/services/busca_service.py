@@ -0,0 +1,149 @@
+# app/services/busca_service.py
+"""
+Busca por nome sem acentos (João = joao) para o typeahead e os filtros por nome.
+
+Normalização: minúsculas, sem acentos e com espaços simples. Os serviços gravam a forma
+normalizada ao lado do original (ex.: `usuarios.nome_normalizado`, usada na ordenação).
+
+Chaves de busca: cada documento pesquisável guarda em `busca_chaves` os prefixos de cada
+palavra do seu texto ("joao silva" → j, jo, joa, joao, s, si, ...), em um índice
+multikey. Uma consulta vira um $all com os termos digitados, cada um um prefixo exato:
+a busca usa o índice em vez de um $regex que varre a coleção. As chaves são gravadas a
+cada escrita (usuario_service, turma_service) e recalculadas por `flask indexar-busca`.
+- usuarios: palavras de nome_completo e da parte local do email;
+- turmas: palavras do nome.
+
+Os candidatos (até CANDIDATOS por coleção) são ordenados aqui por relevância: nome igual à
+consulta, nome começando pela consulta, termos que são palavras inteiras e nomes mais curtos.
+"""
+
+import re
+import unicodedata
+
+from pymongo import UpdateOne
+
+from app import mongo
+
+CAMPO = 'busca_chaves'
+TAMANHO_MAXIMO_TERMO = 15
+CANDIDATOS = 200
+TIPOS = ('aluno', 'professor', 'admin', 'turma')
+
+
+def normalizar(texto):
+    """Minúsculas, sem acentos e com espaços simples: ' Antônio  JOSÉ' → 'antonio jose'."""
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return ' '.join(sem_acentos.lower().split())
+
+
+def filtro_prefixo(campo, texto):
+    """Filtro por prefixo ancorado em um campo normalizado (usa o índice do campo)."""
+    return {campo: {"$regex": f"^{re.escape(normalizar(texto))}"}}
+
+
+# --- CHAVES ---
+
+def termos(texto):
+    """Palavras normalizadas do texto (letras e dígitos), cortadas em TAMANHO_MAXIMO_TERMO."""
+    return [termo[:TAMANHO_MAXIMO_TERMO] for termo in re.findall(r'[a-z0-9]+', normalizar(texto))]
+
+
+def chaves(*textos):
+    """Prefixos de todas as palavras dos textos, sem repetição."""
+    return sorted({termo[:fim] for texto in textos for termo in termos(texto) for fim in range(1, len(termo) + 1)})
+
+
+def chaves_usuario(nome_completo, email):
+    return chaves(nome_completo, (email or '').split('@')[0])
+
+
+def chaves_turma(nome):
+    return chaves(nome)
+
+
+def filtro_termos(texto):
+    """
+    Filtro de `busca_chaves` com todos os termos do texto, ou None se não houver termos.
+    O termo mais longo vai primeiro: é o mais seletivo para os limites do índice.
+    """
+    termos_busca = sorted(set(termos(texto)), key=len, reverse=True)
+    return {CAMPO: {"$all": termos_busca}} if termos_busca else None
+
+
+def ids_de_turmas(texto):
+    """_ids das turmas cujo nome tem palavras começando por todos os termos do texto."""
+    filtro = filtro_termos(texto)
+    if filtro is None:
+        return []
+    return [turma["_id"] for turma in mongo.db.turmas.find(filtro, {"_id": 1})]
+
+
+def indexar_existentes():
+    """Recalcula `busca_chaves` de todos os usuários e turmas (migração). Retorna {colecao: total}."""
+    fontes = {
+        'usuarios': ({"nome_completo": 1, "email": 1}, lambda d: chaves_usuario(d.get("nome_completo"), d.get("email"))),
+        'turmas': ({"nome": 1}, lambda d: chaves_turma(d.get("nome"))),
+    }
+    totais = {}
+    for colecao, (projecao, calcular) in fontes.items():
+        operacoes = [UpdateOne({"_id": d["_id"]}, {"$set": {CAMPO: calcular(d)}}) for d in mongo.db[colecao].find({}, projecao)]
+        for inicio in range(0, len(operacoes), 1000):
+            mongo.db[colecao].bulk_write(operacoes[inicio:inicio + 1000], ordered=False)
+        totais[colecao] = len(operacoes)
+    return totais
+
+
+# --- BUSCA ---
+
+def _pontuar(consulta, termos_busca, nome):
+    nome = normalizar(nome)
+    palavras = nome.split()
+    pontos = 0
+    if nome == consulta:
+        pontos += 100
+    elif nome.startswith(consulta):
+        pontos += 50
+    for termo in termos_busca:
+        if termo in palavras:
+            pontos += 10
+        elif any(palavra.startswith(termo) for palavra in palavras):
+            pontos += 5  # sem pontos: o termo casou só com o email
+    if palavras and termos_busca and palavras[0].startswith(termos_busca[0]):
+        pontos += 5
+    return pontos, nome
+
+
+def buscar(texto, limite=10, tipos=None):
+    """
+    Alunos, professores, admins (ativos) e turmas cujo nome (ou email) tem palavras
+    começando por todos os termos de `texto`, em ordem de relevância.
+    Cada resultado: {"tipo", "_id", "nome", "detalhe"} (email do usuário ou categoria da turma).
+    """
+    filtro = filtro_termos(texto)
+    tipos = tuple(tipos or TIPOS)
+    if filtro is None:
+        return []
+
+    resultados = []
+    perfis = [tipo for tipo in tipos if tipo != 'turma']
+    if perfis:
+        for usuario in mongo.db.usuarios.find(
+            {**filtro, "ativo": True, "perfil": {"$in": perfis}},
+            {"nome_completo": 1, "email": 1, "perfil": 1}
+        ).limit(CANDIDATOS):
+            resultados.append({"tipo": usuario.get("perfil"), "_id": usuario["_id"],
+                               "nome": usuario.get("nome_completo"), "detalhe": usuario.get("email")})
+    if 'turma' in tipos:
+        for turma in mongo.db.turmas.find(filtro, {"nome": 1, "categoria": 1}).limit(CANDIDATOS):
+            resultados.append({"tipo": "turma", "_id": turma["_id"],
+                               "nome": turma.get("nome"), "detalhe": turma.get("categoria")})
+
+    consulta = normalizar(texto)
+    termos_busca = termos(texto)
+
+    def relevancia(resultado):
+        pontos, nome = _pontuar(consulta, termos_busca, resultado["nome"])
+        return -pontos, len(nome), nome
+
+    return sorted(resultados, key=relevancia)[:limite]
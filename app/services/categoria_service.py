@@ -1,8 +1,11 @@
 from app import mongo
 from bson import ObjectId
+from app.cache.resultados import em_cache
+from app.services import referencia_service
 
 def listar_categorias_por_esporte(esporte_id):
-    return list(mongo.db.categorias.find({"esporte_id": ObjectId(esporte_id)}).sort("nome"))
+    categorias = referencia_service.listar_categorias(ObjectId(esporte_id))
+    return sorted(categorias, key=lambda c: c.get('nome') or '')
 
 
 def criar_categoria(dados):
@@ -14,6 +17,7 @@ def criar_categoria(dados):
         "esporte_id": ObjectId(dados['esporte_id'])
     }
     resultado = mongo.db.categorias.insert_one(nova_categoria)
+    referencia_service.invalidar()
     return resultado.inserted_id
 
 def atualizar_categoria(categoria_id, dados):
@@ -26,6 +30,7 @@ def atualizar_categoria(categoria_id, dados):
         {"_id": ObjectId(categoria_id)},
         {"$set": {"nome": novo_nome}}
     )
+    referencia_service.invalidar()
     return True
 
 def deletar_categoria(categoria_id):
@@ -42,29 +47,23 @@ def deletar_categoria(categoria_id):
         raise ValueError("Não é possível deletar esta categoria, pois existem turmas associadas a ela.")
 
     mongo.db.categorias.delete_one({"_id": obj_id})
+    referencia_service.invalidar()
     return True
 
+@em_cache('esportes', 'categorias', 'metadados')
 def listar_todas_categorias():
     """
-    Lista todas as categorias, agregando o nome do esporte ao qual pertencem.
+    Lista todas as categorias, com o nome do esporte ao qual pertencem (cache de referência).
+    Categorias de esportes inexistentes ficam de fora.
     """
-    pipeline = [
-        {
-            "$lookup": {
-                "from": "esportes",
-                "localField": "esporte_id",
-                "foreignField": "_id",
-                "as": "esporte_info"
-            }
-        },
-        {"$unwind": "$esporte_info"},
-        {
-            "$project": {
-                "nome": 1,
-                "esporte_id": 1,
-                "esporte_nome": "$esporte_info.nome"
-            }
-        },
-        {"$sort": {"esporte_nome": 1, "nome": 1}}
-    ]
-    return list(mongo.db.categorias.aggregate(pipeline))
\ No newline at end of file
+    categorias = []
+    for categoria in referencia_service.listar_categorias():
+        esporte = referencia_service.esporte(categoria.get('esporte_id'))
+        if esporte:
+            categorias.append({
+                "_id": categoria["_id"],
+                "nome": categoria.get("nome"),
+                "esporte_id": categoria.get("esporte_id"),
+                "esporte_nome": esporte.get("nome"),
+            })
+    return sorted(categorias, key=lambda c: (c["esporte_nome"] or '', c["nome"] or ''))
\ No newline at end of file
@@ -0,0 +1,235 @@
+# app/services/chamada_service.py
+"""
+Armazenamento dos registros de presença.
+
+Existem dois formatos de armazenamento:
+
+- 'documentos': formato original, um documento em `presencas` por (aula, aluno).
+- 'embutido': cada aula guarda a chamada em um mapa `chamada`,
+  no formato { "<aluno_id>": {"status", "data_modificacao", "data_registro"} }.
+
+O modo 'duplo' é usado durante a migração: grava nos dois formatos e, na leitura,
+usa o mapa embutido quando a aula já o possui (senão, cai para `presencas`).
+O modo é definido pela variável de ambiente PRESENCA_STORAGE.
+"""
+
+from datetime import datetime
+from bson import ObjectId
+from flask import current_app
+from pymongo import UpdateOne
+from app import mongo
+from app.services import sincronizacao_service
+
+MODO_DOCUMENTOS = 'documentos'
+MODO_EMBUTIDO = 'embutido'
+MODO_DUPLO = 'duplo'
+MODOS_VALIDOS = (MODO_DOCUMENTOS, MODO_EMBUTIDO, MODO_DUPLO)
+# Status gravado na aula quando a chamada é registrada (o histórico filtra por ele)
+STATUS_AULA_REALIZADA = 'Realizada'
+
+
+def modo_armazenamento():
+    """Retorna o modo de armazenamento de presenças configurado no app."""
+    return current_app.config.get('PRESENCA_STORAGE', MODO_DOCUMENTOS)
+
+
+def _grava_documentos(modo):
+    return modo in (MODO_DOCUMENTOS, MODO_DUPLO)
+
+
+def _grava_embutido(modo):
+    return modo in (MODO_EMBUTIDO, MODO_DUPLO)
+
+
+def gravar_presencas(aula_obj_id, registros, agora, status_aula):
+    """
+    Grava a chamada de uma aula e atualiza o status da aula.
+
+    `registros` é uma lista de tuplas (aluno_obj_id, status). No modo embutido a
+    gravação inteira (presenças + status da aula) é um único `find_one_and_update`.
+    Retorna (total de registros gravados, aula) onde `aula` traz apenas `turma_id`
+    e `data`, ou (0, None) se a aula não existir.
+    """
+    modo = modo_armazenamento()
+
+    campos_aula = {"status": status_aula, "data_modificacao": agora}
+    atualizacao_aula = {"$set": campos_aula}
+    if _grava_embutido(modo):
+        data_registro = {}
+        for aluno_obj_id, status in registros:
+            chave = f"chamada.{aluno_obj_id}"
+            campos_aula[f"{chave}.status"] = status
+            campos_aula[f"{chave}.data_modificacao"] = agora
+            # $min só grava a data se o campo ainda não existir (ou for maior)
+            data_registro[f"{chave}.data_registro"] = agora
+        atualizacao_aula["$min"] = data_registro
+
+    aula = mongo.db.aulas.find_one_and_update(
+        {"_id": aula_obj_id}, sincronizacao_service.carimbar(atualizacao_aula), projection={"turma_id": 1, "data": 1}
+    )
+    if not aula:
+        return 0, None
+
+    if not _grava_documentos(modo):
+        return len(registros), aula
+
+    operacoes = [
+        UpdateOne(
+            {"aula_id": aula_obj_id, "aluno_id": aluno_obj_id},
+            sincronizacao_service.carimbar({
+                "$set": {"status": status, "data_modificacao": agora},
+                "$setOnInsert": {"data_registro": agora, "turma_id": aula.get('turma_id')}
+            }),
+            upsert=True
+        )
+        for aluno_obj_id, status in registros
+    ]
+    resultado = mongo.db.presencas.bulk_write(operacoes, ordered=False)
+    return resultado.upserted_count + resultado.modified_count, aula
+
+
+def status_das_presencas(aulas):
+    """
+    Status de presença de cada aluno nas aulas: {aula_id: {aluno_id: status}}.
+    As aulas precisam trazer o campo `chamada` (modos 'embutido' e 'duplo'); as que
+    dependem da coleção `presencas` são resolvidas com uma única consulta.
+    """
+    modo = modo_armazenamento()
+    resultado = {}
+    pendentes = []
+    for aula in aulas:
+        chamada = aula.get("chamada") if _grava_embutido(modo) else None
+        if chamada:
+            resultado[aula["_id"]] = {ObjectId(aluno_id): registro.get("status") for aluno_id, registro in chamada.items()}
+        else:
+            resultado[aula["_id"]] = {}
+            if modo != MODO_EMBUTIDO:
+                pendentes.append(aula["_id"])
+
+    if pendentes:
+        for presenca in mongo.db.presencas.find(
+            {"aula_id": {"$in": pendentes}}, {"_id": 0, "aula_id": 1, "aluno_id": 1, "status": 1}
+        ):
+            resultado[presenca["aula_id"]][presenca["aluno_id"]] = presenca.get("status")
+    return resultado
+
+
+def _expressao_chamada_embutida():
+    """Expressão que converte o mapa `chamada` da aula em uma lista de presenças."""
+    return {
+        "$map": {
+            "input": {"$objectToArray": {"$ifNull": ["$chamada", {}]}},
+            "as": "registro",
+            "in": {
+                "aula_id": "$_id",
+                "aluno_id": {"$toObjectId": "$$registro.k"},
+                "status": "$$registro.v.status",
+                "data_modificacao": "$$registro.v.data_modificacao",
+                "data_registro": "$$registro.v.data_registro"
+            }
+        }
+    }
+
+
+def estagios_presencas(campo="presencas"):
+    """
+    Estágios de pipeline (sobre a coleção `aulas`) que adicionam ao documento da aula
+    o campo `campo` com a lista de presenças, independente do modo de armazenamento.
+    """
+    modo = modo_armazenamento()
+    lookup = {"$lookup": {"from": "presencas", "localField": "_id", "foreignField": "aula_id", "as": campo}}
+
+    if modo == MODO_DOCUMENTOS:
+        return [lookup]
+    if modo == MODO_EMBUTIDO:
+        return [{"$addFields": {campo: _expressao_chamada_embutida()}}]
+
+    # Leitura dupla: prefere o mapa embutido e usa `presencas` para aulas ainda não migradas
+    return [
+        lookup,
+        {"$addFields": {
+            campo: {
+                "$cond": [
+                    {"$gt": [{"$size": {"$objectToArray": {"$ifNull": ["$chamada", {}]}}}, 0]},
+                    _expressao_chamada_embutida(),
+                    f"${campo}"
+                ]
+            }
+        }}
+    ]
+
+
+def _registro_migrado(atual, registro):
+    """
+    Expressão do registro de um aluno no mapa `chamada` ao migrar `registro` de `presencas`.
+    No modo 'duplo', uma chamada gravada depois da leitura de `presencas` já está no mapa
+    com `data_modificacao` igual ou mais nova: ela é mantida, e só `data_registro` fica com a
+    mais antiga das duas.
+    """
+    data_registro = registro.get('data_registro') or registro.get('data_modificacao')
+    mais_novo = {"$gte": [f"{atual}.data_modificacao", {"$literal": registro.get('data_modificacao')}]}
+    return {
+        "status": {"$cond": [mais_novo, f"{atual}.status", {"$literal": registro.get('status')}]},
+        "data_modificacao": {"$cond": [mais_novo, f"{atual}.data_modificacao", {"$literal": registro.get('data_modificacao')}]},
+        "data_registro": {"$min": [f"{atual}.data_registro", {"$literal": data_registro}]},
+    }
+
+
+def _gravar_lote_migrado(operacoes, aulas_ids, migrada_em):
+    """Grava um lote da migração e carimba as aulas que ele alterou (o pipeline não aceita $currentDate)."""
+    total = mongo.db.aulas.bulk_write(operacoes, ordered=False).modified_count
+    if total:
+        mongo.db.aulas.update_many(
+            {"_id": {"$in": aulas_ids}, "chamada_migrada_em": migrada_em},
+            sincronizacao_service.carimbar({})
+        )
+    return total
+
+
+def migrar_presencas_para_chamada(tamanho_lote=500):
+    """
+    Copia os documentos de `presencas` para o mapa `chamada` das aulas.
+    É idempotente: aulas já migradas (com `chamada_migrada_em`) são ignoradas, e no
+    modo 'duplo' as gravações novas já mantêm os dois formatos sincronizados.
+    Retorna o número de aulas atualizadas.
+    """
+    pipeline = [
+        {"$sort": {"aula_id": 1}},
+        {"$group": {
+            "_id": "$aula_id",
+            "registros": {"$push": {
+                "aluno_id": "$aluno_id",
+                "status": "$status",
+                "data_modificacao": "$data_modificacao",
+                "data_registro": "$data_registro"
+            }}
+        }}
+    ]
+
+    operacoes = []
+    aulas_ids = []
+    total = 0
+    migrada_em = datetime.utcnow()
+    for grupo in mongo.db.presencas.aggregate(pipeline, allowDiskUse=True):
+        campos = {}
+        for registro in grupo['registros']:
+            if not registro.get('aluno_id'):
+                continue
+            campos[f"chamada.{registro['aluno_id']}"] = _registro_migrado(f"$chamada.{registro['aluno_id']}", registro)
+
+        if not campos:
+            continue
+
+        filtro = {"_id": grupo['_id'], "chamada_migrada_em": {"$exists": False}}
+        operacoes.append(UpdateOne(filtro, [{"$set": {**campos, "chamada_migrada_em": migrada_em}}]))
+        aulas_ids.append(grupo['_id'])
+
+        if len(operacoes) >= tamanho_lote:
+            total += _gravar_lote_migrado(operacoes, aulas_ids, migrada_em)
+            operacoes, aulas_ids = [], []
+
+    if operacoes:
+        total += _gravar_lote_migrado(operacoes, aulas_ids, migrada_em)
+
+    current_app.logger.info("Migração de presenças concluída: %s aula(s) atualizada(s).", total)
+    return total
@@ -1,28 +1,25 @@
 # app/services/dashboard_service.py
 
+import logging
 from app import mongo
-import traceback
+
+logger = logging.getLogger(__name__)
 
 def get_summary_data():
     """
-    Busca dados resumidos para o dashboard do admin, com logs para depuração.
+    Busca dados resumidos para o dashboard do admin.
+    As consultas e os totais são registrados no nível DEBUG.
     """
     try:
-        # --- INÍCIO DA DEPURAÇÃO ---
-        print("\n=============================================")
-        print("===== INICIANDO DEPURAÇÃO DO DASHBOARD =====")
-
         # 1. Contagem de Alunos
         query_alunos = {"perfil": "aluno", "ativo": True}
         total_alunos = mongo.db.usuarios.count_documents(query_alunos)
-        print(f"[DEBUG] Query Alunos: {query_alunos}")
-        print(f"[DEBUG] Resultado - Total de Alunos: {total_alunos}")
+        logger.debug("Dashboard - alunos %s: %s", query_alunos, total_alunos)
 
         # 2. Contagem de Turmas
         query_turmas = {}
         total_turmas = mongo.db.turmas.count_documents(query_turmas)
-        print(f"[DEBUG] Query Turmas: {query_turmas}")
-        print(f"[DEBUG] Resultado - Total de Turmas: {total_turmas}")
+        logger.debug("Dashboard - turmas %s: %s", query_turmas, total_turmas)
 
         # 3. Contagem de Inadimplentes
         query_inadimplentes = {
@@ -31,18 +28,14 @@ def get_summary_data():
             "status_pagamento.status": {"$ne": "pago"}
         }
         total_inadimplentes = mongo.db.usuarios.count_documents(query_inadimplentes)
-        print(f"[DEBUG] Query Inadimplentes: {query_inadimplentes}")
-        print(f"[DEBUG] Resultado - Total de Inadimplentes: {total_inadimplentes}")
+        logger.debug("Dashboard - inadimplentes %s: %s", query_inadimplentes, total_inadimplentes)
 
-        # Verificação extra para garantir que a correção anterior foi aplicada
-        alunos_com_status_pagamento = mongo.db.usuarios.count_documents(
-            {"perfil": "aluno", "status_pagamento": {"$exists": True}}
-        )
-        print(f"[DEBUG] Verificação Extra - Alunos com campo 'status_pagamento': {alunos_com_status_pagamento}")
-        
-        print("===== FIM DA DEPURAÇÃO DO DASHBOARD =====")
-        print("=============================================\n")
-        # --- FIM DA DEPURAÇÃO ---
+        # Verificação extra de consistência: só consulta o banco com DEBUG ativo
+        if logger.isEnabledFor(logging.DEBUG):
+            alunos_com_status_pagamento = mongo.db.usuarios.count_documents(
+                {"perfil": "aluno", "status_pagamento": {"$exists": True}}
+            )
+            logger.debug("Dashboard - alunos com campo 'status_pagamento': %s", alunos_com_status_pagamento)
 
         summary = {
             "total_alunos": total_alunos,
@@ -50,7 +43,6 @@ def get_summary_data():
             "total_inadimplentes": total_inadimplentes
         }
         return summary
-    except Exception as e:
-        print(f"!!!!!! ERRO CRÍTICO NO SERVIÇO DO DASHBOARD !!!!!!")
-        traceback.print_exc()
-        return None
\ No newline at end of file
+    except Exception:
+        logger.exception("Erro ao calcular os dados do dashboard.")
+        return None
@@ -1,5 +1,7 @@
 from app import mongo
 from bson import ObjectId
+from app.cache.resultados import em_cache
+from app.services import referencia_service
 
 def criar_esporte(dados):
     """Cria um novo esporte, garantindo que o nome seja único."""
@@ -11,16 +13,29 @@ def criar_esporte(dados):
         "descricao": dados.get('descricao', '')
     }
     resultado = mongo.db.esportes.insert_one(novo_esporte)
+    referencia_service.invalidar()
     return str(resultado.inserted_id)
 
 def listar_esportes():
-    return list(mongo.db.esportes.find())
+    return referencia_service.listar_esportes()
+
+@em_cache('esportes', 'categorias', 'metadados')
+def listar_esportes_com_categorias():
+    """Esportes ({_id, nome}) com a lista das suas categorias ({_id, nome})."""
+    return [
+        {
+            "_id": esporte["_id"],
+            "nome": esporte.get("nome"),
+            "categorias": [
+                {"_id": c["_id"], "nome": c.get("nome")}
+                for c in referencia_service.listar_categorias(esporte["_id"])
+            ],
+        }
+        for esporte in referencia_service.listar_esportes()
+    ]
 
 def encontrar_esporte_por_id(esporte_id):
-    try:
-        return mongo.db.esportes.find_one({"_id": ObjectId(esporte_id)})
-    except Exception:
-        return None
+    return referencia_service.esporte(esporte_id)
 
 def atualizar_esporte(esporte_id, dados):
     # (Opcional) Adicionar verificação de nome único se o nome estiver sendo alterado
@@ -28,6 +43,8 @@ def atualizar_esporte(esporte_id, dados):
         {"_id": ObjectId(esporte_id)},
         {"$set": dados}
     )
+    if resultado.modified_count:
+        referencia_service.invalidar()
     return resultado.modified_count
 
 def deletar_esporte(esporte_id):
@@ -40,4 +57,6 @@ def deletar_esporte(esporte_id):
         raise ValueError("Não é possível deletar este esporte, pois existem turmas associadas a ele.")
 
     resultado = mongo.db.esportes.delete_one({"_id": obj_id})
+    if resultado.deleted_count:
+        referencia_service.invalidar()
     return resultado.deleted_count
\ No newline at end of file
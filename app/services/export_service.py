@@ -1,11 +1,75 @@
 import io
 import datetime
-import openpyxl
-from openpyxl.styles import Font, Alignment
+import functools
+import logging
+import threading
 from flask import render_template
-from weasyprint import HTML
+from app.observabilidade import metricas, saude
 from app.services import aula_service
 
+logger = logging.getLogger(__name__)
+
+TEMPLATE_RELATORIO = 'relatorios/relatorio_presenca.html'
+
+# Exportações em andamento no processo: o worker espera por elas ao encerrar
+_em_andamento = 0
+_condicao = threading.Condition()
+
+
+def _acompanhar(formato):
+    """Conta a exportação como em andamento enquanto o arquivo é gerado."""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def wrapper(*args, **kwargs):
+            global _em_andamento
+            with _condicao:
+                _em_andamento += 1
+            metricas.EXPORTACOES_EM_ANDAMENTO.ajustar(formato, delta=1)
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                metricas.EXPORTACOES_EM_ANDAMENTO.ajustar(formato, delta=-1)
+                with _condicao:
+                    _em_andamento -= 1
+                    _condicao.notify_all()
+        return wrapper
+    return decorador
+
+
+def aguardar_exportacoes(timeout):
+    """Espera até `timeout` segundos as exportações em andamento. Retorna quantas restaram."""
+    with _condicao:
+        _condicao.wait_for(lambda: _em_andamento == 0, timeout)
+        return _em_andamento
+
+
+def aquecer():
+    """
+    Carrega as bibliotecas de relatório (WeasyPrint, openpyxl e as suas dependências).
+    Elas são importadas só no primeiro uso para não atrasar o início dos workers; esta
+    função antecipa esse custo em uma thread de fundo (EXPORT_WARMUP).
+    """
+    import openpyxl  # noqa: F401
+    import weasyprint  # noqa: F401
+
+
+@saude.aquecimento('template_relatorio')
+def _compilar_template(app):
+    """Compila o template do relatório (fica no cache do Jinja para as exportações)."""
+    app.jinja_env.get_template(TEMPLATE_RELATORIO)
+
+
+def iniciar_aquecimento():
+    """Dispara `aquecer()` em segundo plano."""
+    def executar():
+        try:
+            aquecer()
+            logger.debug("Bibliotecas de exportação carregadas em segundo plano.")
+        except Exception:
+            logger.exception("Falha ao pré-carregar as bibliotecas de exportação.")
+    threading.Thread(target=executar, name='aquecimento-exportacao', daemon=True).start()
+
+
 def _ajustar_largura_colunas(sheet):
     """
     Função utilitária para ajustar a largura das colunas de uma planilha
@@ -23,6 +87,7 @@ def _ajustar_largura_colunas(sheet):
         adjusted_width = (max_length + 2)
         sheet.column_dimensions[column].width = adjusted_width
 
+@_acompanhar('xlsx')
 def gerar_planilha_presenca_aula(aula_id):
     """
     Gera uma planilha Excel (.xlsx) da lista de presença de uma aula com dados completos.
@@ -32,6 +97,10 @@ def gerar_planilha_presenca_aula(aula_id):
     if not dados_aula:
         return None, None
 
+    # Dependências pesadas: carregadas apenas quando há exportação
+    import openpyxl
+    from openpyxl.styles import Font, Alignment
+
     workbook = openpyxl.Workbook()
     sheet = workbook.active
     sheet.title = "Lista de Presença"
@@ -97,6 +166,7 @@ def gerar_planilha_presenca_aula(aula_id):
 
     return file_stream, nome_arquivo
 
+@_acompanhar('pdf')
 def gerar_pdf_presenca_aula(aula_id):
     """
     Gera um relatório PDF da lista de presença de uma aula.
@@ -106,11 +176,12 @@ def gerar_pdf_presenca_aula(aula_id):
         return None, None
         
     html_renderizado = render_template(
-        'relatorios/relatorio_presenca.html',
+        TEMPLATE_RELATORIO,
         dados=dados_aula,
         data_geracao=datetime.datetime.now()
     )
 
+    from weasyprint import HTML  # Dependência pesada: carregada apenas quando há exportação em PDF
     pdf_bytes = HTML(string=html_renderizado).write_pdf()
     file_stream = io.BytesIO(pdf_bytes)
 
@@ -0,0 +1,322 @@
+# app/services/frequencia_service.py
+"""
+Índice de frequência codificado em bits.
+
+Para cada par aluno × turma a coleção `frequencia_alunos` guarda dois bitsets (BinData):
+`presentes` e `faltas`. Cada bit corresponde a um dia (contado a partir de EPOCA) em que a
+turma teve aula, o que mantém os bits em ordem cronológica mesmo quando uma aula antiga é
+criada depois. O índice é atualizado a cada chamada registrada, e as análises (taxas,
+sequências de faltas, alunos em risco) são feitas com operações de bits em Python.
+
+Como o bit é do dia, e não da aula, duas aulas da mesma turma no mesmo dia contam como
+uma só: o aluno tem falta no dia se faltou em qualquer uma delas e presença se esteve
+em todas as que tiveram chamada (ver _status_do_dia).
+"""
+
+from datetime import date, datetime, time, timedelta
+import pytz
+from bson import Binary, ObjectId
+from flask import current_app
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app import mongo, timezone
+from app.services import chamada_service
+
+EPOCA = date(2020, 1, 1)
+STATUS_PRESENTE = ('presente',)
+STATUS_FALTA = ('ausente', 'falta')
+MAX_TENTATIVAS = 3
+
+
+# --- CODIFICAÇÃO ---
+
+def _para_int(binario):
+    return int.from_bytes(binario, 'little') if binario else 0
+
+
+def _para_binario(valor):
+    return Binary(valor.to_bytes((valor.bit_length() + 7) // 8, 'little'))
+
+
+def _dia(data):
+    """Converte a data de uma aula (UTC sem fuso, como vem do banco) no índice do bit."""
+    if isinstance(data, datetime):
+        if data.tzinfo is None:
+            data = pytz.utc.localize(data)
+        data = data.astimezone(timezone).date()
+    return (data - EPOCA).days
+
+
+def _mascara(inicio=None, fim=None):
+    """Máscara com os bits dos dias entre `inicio` e `fim` (objetos date, inclusive). None = sem limite."""
+    dia_inicio = max(_dia(inicio), 0) if inicio else 0
+    if fim is None:
+        return -1 << dia_inicio  # todos os bits a partir de dia_inicio
+    dia_fim = _dia(fim)
+    if dia_fim < dia_inicio:
+        return 0
+    return ((1 << (dia_fim - dia_inicio + 1)) - 1) << dia_inicio
+
+
+def _status_do_dia(statuses):
+    """Status do dia a partir das chamadas das aulas desse dia: a falta prevalece."""
+    if any(status in STATUS_FALTA for status in statuses):
+        return STATUS_FALTA[0]
+    if any(status in STATUS_PRESENTE for status in statuses):
+        return STATUS_PRESENTE[0]
+    return None
+
+
+def _aplicar_status(presentes, faltas, bit, status):
+    presentes &= ~bit
+    faltas &= ~bit
+    if status in STATUS_PRESENTE:
+        presentes |= bit
+    elif status in STATUS_FALTA:
+        faltas |= bit
+    return presentes, faltas
+
+
+# --- ATUALIZAÇÃO INCREMENTAL ---
+
+def _status_nas_outras_aulas(turma_id, data_aula, aula_id):
+    """{aluno_id: [status]} nas demais aulas da turma no mesmo dia (no fuso do app) de `data_aula`."""
+    if data_aula.tzinfo is None:
+        data_aula = pytz.utc.localize(data_aula)
+    inicio = timezone.localize(datetime.combine(data_aula.astimezone(timezone).date(), time.min))
+    inicio = inicio.astimezone(pytz.utc).replace(tzinfo=None)
+    aulas = list(mongo.db.aulas.find(
+        {"turma_id": turma_id, "_id": {"$ne": aula_id}, "data": {"$gte": inicio, "$lt": inicio + timedelta(days=1)}},
+        {"chamada": 1}
+    ))
+    statuses = {}
+    for presencas in chamada_service.status_das_presencas(aulas).values():
+        for aluno_id, status in presencas.items():
+            statuses.setdefault(aluno_id, []).append(status)
+    return statuses
+
+
+def registrar_chamada(turma_id, data_aula, registros, aula_id=None):
+    """
+    Atualiza os bitsets dos alunos de `registros` [(aluno_obj_id, status)] no dia da aula.
+
+    Com `aula_id`, se o dia já tem registro para algum desses alunos, as chamadas das outras
+    aulas da turma nesse dia são lidas e combinadas com a desta (a falta prevalece), para
+    que a segunda chamada do dia não sobrescreva a primeira.
+
+    Usa controle otimista pelo campo `versao`: se outro processo alterar um documento
+    no meio da operação, a chamada inteira é reaplicada (ligar/desligar bits é idempotente).
+    O mesmo vale para a criação: se o documento de um aluno apareceu depois da leitura, o
+    upsert só com $setOnInsert não grava nada, e o registro volta pelo caminho da versão.
+    Retorna os documentos de frequência resultantes, indexados pelo aluno_id.
+    """
+    if not turma_id or not data_aula or not registros:
+        return {}
+
+    dia = _dia(data_aula)
+    if dia < 0:
+        current_app.logger.warning("Aula de %s anterior a %s; frequência não indexada.", data_aula, EPOCA)
+        return {}
+    bit = 1 << dia
+    alunos_ids = [aluno_id for aluno_id, _ in registros]
+    agora = datetime.utcnow()
+    outras_aulas = None
+
+    for _ in range(MAX_TENTATIVAS):
+        existentes = {
+            doc['aluno_id']: doc
+            for doc in mongo.db.frequencia_alunos.find({"turma_id": turma_id, "aluno_id": {"$in": alunos_ids}})
+        }
+
+        if aula_id and outras_aulas is None and any(
+            (_para_int(doc.get('presentes')) | _para_int(doc.get('faltas'))) & bit for doc in existentes.values()
+        ):
+            outras_aulas = _status_nas_outras_aulas(turma_id, data_aula, aula_id)
+
+        operacoes = []
+        insercoes = []
+        resultado_final = {}
+        for aluno_id, status in registros:
+            if outras_aulas and aluno_id in outras_aulas:
+                status = _status_do_dia([status, *outras_aulas[aluno_id]])
+            doc = existentes.get(aluno_id)
+            presentes, faltas = _aplicar_status(
+                _para_int(doc.get('presentes')) if doc else 0,
+                _para_int(doc.get('faltas')) if doc else 0,
+                bit, status
+            )
+            campos = {"presentes": _para_binario(presentes), "faltas": _para_binario(faltas), "atualizado_em": agora}
+            if doc:
+                filtro = {"_id": doc['_id'], "versao": doc.get('versao', 0)}
+                operacoes.append(UpdateOne(filtro, {"$set": campos, "$inc": {"versao": 1}}))
+                versao = doc.get('versao', 0) + 1
+            else:
+                filtro = {"turma_id": turma_id, "aluno_id": aluno_id}
+                insercoes.append(len(operacoes))
+                operacoes.append(UpdateOne(filtro, {"$setOnInsert": {**campos, "versao": 1}}, upsert=True))
+                versao = 1
+            resultado_final[aluno_id] = {"aluno_id": aluno_id, "turma_id": turma_id, "versao": versao, **campos}
+
+        try:
+            resultado = mongo.db.frequencia_alunos.bulk_write(operacoes, ordered=False)
+        except BulkWriteError:
+            # Dois upserts simultâneos do mesmo aluno × turma (índice único): tenta de novo
+            continue
+        # Conflito: um upsert encontrou o documento criado por outra chamada (e o
+        # $setOnInsert não gravou nada) ou uma versão mudou desde a leitura
+        inseridos = sum(1 for indice in insercoes if indice in resultado.upserted_ids)
+        if inseridos == len(insercoes) and resultado.matched_count == len(operacoes) - len(insercoes):
+            return resultado_final
+
+    current_app.logger.error(
+        "Não foi possível atualizar a frequência da turma %s após %s tentativas.", turma_id, MAX_TENTATIVAS
+    )
+    return {}
+
+
+def reconstruir_indice():
+    """Recria toda a coleção `frequencia_alunos` a partir das presenças gravadas."""
+    pipeline = [
+        *chamada_service.estagios_presencas("presencas"),
+        {"$project": {"turma_id": 1, "data": 1, "presencas.aluno_id": 1, "presencas.status": 1}}
+    ]
+    # {(aluno_id, turma_id): {dia: [status em cada aula do dia]}}
+    chamadas = {}
+    for aula in mongo.db.aulas.aggregate(pipeline, allowDiskUse=True):
+        if not aula.get('turma_id') or not aula.get('data'):
+            continue
+        dia = _dia(aula['data'])
+        if dia < 0:
+            continue
+        for presenca in aula.get('presencas', []):
+            dias = chamadas.setdefault((presenca.get('aluno_id'), aula['turma_id']), {})
+            dias.setdefault(dia, []).append(presenca.get('status'))
+
+    bitsets = {}
+    for chave, dias in chamadas.items():
+        presentes = faltas = 0
+        for dia, statuses in dias.items():
+            presentes, faltas = _aplicar_status(presentes, faltas, 1 << dia, _status_do_dia(statuses))
+        bitsets[chave] = (presentes, faltas)
+
+    agora = datetime.utcnow()
+    mongo.db.frequencia_alunos.delete_many({})
+    documentos = [
+        {
+            "aluno_id": aluno_id, "turma_id": turma_id, "versao": 1, "atualizado_em": agora,
+            "presentes": _para_binario(presentes), "faltas": _para_binario(faltas)
+        }
+        for (aluno_id, turma_id), (presentes, faltas) in bitsets.items() if aluno_id
+    ]
+    if documentos:
+        mongo.db.frequencia_alunos.insert_many(documentos, ordered=False)
+    current_app.logger.info("Índice de frequência reconstruído: %s registro(s).", len(documentos))
+    return len(documentos)
+
+
+# --- ANÁLISES ---
+
+def faltas_consecutivas(presentes, faltas):
+    """Quantidade de faltas seguidas nas aulas mais recentes registradas."""
+    registrados = presentes | faltas
+    sequencia = 0
+    while registrados:
+        posicao = registrados.bit_length() - 1
+        if not (faltas >> posicao) & 1:
+            break
+        sequencia += 1
+        registrados &= ~(1 << posicao)
+    return sequencia
+
+
+def maior_sequencia_faltas(presentes, faltas):
+    """Maior sequência de faltas seguidas (considerando apenas os dias com chamada)."""
+    registrados = presentes | faltas
+    maior = atual = 0
+    while registrados:
+        menor_bit = registrados & -registrados
+        if faltas & menor_bit:
+            atual += 1
+            maior = max(maior, atual)
+        else:
+            atual = 0
+        registrados ^= menor_bit
+    return maior
+
+
+def taxa_ultimas_aulas(presentes, faltas, quantidade):
+    """Taxa de presença nas `quantidade` aulas registradas mais recentes (None se não houver)."""
+    registrados = presentes | faltas
+    total = contagem = 0
+    while registrados and total < quantidade:
+        posicao = registrados.bit_length() - 1
+        total += 1
+        contagem += (presentes >> posicao) & 1
+        registrados &= ~(1 << posicao)
+    return round(contagem / total, 4) if total else None
+
+
+def indicadores_recentes(doc, aulas_recentes):
+    """Sequência atual de faltas e taxa de presença recente de um documento de frequência."""
+    presentes = _para_int(doc.get('presentes'))
+    faltas = _para_int(doc.get('faltas'))
+    return {
+        "faltas_consecutivas": faltas_consecutivas(presentes, faltas),
+        "taxa_recente": taxa_ultimas_aulas(presentes, faltas, aulas_recentes),
+    }
+
+
+def _estatisticas(doc, mascara):
+    presentes = _para_int(doc.get('presentes')) & mascara
+    faltas = _para_int(doc.get('faltas')) & mascara
+    total_presentes = presentes.bit_count()
+    total_faltas = faltas.bit_count()
+    total = total_presentes + total_faltas
+    return {
+        "aluno_id": doc['aluno_id'],
+        "turma_id": doc['turma_id'],
+        "presentes": total_presentes,
+        "faltas": total_faltas,
+        "taxa_presenca": round(total_presentes / total, 4) if total else None,
+        "faltas_consecutivas": faltas_consecutivas(presentes, faltas),
+        "maior_sequencia_faltas": maior_sequencia_faltas(presentes, faltas),
+    }
+
+
+def _adicionar_nomes(itens):
+    alunos_ids = list({item['aluno_id'] for item in itens})
+    nomes = {
+        u['_id']: u.get('nome_completo')
+        for u in mongo.db.usuarios.find({"_id": {"$in": alunos_ids}}, {"nome_completo": 1})
+    }
+    for item in itens:
+        item['nome_aluno'] = nomes.get(item['aluno_id'])
+    return itens
+
+
+def resumo_turma(turma_id, inicio=None, fim=None):
+    """Frequência de cada aluno da turma no período [inicio, fim]."""
+    mascara = _mascara(inicio, fim)
+    docs = mongo.db.frequencia_alunos.find({"turma_id": ObjectId(turma_id)})
+    itens = [_estatisticas(doc, mascara) for doc in docs]
+    return _adicionar_nomes(sorted(itens, key=lambda i: (i['taxa_presenca'] is None, i['taxa_presenca'] or 0)))
+
+
+def resumo_aluno(aluno_id, inicio=None, fim=None):
+    """Frequência de um aluno em cada turma que ele frequenta/frequentou."""
+    mascara = _mascara(inicio, fim)
+    docs = mongo.db.frequencia_alunos.find({"aluno_id": ObjectId(aluno_id)})
+    return [_estatisticas(doc, mascara) for doc in docs]
+
+
+def alunos_com_faltas_consecutivas(minimo=3, turma_id=None):
+    """Alunos cuja sequência atual de faltas é maior ou igual a `minimo`."""
+    filtro = {"turma_id": ObjectId(turma_id)} if turma_id else {}
+    mascara = _mascara()
+    itens = []
+    for doc in mongo.db.frequencia_alunos.find(filtro):
+        estatisticas = _estatisticas(doc, mascara)
+        if estatisticas['faltas_consecutivas'] >= minimo:
+            itens.append(estatisticas)
+    itens.sort(key=lambda i: i['faltas_consecutivas'], reverse=True)
+    return _adicionar_nomes(itens)
@@ -0,0 +1,269 @@
+# app/services/importacao_service.py
+"""
+Importação em massa de usuários a partir de planilhas CSV ou XLSX.
+
+Todas as linhas são validadas antes de qualquer escrita. Os e-mails são gravados em
+minúsculas e conferidos, sem diferenciar maiúsculas, contra o próprio arquivo e contra o
+banco em uma única consulta `$in`, as senhas são processadas pelo bcrypt em
+um pool de threads do processo (o bcrypt libera o GIL) e os documentos são inseridos em
+lotes (`insert_many` não ordenado).
+Opcionalmente, os alunos já são matriculados nas turmas informadas; todos entram na
+lista de risco com a inadimplência inicial (ver risco_service).
+"""
+
+import csv
+import io
+import os
+import re
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from bson import ObjectId
+from flask import current_app
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app import mongo
+from app.services import risco_service, sincronizacao_service, usuario_service
+
+TAMANHO_LOTE = 500
+PERFIS_IMPORTAVEIS = ('aluno', 'professor')
+COLUNAS_OBRIGATORIAS = ('nome_completo', 'email', 'senha')
+EMAIL_REGEX = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+# Threads de hash por processo, compartilhadas pelas importações simultâneas
+THREADS_HASH = min(4, os.cpu_count() or 1)
+
+_executor = None
+_pid = None
+_lock = threading.Lock()
+
+
+def _pool():
+    """ThreadPoolExecutor do processo (recriado após o fork dos workers)."""
+    global _executor, _pid
+    with _lock:
+        if _pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=THREADS_HASH, thread_name_prefix='importacao')
+            _pid = os.getpid()
+        return _executor
+
+
+def _gerar_hash(senha):
+    return bcrypt.hashpw(senha.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+
+# --- LEITURA DO ARQUIVO ---
+
+def _normalizar_cabecalho(valor):
+    return str(valor or '').strip().lower().replace(' ', '_')
+
+
+def _ler_csv(conteudo):
+    texto = conteudo.decode('utf-8-sig')
+    try:
+        dialeto = csv.Sniffer().sniff(texto[:4096], delimiters=',;\t')
+    except csv.Error:
+        dialeto = csv.excel
+    leitor = csv.reader(io.StringIO(texto), dialeto)
+    return list(leitor)
+
+
+def _ler_xlsx(conteudo):
+    import openpyxl  # Dependência pesada: carregada apenas quando há importação de planilha
+    workbook = openpyxl.load_workbook(io.BytesIO(conteudo), read_only=True, data_only=True)
+    try:
+        return [list(linha) for linha in workbook.active.iter_rows(values_only=True)]
+    finally:
+        workbook.close()
+
+
+def ler_planilha(conteudo, nome_arquivo):
+    """Lê o arquivo e devolve uma lista de (número da linha, dicionário coluna -> valor)."""
+    extensao = os.path.splitext(nome_arquivo or '')[1].lower()
+    if extensao == '.csv':
+        linhas = _ler_csv(conteudo)
+    elif extensao in ('.xlsx', '.xlsm'):
+        linhas = _ler_xlsx(conteudo)
+    else:
+        raise ValueError("Formato de arquivo não suportado. Envie um arquivo .csv ou .xlsx.")
+
+    if not linhas:
+        raise ValueError("O arquivo está vazio.")
+
+    cabecalho = [_normalizar_cabecalho(c) for c in linhas[0]]
+    faltando = [c for c in COLUNAS_OBRIGATORIAS if c not in cabecalho]
+    if faltando:
+        raise ValueError(f"Colunas obrigatórias ausentes: {', '.join(faltando)}")
+
+    registros = []
+    for numero, linha in enumerate(linhas[1:], start=2):
+        if not any(v not in (None, '') for v in linha):
+            continue  # Ignora linhas em branco
+        registros.append((numero, {
+            coluna: (valor.strip() if isinstance(valor, str) else valor)
+            for coluna, valor in zip(cabecalho, linha) if coluna
+        }))
+    return registros
+
+
+# --- VALIDAÇÃO ---
+
+def _converter_data(valor):
+    if isinstance(valor, datetime.datetime):
+        return valor
+    if isinstance(valor, datetime.date):
+        return datetime.datetime.combine(valor, datetime.time.min)
+    for formato in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.datetime.strptime(str(valor), formato)
+        except ValueError:
+            continue
+    raise ValueError(f"Data de nascimento inválida: '{valor}'. Use AAAA-MM-DD ou DD/MM/AAAA.")
+
+
+def _validar_linha(dados, turma_padrao):
+    """Valida e normaliza uma linha. Retorna (dados normalizados, lista de erros)."""
+    erros = []
+    for campo in COLUNAS_OBRIGATORIAS:
+        if dados.get(campo) in (None, ''):
+            erros.append(f"Campo '{campo}' é obrigatório.")
+
+    email = str(dados.get('email') or '').strip().lower()
+    if email and not EMAIL_REGEX.match(email):
+        erros.append(f"E-mail inválido: '{email}'.")
+
+    perfil = str(dados.get('perfil') or 'aluno').lower()
+    if perfil not in PERFIS_IMPORTAVEIS:
+        erros.append(f"Perfil inválido: '{perfil}'. Use {' ou '.join(PERFIS_IMPORTAVEIS)}.")
+
+    normalizado = {
+        "nome_completo": str(dados.get('nome_completo') or ''),
+        "email": email,
+        "senha": str(dados.get('senha') or ''),
+        "perfil": perfil,
+        "telefone": str(dados['telefone']) if dados.get('telefone') not in (None, '') else None,
+        "responsavel": dados.get('responsavel') or None,
+    }
+
+    if perfil == 'aluno':
+        if dados.get('data_nascimento') in (None, ''):
+            erros.append("Para 'aluno', 'data_nascimento' é obrigatório.")
+        else:
+            try:
+                normalizado['data_nascimento'] = _converter_data(dados['data_nascimento'])
+            except ValueError as e:
+                erros.append(str(e))
+
+        turma_id = dados.get('turma_id') or turma_padrao
+        if turma_id:
+            try:
+                normalizado['turma_id'] = ObjectId(str(turma_id))
+            except Exception:
+                erros.append(f"turma_id inválido: '{turma_id}'.")
+
+    return normalizado, erros
+
+
+# --- IMPORTAÇÃO ---
+
+def importar_usuarios(conteudo, nome_arquivo, turma_padrao=None):
+    """
+    Importa usuários de uma planilha. `turma_padrao` é usada para os alunos cuja linha
+    não informa `turma_id`. Retorna um relatório com os criados e os erros por linha.
+    """
+    registros = ler_planilha(conteudo, nome_arquivo)
+    erros = {}
+    validos = []
+    emails_no_arquivo = {}
+
+    for numero, dados in registros:
+        normalizado, erros_linha = _validar_linha(dados, turma_padrao)
+        email = normalizado['email']
+        if email and email in emails_no_arquivo:
+            erros_linha.append(f"E-mail repetido no arquivo (linha {emails_no_arquivo[email]}).")
+        elif email:
+            emails_no_arquivo[email] = numero
+
+        if erros_linha:
+            erros[numero] = {"linha": numero, "email": email, "erros": erros_linha}
+        else:
+            validos.append((numero, normalizado))
+
+    # Uma consulta para todos os e-mails e uma para todas as turmas
+    # Cadastros antigos podem ter o e-mail com maiúsculas
+    emails = [re.compile(f"^{re.escape(dados['email'])}$", re.IGNORECASE) for _, dados in validos]
+    existentes = {u['email'].lower() for u in mongo.db.usuarios.find({"email": {"$in": emails}}, {"email": 1})}
+    turmas_ids = list({dados['turma_id'] for _, dados in validos if dados.get('turma_id')})
+    turmas_encontradas = {t['_id'] for t in mongo.db.turmas.find({"_id": {"$in": turmas_ids}}, {"_id": 1})}
+
+    aprovados = []
+    for numero, dados in validos:
+        erros_linha = []
+        if dados['email'] in existentes:
+            erros_linha.append("O e-mail informado já está em uso.")
+        if dados.get('turma_id') and dados['turma_id'] not in turmas_encontradas:
+            erros_linha.append(f"Turma {dados['turma_id']} não encontrada.")
+        if erros_linha:
+            erros[numero] = {"linha": numero, "email": dados['email'], "erros": erros_linha}
+        else:
+            aprovados.append((numero, dados))
+
+    criados = []
+    alunos_criados = []
+    if aprovados:
+        hashes = list(_pool().map(_gerar_hash, [dados['senha'] for _, dados in aprovados]))
+
+        for inicio in range(0, len(aprovados), TAMANHO_LOTE):
+            lote = aprovados[inicio:inicio + TAMANHO_LOTE]
+            documentos = []
+            for (numero, dados), senha_hash in zip(lote, hashes[inicio:inicio + TAMANHO_LOTE]):
+                documento = usuario_service.montar_documento_usuario(dados, senha_hash)
+                if dados.get('turma_id'):
+                    documento['turma_id'] = [dados['turma_id']]
+                documentos.append(documento)
+
+            falhas = {}
+            try:
+                mongo.db.usuarios.insert_many(documentos, ordered=False)
+            except BulkWriteError as e:
+                # Ex.: e-mail inserido por outra requisição no meio da importação (índice único)
+                falhas = {erro['index']: erro.get('errmsg', 'Erro ao inserir.') for erro in e.details.get('writeErrors', [])}
+
+            for indice, ((numero, dados), documento) in enumerate(zip(lote, documentos)):
+                if indice in falhas:
+                    erros[numero] = {"linha": numero, "email": dados['email'], "erros": [falhas[indice]]}
+                else:
+                    criados.append({"linha": numero, "usuario_id": documento['_id'], "turma_id": dados.get('turma_id')})
+                    if documento['perfil'] == 'aluno':
+                        alunos_criados.append(documento['_id'])
+
+    matriculados = _matricular_importados(criados)
+    # Todo aluno importado começa com o pagamento 'pendente' (montar_documento_usuario)
+    risco_service.atualizar_inadimplencia(alunos_criados, True)
+
+    current_app.logger.info("Importação de usuários: %s criado(s), %s linha(s) com erro.", len(criados), len(erros))
+    return {
+        "total_linhas": len(registros),
+        "criados": len(criados),
+        "matriculados": matriculados,
+        "usuarios": criados,
+        "erros": [erros[numero] for numero in sorted(erros)],
+    }
+
+
+def _matricular_importados(criados):
+    """Adiciona os alunos importados às suas turmas, com uma operação por turma."""
+    por_turma = {}
+    for item in criados:
+        if item.get('turma_id'):
+            por_turma.setdefault(item['turma_id'], []).append(item['usuario_id'])
+    if not por_turma:
+        return 0
+
+    operacoes = [
+        UpdateOne({"_id": turma_id}, sincronizacao_service.carimbar({"$addToSet": {"alunos_ids": {"$each": alunos_ids}}}))
+        for turma_id, alunos_ids in por_turma.items()
+    ]
+    mongo.db.turmas.bulk_write(operacoes, ordered=False)
+    return sum(len(alunos_ids) for alunos_ids in por_turma.values())
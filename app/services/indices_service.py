@@ -0,0 +1,78 @@
+# app/services/indices_service.py
+"""
+Declaração central dos índices usados pelas consultas dos serviços.
+Os índices são criados pelo comando `flask criar-indices`.
+"""
+
+from flask import current_app
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from app import mongo
+from app.services.sincronizacao_service import RETENCAO_EXCLUSOES_DIAS
+
+INDICES = {
+    'usuarios': [
+        IndexModel([('email', ASCENDING)], name='email', unique=True),
+        IndexModel([('updated_at', ASCENDING)], name='updated_at'),
+        # Listagem paginada (usuario_service.paginar_usuarios): filtros de igualdade,
+        # depois a ordenação; o prefixo da busca por nome também usa estes índices
+        IndexModel([('ativo', ASCENDING), ('nome_normalizado', ASCENDING), ('_id', ASCENDING)], name='ativo_nome'),
+        IndexModel([('ativo', ASCENDING), ('perfil', ASCENDING), ('nome_normalizado', ASCENDING), ('_id', ASCENDING)],
+                   name='ativo_perfil_nome'),
+        IndexModel([('ativo', ASCENDING), ('status_pagamento.status', ASCENDING), ('nome_normalizado', ASCENDING),
+                    ('_id', ASCENDING)], name='ativo_pagamento_nome'),
+        IndexModel([('ativo', ASCENDING), ('data_criacao', DESCENDING), ('_id', ASCENDING)], name='ativo_data_criacao'),
+        # Prefixos das palavras do nome e do email (busca_service), multikey
+        IndexModel([('busca_chaves', ASCENDING)], name='busca_chaves'),
+    ],
+    'turmas': [
+        IndexModel([('professor_id', ASCENDING)], name='professor'),
+        IndexModel([('professor_id', ASCENDING), ('updated_at', ASCENDING)], name='professor_updated_at'),
+        IndexModel([('updated_at', ASCENDING)], name='updated_at'),
+        IndexModel([('busca_chaves', ASCENDING)], name='busca_chaves'),
+    ],
+    'presencas': [
+        IndexModel([('aula_id', ASCENDING), ('aluno_id', ASCENDING)], name='aula_aluno', unique=True),
+        IndexModel([('turma_id', ASCENDING), ('updated_at', ASCENDING)], name='turma_updated_at'),
+        IndexModel([('updated_at', ASCENDING)], name='updated_at'),
+    ],
+    'aulas': [
+        IndexModel([('turma_id', ASCENDING), ('data', DESCENDING)], name='turma_data'),
+        IndexModel([('data', ASCENDING)], name='data'),
+        IndexModel([('turma_id', ASCENDING), ('updated_at', ASCENDING)], name='turma_updated_at'),
+        IndexModel([('updated_at', ASCENDING)], name='updated_at'),
+        # professor_id é copiado da turma (aula_service) para o /api/professor/hoje
+        IndexModel([('professor_id', ASCENDING), ('data', ASCENDING)], name='professor_data'),
+    ],
+    # Lápides da sincronização incremental (sincronizacao_service)
+    'exclusoes': [
+        IndexModel([('updated_at', ASCENDING)], name='updated_at'),
+        IndexModel([('professor_id', ASCENDING), ('updated_at', ASCENDING)], name='professor_updated_at'),
+        IndexModel([('turmas_ids', ASCENDING), ('updated_at', ASCENDING)], name='turmas_updated_at'),
+        IndexModel([('data_exclusao', ASCENDING)], name='expiracao', expireAfterSeconds=RETENCAO_EXCLUSOES_DIAS * 24 * 3600),
+    ],
+    'frequencia_alunos': [
+        IndexModel([('turma_id', ASCENDING), ('aluno_id', ASCENDING)], name='turma_aluno', unique=True),
+        IndexModel([('aluno_id', ASCENDING)], name='aluno'),
+    ],
+    'alunos_risco': [
+        IndexModel([('score', DESCENDING), ('_id', ASCENDING)], name='score'),
+    ],
+}
+
+
+def garantir_indices():
+    """
+    Cria os índices declarados em INDICES (operação idempotente).
+    Retorna um dicionário {colecao: [nomes dos índices criados]}.
+    """
+    criados = {}
+    for colecao, indices in INDICES.items():
+        criados[colecao] = []
+        for indice in indices:
+            try:
+                criados[colecao].extend(mongo.db[colecao].create_indexes([indice]))
+            except OperationFailure as e:
+                # Ex.: índice único sobre dados duplicados. Não impede a criação dos demais.
+                current_app.logger.error("Não foi possível criar o índice %s em '%s': %s", indice.document['name'], colecao, e)
+    return criados
@@ -2,6 +2,7 @@ from bson import ObjectId
 from app import mongo
 from datetime import datetime
 from flask import current_app
+from app.services import chamada_service, frequencia_service, risco_service
 
 def marcar_presenca(aula_id, aluno_id, status):
     """
@@ -12,7 +13,7 @@ def marcar_presenca(aula_id, aluno_id, status):
         aula_obj_id = ObjectId(aula_id)
         aluno_obj_id = ObjectId(aluno_id)
     except Exception as e:
-        current_app.logger.error(f"Erro de conversão de ID ao marcar presença: {e}")
+        current_app.logger.error("Erro de conversão de ID ao marcar presença: %s", e)
         raise ValueError("ID de aula ou aluno inválido.")
 
     # Verifica se a aula e o aluno existem e se o aluno pertence à turma da aula
@@ -27,30 +28,20 @@ def marcar_presenca(aula_id, aluno_id, status):
     if aluno_obj_id not in turma.get('alunos_ids', []):
         raise ValueError("O aluno não pertence à turma desta aula.")
 
-    # Atualiza ou insere o registro de presença
-    filtro = {"aula_id": aula_obj_id, "aluno_id": aluno_obj_id}
-    dados_atualizacao = {
-        "$set": {
-            "status": status,
-            "data_modificacao": datetime.utcnow()
-        },
-        "$setOnInsert": {
-            "aula_id": aula_obj_id,
-            "aluno_id": aluno_obj_id,
-            "turma_id": aula.get('turma_id')
-        }
-    }
-    
-    resultado = mongo.db.presencas.update_one(filtro, dados_atualizacao, upsert=True)
-    
-    mongo.db.aulas.update_one(
-        {"_id": aula_obj_id},
-        {"$set": {"status": "Realizada"}}
+    # Atualiza ou insere o registro de presença e marca a aula como 'Realizada'
+    registros = [(aluno_obj_id, status)]
+    gravados, _ = chamada_service.gravar_presencas(
+        aula_obj_id, registros, datetime.utcnow(), chamada_service.STATUS_AULA_REALIZADA
     )
+    frequencia = frequencia_service.registrar_chamada(aula.get('turma_id'), aula.get('data'), registros, aula_obj_id)
+    risco_service.atualizar_frequencia(aula.get('turma_id'), frequencia)
 
-    current_app.logger.info(f"Presença marcada para aluno {aluno_id} na aula {aula_id} com status '{status}'. Status da aula atualizado para 'Realizada'.")
+    current_app.logger.info(
+        "Presença marcada para aluno %s na aula %s com status '%s'. Status da aula atualizado para 'Realizada'.",
+        aluno_id, aula_id, status
+    )
     
-    return resultado.modified_count > 0 or resultado.upserted_id is not None
+    return gravados > 0
 
 def obter_presencas_por_aula(aula_id):
     """
@@ -70,6 +61,7 @@ def obter_presencas_por_aula(aula_id):
             "as": "turma_info"
         }},
         {"$unwind": "$turma_info"},
+        *chamada_service.estagios_presencas("presencas_aula"),
         {"$lookup": {
             "from": "usuarios",
             "localField": "turma_info.alunos_ids",
@@ -77,20 +69,14 @@ def obter_presencas_por_aula(aula_id):
             "as": "alunos"
         }},
         {"$unwind": "$alunos"},
-        {"$lookup": {
-            "from": "presencas",
-            "let": {"aluno_id": "$alunos._id", "aula_id": "$_id"},
-            "pipeline": [
-                {"$match": {
-                    "$expr": {
-                        "$and": [
-                            {"$eq": ["$aluno_id", "$$aluno_id"]},
-                            {"$eq": ["$aula_id", "$$aula_id"]}
-                        ]
-                    }
-                }}
-            ],
-            "as": "presenca_info"
+        {"$addFields": {
+            "presenca_info": {
+                "$filter": {
+                    "input": "$presencas_aula",
+                    "as": "p",
+                    "cond": {"$eq": ["$$p.aluno_id", "$alunos._id"]}
+                }
+            }
         }},
         {"$project": {
             "_id": 0,
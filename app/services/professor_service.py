@@ -0,0 +1,82 @@
+# app/services/professor_service.py
+"""
+Carga inicial do app do professor: o dia inteiro em uma chamada.
+
+Substitui a sequência /turmas/professor/me → /aulas/por-data → /get-or-create →
+/presencas/aula/<id> (uma por turma). São no máximo seis consultas indexadas, sem $lookup:
+turmas do professor (professor), aulas do dia (professor_data, com o professor_id copiado
+da turma), aulas do dia das turmas que ficaram sem aula (turma_data), criação em lote das
+aulas que faltam, alunos (_id) e presenças (aula_aluno).
+
+A segunda busca por aula cobre as aulas sem `professor_id` (antes de `flask
+preencher-professor-aulas`) e evita criar uma segunda aula no dia quando a existente
+está em outro horário.
+"""
+
+from datetime import datetime, time
+
+from app import mongo, timezone
+from app.services import aula_service, chamada_service, referencia_service
+
+PROJECAO_ALUNO = {"nome_completo": 1, "ativo": 1, "status_pagamento.status": 1}
+
+
+def resumo_do_dia(professor_id, dia):
+    """
+    Turmas do professor com a aula de `dia` (criada se a turma tiver horário nesse dia)
+    e a lista de alunos com o status de presença de cada um (None se ainda sem chamada).
+    """
+    turmas = list(mongo.db.turmas.find(
+        {"professor_id": professor_id},
+        {"nome": 1, "categoria": 1, "horarios": 1, "esporte_id": 1, "professor_id": 1, "alunos_ids": 1}
+    ).sort("nome", 1))
+
+    inicio_dia = timezone.localize(datetime.combine(dia, time.min))
+    fim_dia = timezone.localize(datetime.combine(dia, time.max))
+    projecao_aula = {"turma_id": 1, "data": 1, "status": 1}
+    if chamada_service.modo_armazenamento() != chamada_service.MODO_DOCUMENTOS:
+        projecao_aula["chamada"] = 1
+    aulas = {}
+    for aula in mongo.db.aulas.find(
+        {"professor_id": professor_id, "data": {"$gte": inicio_dia, "$lte": fim_dia}}, projecao_aula
+    ).sort("data", 1):
+        aulas.setdefault(aula["turma_id"], aula)
+
+    sem_aula = [t for t in turmas if t["_id"] not in aulas]
+    if sem_aula:
+        for aula in mongo.db.aulas.find(
+            {"turma_id": {"$in": [t["_id"] for t in sem_aula]}, "data": {"$gte": inicio_dia, "$lte": fim_dia}},
+            projecao_aula
+        ).sort("data", 1):
+            aulas.setdefault(aula["turma_id"], aula)
+        sem_aula = [t for t in sem_aula if t["_id"] not in aulas]
+    if sem_aula:
+        aulas.update(aula_service.criar_aulas_do_dia(sem_aula, dia))
+
+    alunos_ids = list({aluno_id for turma in turmas for aluno_id in turma.get("alunos_ids", [])})
+    alunos = {a["_id"]: a for a in mongo.db.usuarios.find({"_id": {"$in": alunos_ids}}, PROJECAO_ALUNO)} if alunos_ids else {}
+    presencas = chamada_service.status_das_presencas(list(aulas.values()))
+
+    resultado = []
+    for turma in turmas:
+        aula = aulas.get(turma["_id"])
+        status = presencas.get(aula["_id"], {}) if aula else {}
+        resultado.append({
+            "_id": turma["_id"],
+            "nome": turma.get("nome"),
+            "categoria": turma.get("categoria"),
+            "horarios": turma.get("horarios", []),
+            "esporte": referencia_service.resumo_esporte(turma.get("esporte_id")),
+            "aula": {"_id": aula["_id"], "data": aula["data"], "status": aula.get("status")} if aula else None,
+            "alunos": [
+                {
+                    "_id": aluno_id,
+                    "nome_completo": alunos[aluno_id].get("nome_completo"),
+                    "status_pagamento": (alunos[aluno_id].get("status_pagamento") or {}).get("status"),
+                    "presenca": status.get(aluno_id),
+                }
+                for aluno_id in turma.get("alunos_ids", [])
+                if aluno_id in alunos and alunos[aluno_id].get("ativo", True)
+            ],
+        })
+    return {"data": dia.isoformat(), "turmas": resultado}
@@ -0,0 +1,34 @@
+# app/services/projecao_service.py
+"""
+Parâmetros ?fields= e ?expand= das rotas de listagem e detalhe.
+
+Cada recurso declara no seu serviço as listas permitidas (CAMPOS e EXPANSOES); aqui só
+se lê e valida a query string. Sem nenhum dos dois parâmetros, os serviços devolvem o
+formato de sempre.
+"""
+
+
+def ler_lista(valor, permitidos, parametro):
+    """
+    Itens de um parâmetro separado por vírgulas (?fields=nome,email), na ordem pedida e
+    sem repetições, ou None se o parâmetro não veio ou veio vazio (?fields=), que vale o
+    formato de sempre. ValueError se algum não for permitido.
+    """
+    if valor is None:
+        return None
+    itens = tuple(dict.fromkeys(item.strip() for item in valor.split(',') if item.strip()))
+    invalidos = [item for item in itens if item not in permitidos]
+    if invalidos:
+        raise ValueError(
+            f"Valor(es) inválido(s) em '{parametro}': {', '.join(invalidos)}. "
+            f"Permitidos: {', '.join(permitidos)}."
+        )
+    return itens or None
+
+
+def ler_opcoes(args, campos_permitidos, expansoes_permitidas):
+    """(campos, expandir) de ?fields= e ?expand=, validados contra as listas do recurso."""
+    return (
+        ler_lista(args.get('fields'), campos_permitidos, 'fields'),
+        ler_lista(args.get('expand'), expansoes_permitidas, 'expand'),
+    )
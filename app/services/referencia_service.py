@@ -0,0 +1,166 @@
+# app/services/referencia_service.py
+"""
+Cache em memória, por processo, dos dados de referência: esportes e categorias.
+
+As duas coleções são pequenas e mudam raramente, mas aparecem em quase toda listagem.
+Os pipelines deixam de fazer `$lookup` nelas e completam os resultados em Python com
+as funções deste módulo.
+
+Invalidação entre workers:
+- toda escrita em esportes/categorias chama `invalidar()`, que incrementa a `versao` do
+  documento {_id: 'referencia'} na coleção `metadados`;
+- a leitura compara essa versão com a do cache no máximo a cada REFERENCIA_VERIFICACAO_S
+  segundos (um find_one por _id) e recarrega as coleções quando ela mudou;
+- com REFERENCIA_CHANGE_STREAM ativo e um replica set disponível, uma thread acompanha o
+  documento de versão por change stream e expira o cache na hora; nesse caso a
+  verificação periódica não é feita.
+
+Cada versão carregada também é guardada no namespace 'referencia' do cache plugável
+(app.cache), o que evita que cada worker releia as coleções quando o backend é compartilhado.
+
+Os documentos devolvidos são compartilhados pelo cache: não os altere.
+"""
+
+import logging
+import threading
+import time
+
+from bson import ObjectId
+from flask import current_app
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app import cache, mongo
+from app.observabilidade import saude
+
+COLECAO_METADADOS = 'metadados'
+ID_VERSAO = 'referencia'
+ESPERA_RECONEXAO_S = 5
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_dados = None
+_verificado_em = 0.0
+_expirado = False
+_stream_ativo = False
+
+
+def _versao_no_banco():
+    doc = mongo.db[COLECAO_METADADOS].find_one({"_id": ID_VERSAO}, {"versao": 1})
+    return doc.get("versao", 0) if doc else 0
+
+
+def _carregar(versao):
+    # Mantém a ordem natural das coleções, como nos $lookup que este cache substitui
+    esportes = list(mongo.db.esportes.find())
+    categorias = list(mongo.db.categorias.find())
+    por_esporte = {}
+    for categoria in categorias:
+        por_esporte.setdefault(categoria.get("esporte_id"), []).append(categoria)
+    return {
+        "versao": versao,
+        "esportes": esportes,
+        "esportes_por_id": {e["_id"]: e for e in esportes},
+        "categorias": categorias,
+        "categorias_por_id": {c["_id"]: c for c in categorias},
+        "categorias_por_esporte": por_esporte,
+    }
+
+
+def _obter():
+    """Dados do cache, recarregados quando a versão no banco mudou."""
+    global _dados, _verificado_em, _expirado
+    intervalo = current_app.config["REFERENCIA_VERIFICACAO_S"]
+    dados = _dados
+    if dados is not None and not _expirado and (_stream_ativo or time.monotonic() - _verificado_em < intervalo):
+        return dados
+
+    with _lock:
+        if _dados is not None and not _expirado and (_stream_ativo or time.monotonic() - _verificado_em < intervalo):
+            return _dados
+        # A versão é lida antes das coleções: uma escrita concorrente deixa o cache com
+        # dados novos e versão antiga, e a próxima verificação recarrega de novo.
+        _expirado = False
+        versao = _versao_no_banco()
+        if _dados is None or _dados["versao"] != versao:
+            # Com CACHE_BACKEND=sqlite, o primeiro worker a ver a versão nova carrega e os demais reaproveitam
+            _dados = cache.namespace('referencia').obter_ou_calcular(versao, lambda: _carregar(versao))
+            logger.debug("Dados de referência carregados (versão %s).", versao)
+        _verificado_em = time.monotonic()
+        return _dados
+
+
+def invalidar():
+    """Registra uma alteração em esportes/categorias para todos os workers."""
+    global _expirado
+    mongo.db[COLECAO_METADADOS].update_one({"_id": ID_VERSAO}, {"$inc": {"versao": 1}}, upsert=True)
+    _expirado = True
+
+
+def _como_object_id(valor):
+    if isinstance(valor, ObjectId):
+        return valor
+    try:
+        return ObjectId(valor)
+    except Exception:
+        return None
+
+
+# --- CONSULTAS ---
+
+def esporte(esporte_id):
+    """Documento do esporte (ou None)."""
+    return _obter()["esportes_por_id"].get(_como_object_id(esporte_id))
+
+
+def categoria(categoria_id):
+    """Documento da categoria (ou None)."""
+    return _obter()["categorias_por_id"].get(_como_object_id(categoria_id))
+
+
+def listar_esportes():
+    return list(_obter()["esportes"])
+
+
+def listar_categorias(esporte_id=None):
+    """Categorias (todas ou de um esporte), na ordem natural da coleção."""
+    dados = _obter()
+    if esporte_id is None:
+        return list(dados["categorias"])
+    return list(dados["categorias_por_esporte"].get(_como_object_id(esporte_id), []))
+
+
+def resumo_esporte(esporte_id):
+    """{'_id', 'nome'} do esporte, ou {} se ele não existir (formato usado nas turmas)."""
+    encontrado = esporte(esporte_id)
+    return {"_id": encontrado["_id"], "nome": encontrado.get("nome")} if encontrado else {}
+
+
+# --- CHANGE STREAM E AQUECIMENTO ---
+
+def _acompanhar_versao():
+    """Expira o cache a cada mudança do documento de versão (thread de fundo)."""
+    global _stream_ativo, _expirado
+    pipeline = [{"$match": {"documentKey._id": ID_VERSAO}}]
+    while True:
+        try:
+            with mongo.db[COLECAO_METADADOS].watch(pipeline) as stream:
+                _stream_ativo = True
+                _expirado = True  # alterações entre a última leitura e a abertura do stream
+                for _ in stream:
+                    _expirado = True
+        except OperationFailure as e:
+            _stream_ativo = False
+            logger.info("Change stream indisponível (%s); usando verificação periódica da versão.", e)
+            return
+        except PyMongoError as e:
+            _stream_ativo = False
+            logger.warning("Change stream dos dados de referência interrompido: %s", e)
+            time.sleep(ESPERA_RECONEXAO_S)
+
+
+@saude.aquecimento('dados_referencia')
+def _aquecer(app):
+    _obter()
+    if app.config["REFERENCIA_CHANGE_STREAM"]:
+        threading.Thread(target=_acompanhar_versao, name='referencia-stream', daemon=True).start()
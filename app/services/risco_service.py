@@ -0,0 +1,170 @@
+# app/services/risco_service.py
+"""
+Pontuação de risco de evasão dos alunos.
+
+A coleção `alunos_risco` (um documento por aluno, _id = aluno_id) guarda os componentes
+do risco e a pontuação final. Ela é atualizada nos próprios caminhos de escrita
+(cadastro do aluno, registro de chamada, atualização de pagamento e saída de turma),
+então a listagem é apenas uma leitura paginada pelo índice {score: -1, _id: 1}.
+
+Componentes:
+- faltas_consecutivas: maior sequência atual de faltas entre as turmas do aluno;
+- taxa_recente: menor taxa de presença nas últimas AULAS_RECENTES aulas de cada turma;
+- inadimplente: status de pagamento diferente de 'pago'.
+"""
+
+from datetime import datetime
+from bson import ObjectId
+from pymongo import UpdateMany, UpdateOne
+from app import mongo
+from app.services import frequencia_service
+
+AULAS_RECENTES = 8
+LIMITE_FALTAS_CONSECUTIVAS = 5
+# Inadimplência sozinha soma 10 pontos; abaixo deste valor o aluno não é listado como em risco
+SCORE_MINIMO_RISCO = 20
+
+
+def _estagio_score():
+    """Estágio de pipeline de atualização que recalcula o score (0 a 100) a partir dos componentes."""
+    turmas = {"$objectToArray": {"$ifNull": ["$turmas", {}]}}
+    consecutivas = {"$ifNull": [{"$max": {"$map": {"input": turmas, "as": "t", "in": "$$t.v.faltas_consecutivas"}}}, 0]}
+    taxa = {"$ifNull": [{"$min": {"$map": {"input": turmas, "as": "t", "in": "$$t.v.taxa_recente"}}}, 1]}
+    inadimplente = {"$cond": [{"$eq": ["$inadimplente", True]}, 1, 0]}
+    return {"$set": {
+        "faltas_consecutivas": consecutivas,
+        "taxa_recente": taxa,
+        "score": {"$round": [{"$add": [
+            # até 50 pontos por faltas seguidas
+            {"$multiply": [{"$min": [consecutivas, LIMITE_FALTAS_CONSECUTIVAS]}, 50 / LIMITE_FALTAS_CONSECUTIVAS]},
+            # até 30 pontos pela queda na taxa de presença recente
+            {"$multiply": [{"$subtract": [1, taxa]}, 30]},
+            # 10 pontos por inadimplência, mais 10 se também estiver faltando
+            {"$multiply": [inadimplente, 10]},
+            {"$cond": [{"$and": [{"$eq": [inadimplente, 1]}, {"$gte": [consecutivas, 2]}]}, 10, 0]}
+        ]}, 1]}
+    }}
+
+
+def _operacao(aluno_id, campos):
+    return UpdateOne(
+        {"_id": aluno_id},
+        [{"$set": {**campos, "atualizado_em": datetime.utcnow()}}, _estagio_score()],
+        upsert=True
+    )
+
+
+def atualizar_frequencia(turma_id, documentos_frequencia):
+    """
+    Atualiza os componentes de frequência a partir dos bitsets recém-gravados
+    (retorno de frequencia_service.registrar_chamada).
+    """
+    operacoes = []
+    for aluno_id, doc in documentos_frequencia.items():
+        operacoes.append(_operacao(aluno_id, {
+            f"turmas.{turma_id}": frequencia_service.indicadores_recentes(doc, AULAS_RECENTES)
+        }))
+    if operacoes:
+        mongo.db.alunos_risco.bulk_write(operacoes, ordered=False)
+
+
+def atualizar_inadimplencia(alunos_ids, inadimplente):
+    """Atualiza o componente de inadimplência dos alunos informados."""
+    operacoes = [_operacao(aluno_id, {"inadimplente": bool(inadimplente)}) for aluno_id in alunos_ids]
+    if operacoes:
+        mongo.db.alunos_risco.bulk_write(operacoes, ordered=False)
+
+
+def sair_das_turmas(saidas):
+    """
+    Remove dos componentes de frequência as turmas que os alunos deixaram
+    ({turma_id: [alunos_ids]}) e recalcula o score, numa única escrita.
+    """
+    operacoes = []
+    for turma_id, alunos_ids in saidas.items():
+        if not alunos_ids:
+            continue
+        restantes = {"$filter": {
+            "input": {"$objectToArray": {"$ifNull": ["$turmas", {}]}},
+            "as": "t",
+            "cond": {"$ne": ["$$t.k", str(turma_id)]}
+        }}
+        operacoes.append(UpdateMany(
+            {"_id": {"$in": list(alunos_ids)}},
+            [{"$set": {"turmas": {"$arrayToObject": restantes}, "atualizado_em": datetime.utcnow()}}, _estagio_score()]
+        ))
+    if operacoes:
+        mongo.db.alunos_risco.bulk_write(operacoes, ordered=False)
+
+
+def remover_aluno(aluno_id):
+    """Remove o aluno da lista de risco (ex.: aluno desativado)."""
+    mongo.db.alunos_risco.delete_one({"_id": ObjectId(aluno_id)})
+
+
+def recalcular_todos():
+    """
+    Recalcula a coleção inteira a partir de `frequencia_alunos`, `usuarios` e `turmas`
+    (só contam as turmas em que o aluno está matriculado, como em sair_das_turmas).
+    """
+    componentes = {}
+    for aluno in mongo.db.usuarios.find({"perfil": "aluno", "ativo": True}, {"status_pagamento.status": 1}):
+        status = (aluno.get('status_pagamento') or {}).get('status')
+        componentes[aluno['_id']] = {"inadimplente": status != 'pago', "turmas": {}}
+
+    matriculas = {
+        (aluno_id, turma['_id'])
+        for turma in mongo.db.turmas.find({}, {"alunos_ids": 1})
+        for aluno_id in turma.get('alunos_ids') or []
+    }
+    for doc in mongo.db.frequencia_alunos.find({"aluno_id": {"$in": list(componentes)}}):
+        if (doc['aluno_id'], doc['turma_id']) not in matriculas:
+            continue
+        componentes[doc['aluno_id']]["turmas"][str(doc['turma_id'])] = \
+            frequencia_service.indicadores_recentes(doc, AULAS_RECENTES)
+
+    mongo.db.alunos_risco.delete_many({"_id": {"$nin": list(componentes)}})
+    operacoes = [_operacao(aluno_id, campos) for aluno_id, campos in componentes.items()]
+    for inicio in range(0, len(operacoes), 1000):
+        mongo.db.alunos_risco.bulk_write(operacoes[inicio:inicio + 1000], ordered=False)
+    return len(operacoes)
+
+
+def _codificar_cursor(doc):
+    return f"{doc['score']}_{doc['_id']}"
+
+
+def _decodificar_cursor(cursor):
+    try:
+        score, aluno_id = cursor.split('_', 1)
+        return float(score), ObjectId(aluno_id)
+    except Exception:
+        raise ValueError("Cursor de paginação inválido.")
+
+
+def listar_alunos_em_risco(limite=20, apos=None, score_minimo=SCORE_MINIMO_RISCO):
+    """
+    Lista os alunos em ordem decrescente de risco, paginando por cursor (keyset),
+    de modo que cada página custa o mesmo independente da posição.
+    Retorna (itens, cursor da próxima página ou None).
+    """
+    filtro = {"score": {"$gte": score_minimo}}
+    if apos:
+        score, aluno_id = _decodificar_cursor(apos)
+        filtro = {"$and": [filtro, {"$or": [
+            {"score": {"$lt": score}},
+            {"score": score, "_id": {"$gt": aluno_id}}
+        ]}]}
+
+    itens = list(mongo.db.alunos_risco.find(filtro).sort([("score", -1), ("_id", 1)]).limit(limite + 1))
+    proximo = _codificar_cursor(itens[limite - 1]) if len(itens) > limite else None
+    itens = itens[:limite]
+
+    nomes = {
+        u['_id']: u.get('nome_completo')
+        for u in mongo.db.usuarios.find({"_id": {"$in": [i['_id'] for i in itens]}}, {"nome_completo": 1})
+    }
+    for item in itens:
+        item['aluno_id'] = item.pop('_id')
+        item['nome_aluno'] = nomes.get(item['aluno_id'])
+    return itens, proximo
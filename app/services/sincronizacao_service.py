@@ -0,0 +1,253 @@
+# app/services/sincronizacao_service.py
+"""
+Sincronização incremental (delta sync) para os clientes móveis.
+
+Carimbo de alteração:
+- toda escrita em turmas, aulas, usuarios e presencas grava `updated_at`, um Timestamp
+  BSON gerado pelo servidor: `$currentDate` nas atualizações (ver `carimbar`) e
+  Timestamp(0, 0) nas inserções, que o servidor troca pelo horário atual (ver `novo_documento`).
+  Upserts que só criam ($setOnInsert) não usam `carimbar`, que também valeria quando o
+  upsert apenas encontra o documento: os criados são carimbados em seguida (`carimbar_inseridos`).
+  Os Timestamps de um mongod são únicos e crescentes, então servem de cursor;
+- exclusões (e soft-deletes) deixam uma lápide em `exclusoes` com o escopo de quem deve
+  recebê-la. Quem sai de uma turma (professor trocado, aluno removido ou movido) recebe
+  lápides 'fora_do_escopo' da turma e das suas aulas no período sincronizado
+  (`registrar_saida_de_turma`). As lápides expiram após RETENCAO_EXCLUSOES_DIAS (índice
+  TTL); um cliente cujo token foi emitido antes disso recebe uma carga completa (`completo: true`).
+
+Token: "<segundos>-<incremento>-<emitido em>" com o último Timestamp entregue e o
+horário de emissão. Sem lotes pendentes, o Timestamp fica SYNC_JANELA_S atrás do relógio
+do banco, para que escritas ainda em andamento (carimbadas antes, confirmadas depois)
+sejam vistas na próxima chamada; o cliente pode receber o mesmo documento duas vezes e
+deve aplicar as mudanças por _id.
+
+Aulas e presenças ficam limitadas às de SYNC_DIAS_AULAS dias atrás em diante.
+
+Documentos antigos, sem `updated_at`, só aparecem na carga completa até serem carimbados
+pelo comando `flask carimbar-atualizacoes`. Se não cabem em um lote (mais de SYNC_LIMITE
+em uma coleção), não há Timestamp para continuar e a sincronização é recusada com
+MigracaoPendente até o comando ser executado.
+"""
+
+import calendar
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from bson.timestamp import Timestamp
+from flask import current_app
+
+from app import mongo, timezone
+
+CAMPO = 'updated_at'
+COLECAO_EXCLUSOES = 'exclusoes'
+COLECOES_SINCRONIZADAS = ('turmas', 'aulas', 'usuarios', 'presencas')
+# Campos internos (senha e chaves de busca) ficam fora do que vai para os clientes
+PROJECOES = {
+    'usuarios': {"senha_hash": 0, "nome_normalizado": 0, "busca_chaves": 0},
+    'turmas': {"busca_chaves": 0},
+}
+RETENCAO_EXCLUSOES_DIAS = 90
+
+
+class MigracaoPendente(Exception):
+    """Há documentos sem `updated_at` demais para uma carga completa (falta `flask carimbar-atualizacoes`)."""
+
+
+# --- CARIMBOS (usados pelos serviços a cada escrita) ---
+
+def carimbar(atualizacao):
+    """Devolve a atualização com `$currentDate` de `updated_at` (Timestamp do servidor)."""
+    atualizacao = dict(atualizacao)
+    atualizacao["$currentDate"] = {**atualizacao.get("$currentDate", {}), CAMPO: {"$type": "timestamp"}}
+    return atualizacao
+
+
+def carimbar_inseridos(colecao, ids):
+    """Carimba os documentos criados por upserts só com $setOnInsert (upserted_ids do resultado)."""
+    ids = list(ids)
+    if ids:
+        mongo.db[colecao].update_many({"_id": {"$in": ids}}, carimbar({}))
+
+
+def novo_documento(documento):
+    """Documento a inserir com `updated_at` vazio (preenchido pelo servidor na inserção)."""
+    return {CAMPO: Timestamp(0, 0), **documento}
+
+
+def registrar_exclusoes(colecao, documentos_ids, motivo, professor_id=None, turmas_ids=(), alunos_ids=()):
+    """
+    Grava as lápides de documentos removidos (ou que saíram do escopo de alguém).
+    professor_id/turmas_ids/alunos_ids dizem quais clientes devem recebê-las.
+    """
+    if not documentos_ids:
+        return
+    agora = datetime.utcnow()
+    mongo.db[COLECAO_EXCLUSOES].insert_many([
+        novo_documento({
+            "colecao": colecao,
+            "documento_id": documento_id,
+            "motivo": motivo,
+            "professor_id": professor_id,
+            "turmas_ids": list(turmas_ids),
+            "alunos_ids": list(alunos_ids),
+            "data_exclusao": agora,
+        })
+        for documento_id in documentos_ids
+    ], ordered=False)
+
+
+def registrar_saida_de_turma(turma_id, professor_id=None, alunos_ids=()):
+    """
+    Lápides 'fora_do_escopo' da turma e das suas aulas sincronizadas (SYNC_DIAS_AULAS)
+    para o professor e os alunos que saíram dela. Uma lápide por documento, com todos os
+    destinatários, e sem `turmas_ids`: quem continua na turma não as recebe.
+    """
+    if not professor_id and not alunos_ids:
+        return
+    inicio = datetime.now(timezone) - timedelta(days=current_app.config["SYNC_DIAS_AULAS"])
+    aulas_ids = [aula["_id"] for aula in mongo.db.aulas.find({"turma_id": turma_id, "data": {"$gte": inicio}}, {"_id": 1})]
+    for colecao, documentos_ids in (('turmas', [turma_id]), ('aulas', aulas_ids)):
+        registrar_exclusoes(colecao, documentos_ids, 'fora_do_escopo', professor_id=professor_id, alunos_ids=alunos_ids)
+
+
+def carimbar_existentes():
+    """Carimba os documentos ainda sem `updated_at` (migração). Retorna {colecao: total}."""
+    return {
+        colecao: mongo.db[colecao].update_many({CAMPO: {"$exists": False}}, carimbar({})).modified_count
+        for colecao in COLECOES_SINCRONIZADAS
+    }
+
+
+# --- TOKEN ---
+
+def ler_token(token):
+    """(Timestamp, emitido em segundos) do token, ou (None, None) para carga completa."""
+    if not token:
+        return None, None
+    try:
+        segundos, incremento, emitido = token.split('-')
+        return Timestamp(int(segundos), int(incremento)), int(emitido)
+    except (ValueError, TypeError, OverflowError):
+        raise ValueError("Token de sincronização inválido.")
+
+
+def _formatar_token(timestamp, emitido):
+    return f"{timestamp.time}-{timestamp.inc}-{emitido}"
+
+
+# --- CONSULTA DAS ALTERAÇÕES ---
+
+def _escopo(usuario_id, perfil):
+    """({colecao: filtro}, filtro das lápides) do que o usuário pode ver."""
+    if perfil == 'admin':
+        return {colecao: {} for colecao in COLECOES_SINCRONIZADAS}, {}
+
+    if perfil == 'professor':
+        filtro_turmas = {"professor_id": usuario_id}
+    else:
+        filtro_turmas = {"alunos_ids": usuario_id}
+    turmas = list(mongo.db.turmas.find(filtro_turmas, {"_id": 1, "alunos_ids": 1}))
+    turmas_ids = [t["_id"] for t in turmas]
+
+    if perfil == 'professor':
+        alunos_ids = {aluno_id for t in turmas for aluno_id in t.get("alunos_ids", [])}
+        filtro_usuarios = {"_id": {"$in": [usuario_id, *alunos_ids]}}
+        filtro_presencas = {"turma_id": {"$in": turmas_ids}}
+        filtro_exclusoes = {"$or": [{"professor_id": usuario_id}, {"turmas_ids": {"$in": turmas_ids}}]}
+    else:
+        filtro_usuarios = {"_id": usuario_id}
+        filtro_presencas = {"aluno_id": usuario_id}
+        filtro_exclusoes = {"$or": [{"alunos_ids": usuario_id}, {"turmas_ids": {"$in": turmas_ids}}]}
+
+    filtros = {
+        "turmas": filtro_turmas,
+        "aulas": {"turma_id": {"$in": turmas_ids}},
+        "usuarios": filtro_usuarios,
+        "presencas": filtro_presencas,
+    }
+    return filtros, filtro_exclusoes
+
+
+def _pagina(colecao, filtro, desde, limite, projecao=None):
+    """
+    Até `limite` documentos alterados depois de `desde`, em ordem de `updated_at`.
+    Retorna (documentos, último Timestamp entregue, há mais).
+    Um lote cortado nunca separa documentos com o mesmo Timestamp (o próximo token usa $gt).
+    Os documentos sem `updated_at` vêm primeiro: um lote cortado só com eles não teria
+    como continuar (MigracaoPendente).
+    """
+    if desde is not None:
+        filtro = {**filtro, CAMPO: {"$gt": desde}}
+    documentos = list(mongo.db[colecao].find(filtro, projecao).sort(CAMPO, 1).limit(limite + 1))
+    mais = len(documentos) > limite
+    if mais:
+        excedente = documentos.pop()
+        ultimo = documentos[-1].get(CAMPO)
+        if ultimo is not None and excedente.get(CAMPO) == ultimo:
+            inteiros = [d for d in documentos if d.get(CAMPO) != ultimo]
+            if inteiros:
+                documentos = inteiros
+    carimbos = [d[CAMPO] for d in documentos if isinstance(d.get(CAMPO), Timestamp)]
+    if mais and not carimbos:
+        raise MigracaoPendente(
+            f"Mais de {limite} documento(s) de '{colecao}' sem `{CAMPO}`: execute `flask carimbar-atualizacoes`."
+        )
+    return documentos, (carimbos[-1] if carimbos else None), mais
+
+
+def _agora_no_banco():
+    """Relógio do mongod em segundos (os Timestamps vêm dele, não do relógio da aplicação)."""
+    return calendar.timegm(mongo.db.command("hello")["localTime"].utctimetuple())
+
+
+def alteracoes(usuario_id, perfil, token=None):
+    """
+    Documentos do escopo do usuário alterados depois do token (ou todos, sem token),
+    as lápides correspondentes e o próximo token.
+    """
+    desde, emitido = ler_token(token)
+    usuario_id = ObjectId(usuario_id)
+    config = current_app.config
+    limite = config["SYNC_LIMITE"]
+
+    agora = _agora_no_banco()
+    # Lápides mais antigas que o token podem ter expirado: recomeça do zero
+    completo = desde is None or emitido < agora - RETENCAO_EXCLUSOES_DIAS * 86400
+    if completo:
+        desde = None
+
+    filtros, filtro_exclusoes = _escopo(usuario_id, perfil)
+    inicio = datetime.now(timezone) - timedelta(days=config["SYNC_DIAS_AULAS"])
+    filtros["aulas"] = {**filtros["aulas"], "data": {"$gte": inicio}}
+    filtros["presencas"] = {**filtros["presencas"], "data_registro": {"$gte": inicio}}
+    if config["PRESENCA_STORAGE"] == 'embutido':
+        # A chamada está no próprio documento da aula (chamada_service)
+        filtros.pop("presencas")
+
+    resposta = {"completo": completo, "mais": False}
+    cortes = []
+    for colecao, filtro in filtros.items():
+        documentos, ultimo, mais = _pagina(colecao, filtro, desde, limite, PROJECOES.get(colecao))
+        resposta[colecao] = documentos
+        if mais:
+            cortes.append(ultimo)
+
+    if completo:
+        resposta["exclusoes"] = []
+    else:
+        lapides, ultimo, mais = _pagina(
+            COLECAO_EXCLUSOES, filtro_exclusoes, desde, limite, {"colecao": 1, "documento_id": 1, "motivo": 1, CAMPO: 1}
+        )
+        resposta["exclusoes"] = lapides
+        if mais:
+            cortes.append(ultimo)
+
+    if cortes:
+        # Continua do menor corte; as coleções que já tinham terminado podem repetir documentos
+        proximo = min(cortes)
+        resposta["mais"] = True
+    else:
+        janela = Timestamp(max(0, agora - int(config["SYNC_JANELA_S"])), 0)
+        proximo = max(desde, janela) if desde is not None else janela
+    resposta["token"] = _formatar_token(proximo, agora)
+    return resposta
@@ -1,8 +1,10 @@
 from bson import ObjectId
+from pymongo import UpdateMany, UpdateOne
 from pymongo.errors import WriteError
 from flask import current_app
 from app import mongo
-from app.services import aula_service
+from app.cache.resultados import em_cache
+from app.services import aula_service, busca_service, referencia_service, risco_service, sincronizacao_service
 
 def _validar_campos_obrigatorios(dados, campos):
     """
@@ -55,13 +57,14 @@ def _preparar_documento_turma(dados):
     """Prepara o dicionário de dados para inserção ou atualização no MongoDB."""
     
     categoria_id_str = dados.get('categoria')
-    categoria_obj = mongo.db.categorias.find_one({"_id": ObjectId(categoria_id_str)})
+    categoria_obj = referencia_service.categoria(ObjectId(categoria_id_str))
     if not categoria_obj:
         raise ValueError("Categoria não encontrada para o ID fornecido.")
 
     # Garante que estamos salvando 'professor_id' como um campo de topo.
     documento = {
         'nome': dados['nome'],
+        'busca_chaves': busca_service.chaves_turma(dados['nome']),
         'categoria': categoria_obj['nome'],
         'horarios': dados.get('horarios', []),
         'esporte_id': ObjectId(dados['esporte_id']),
@@ -76,64 +79,132 @@ def criar_turma(dados):
         # A validação e preparação agora usam a função corrigida
         dados_turma_para_inserir = _preparar_documento_turma(dados)
         
-        resultado = mongo.db.turmas.insert_one(dados_turma_para_inserir)
+        resultado = mongo.db.turmas.insert_one(sincronizacao_service.novo_documento(dados_turma_para_inserir))
         nova_turma_id = str(resultado.inserted_id)
-        current_app.logger.info(f"Turma '{dados['nome']}' criada com sucesso. ID: {nova_turma_id}")
+        current_app.logger.info("Turma '%s' criada com sucesso. ID: %s", dados['nome'], nova_turma_id)
         
         # Agenda aulas para o mês corrente automaticamente
         aula_service.agendar_aulas_para_turma(nova_turma_id)
         
         return nova_turma_id
     except ValueError as ve:
-        current_app.logger.error(f"Erro de validação ao criar turma: {ve}")
+        current_app.logger.error("Erro de validação ao criar turma: %s", ve)
         raise ve
     except Exception as e:
-        current_app.logger.error(f"Erro inesperado ao criar turma: {e}")
+        current_app.logger.exception("Erro inesperado ao criar turma.")
         raise Exception(f"Ocorreu um erro inesperado: {e}")
 
-def listar_turmas():
-    """Lista todas as turmas com informações agregadas de esporte, professor e alunos."""
+def _com_esporte(turmas):
+    """Troca o `esporte_id` de cada turma por {'_id', 'nome'} do cache de referência."""
+    for turma in turmas:
+        turma['esporte'] = referencia_service.resumo_esporte(turma.pop('esporte_id', None))
+    return turmas
+
+# --- ?fields= e ?expand= ---
+# Campos da resposta. Sem ?expand, professor/esporte/alunos saem como ids
+# (professor_id, esporte_id, alunos_ids); expandidos, como documentos resumidos.
+CAMPOS = ('nome', 'categoria', 'horarios', 'esporte', 'professor', 'alunos', 'total_alunos')
+EXPANSOES = ('esporte', 'professor', 'alunos')
+_ORIGEM = {'esporte': 'esporte_id', 'professor': 'professor_id', 'alunos': 'alunos_ids', 'total_alunos': 'alunos_ids'}
+CAMPOS_PROFESSOR = ('_id', 'nome_completo', 'email')
+CAMPOS_ALUNO = ('_id', 'nome_completo', 'email', 'ativo', 'status_pagamento')
+# Senha e campos de busca (busca_service) fora dos alunos completos do formato padrão
+CAMPOS_INTERNOS_ALUNOS = {'alunos.senha_hash': 0, 'alunos.nome_normalizado': 0, 'alunos.busca_chaves': 0}
+
+def _estagios_sob_demanda(campos, expandir):
+    """
+    Estágios após o $match para os campos e expansões pedidos: só os campos necessários
+    seguem no pipeline e só as relações expandidas fazem $lookup.
+    """
+    campos = campos or CAMPOS
+    expandir = set(expandir or ())
+    estagios = [{'$project': {_ORIGEM.get(campo, campo): 1 for campo in campos}}]
+    projecao = {}
+    for campo in campos:
+        if campo == 'total_alunos':
+            projecao[campo] = {'$size': {'$ifNull': ['$alunos_ids', []]}}
+        elif campo == 'professor' and campo in expandir:
+            estagios += [
+                {'$lookup': {'from': 'usuarios', 'localField': 'professor_id', 'foreignField': '_id', 'as': 'professor'}},
+                {'$unwind': {'path': '$professor', 'preserveNullAndEmptyArrays': True}},
+            ]
+            projecao[campo] = {c: f'$professor.{c}' for c in CAMPOS_PROFESSOR}
+        elif campo == 'alunos' and campo in expandir:
+            estagios.append({'$lookup': {'from': 'usuarios', 'localField': 'alunos_ids', 'foreignField': '_id', 'as': 'alunos'}})
+            projecao[campo] = {'$map': {'input': '$alunos', 'as': 'aluno', 'in': {c: f'$$aluno.{c}' for c in CAMPOS_ALUNO}}}
+        else:
+            projecao[_ORIGEM.get(campo, campo)] = 1  # esporte é expandido depois, pelo cache de referência
+    estagios.append({'$project': projecao})
+    return estagios
+
+def _turmas_sob_demanda(filtro, campos, expandir):
+    turmas = list(mongo.db.turmas.aggregate([{'$match': filtro}, *_estagios_sob_demanda(campos, expandir)]))
+    if 'esporte' in (expandir or ()) and 'esporte' in (campos or CAMPOS):
+        _com_esporte(turmas)
+    return turmas
+
+def _filtro_turmas(filtros):
+    """Filtros da listagem (esporte_id e categoria, pelo nome gravado na turma)."""
+    filtro = {}
+    if filtros and filtros.get('esporte_id'):
+        filtro['esporte_id'] = _converter_para_objectid(filtros['esporte_id'], "esporte_id")
+    if filtros and filtros.get('categoria'):
+        filtro['categoria'] = filtros['categoria']
+    return filtro
+
+@em_cache('turmas', 'usuarios', 'esportes', 'metadados')
+def listar_turmas(filtros=None, campos=None, expandir=None):
+    """
+    Lista as turmas com informações agregadas de esporte, professor e alunos.
+    Com `campos`/`expandir` (?fields=/?expand=), traz só o que foi pedido.
+    """
+    filtro = _filtro_turmas(filtros)
+    if campos is not None or expandir is not None:
+        return _turmas_sob_demanda(filtro, campos, expandir)
+
     pipeline = [
-        {'$lookup': {'from': 'esportes', 'localField': 'esporte_id', 'foreignField': '_id', 'as': 'esporte'}},
         {'$lookup': {'from': 'usuarios', 'localField': 'professor_id', 'foreignField': '_id', 'as': 'professor'}},
         {'$lookup': {'from': 'usuarios', 'localField': 'alunos_ids', 'foreignField': '_id', 'as': 'alunos'}},
-        {'$unwind': {'path': '$esporte', 'preserveNullAndEmptyArrays': True}},
         {'$unwind': {'path': '$professor', 'preserveNullAndEmptyArrays': True}},
         {
             '$project': {
-                'nome': 1, 'categoria': 1, 'horarios': 1,
-                'esporte': {'_id': '$esporte._id', 'nome': '$esporte.nome'},
+                'nome': 1, 'categoria': 1, 'horarios': 1, 'esporte_id': 1,
                 'professor': {'_id': '$professor._id', 'nome_completo': '$professor.nome_completo'},
                 'alunos': '$alunos',
                 'total_alunos': {'$size': '$alunos_ids'}
             }
-        }
+        },
+        {'$project': CAMPOS_INTERNOS_ALUNOS},
     ]
-    return list(mongo.db.turmas.aggregate(pipeline))
+    if filtro:
+        pipeline.insert(0, {'$match': filtro})
+    return _com_esporte(list(mongo.db.turmas.aggregate(pipeline)))
 
-def buscar_turma_por_id(turma_id):
-    """Busca uma turma específica pelo seu ID com dados agregados."""
+def buscar_turma_por_id(turma_id, campos=None, expandir=None):
+    """Busca uma turma específica pelo seu ID com dados agregados (ou só os campos pedidos)."""
     object_id = _converter_para_objectid(turma_id, "ID da Turma")
+    if campos is not None or expandir is not None:
+        turmas = _turmas_sob_demanda({'_id': object_id}, campos, expandir)
+        return turmas[0] if turmas else None
+
     pipeline = [
         {'$match': {'_id': object_id}},
-        {'$lookup': {'from': 'esportes', 'localField': 'esporte_id', 'foreignField': '_id', 'as': 'esporte'}},
         {'$lookup': {'from': 'usuarios', 'localField': 'professor_id', 'foreignField': '_id', 'as': 'professor'}},
         {'$lookup': {'from': 'usuarios', 'localField': 'alunos_ids', 'foreignField': '_id', 'as': 'alunos'}},
-        {'$unwind': {'path': '$esporte', 'preserveNullAndEmptyArrays': True}},
         {'$unwind': {'path': '$professor', 'preserveNullAndEmptyArrays': True}},
         {
             '$project': {
-                'nome': 1, 'categoria': 1, 'horarios': 1,
-                'esporte': {'_id': '$esporte._id', 'nome': '$esporte.nome'},
+                'nome': 1, 'categoria': 1, 'horarios': 1, 'esporte_id': 1,
                 'professor': {'_id': '$professor._id', 'nome_completo': '$professor.nome_completo', 'email': '$professor.email'},
                 'alunos': '$alunos'
             }
-        }
+        },
+        {'$project': CAMPOS_INTERNOS_ALUNOS},
     ]
     turmas = list(mongo.db.turmas.aggregate(pipeline))
     if not turmas:
         return None
-    return turmas[0]
+    return _com_esporte(turmas)[0]
 
 def atualizar_turma(turma_id, dados):
     """Atualiza os dados de uma turma."""
@@ -155,14 +226,17 @@ def atualizar_turma(turma_id, dados):
     _validar_dados_turma(dados_completos)
     dados_para_atualizar = _preparar_documento_turma(dados_completos)
 
-    mongo.db.turmas.update_one({'_id': object_id}, {'$set': dados_para_atualizar})
+    mongo.db.turmas.update_one({'_id': object_id}, sincronizacao_service.carimbar({'$set': dados_para_atualizar}))
 
     # Lógica de desvincular/vincular professor e alunos
     prof_antigo_id = str(turma_antiga.get('professor_id'))
     prof_novo_id = dados_completos.get('professor_id')
+    professor_que_saiu = None
     if prof_antigo_id != prof_novo_id:
+        aula_service.atualizar_professor_das_aulas([object_id], ObjectId(prof_novo_id) if prof_novo_id else None)
         if prof_antigo_id:
             _desvincular_professor_de_turmas(prof_antigo_id, [turma_id])
+            professor_que_saiu = turma_antiga.get('professor_id')
         if prof_novo_id:
             _vincular_professor_a_turmas(prof_novo_id, [turma_id])
             
@@ -177,7 +251,13 @@ def atualizar_turma(turma_id, dados):
     if alunos_a_adicionar:
         _vincular_alunos_a_turma(alunos_a_adicionar, turma_id)
 
-    current_app.logger.info(f"Turma ID {turma_id} atualizada com sucesso.")
+    # A turma e as suas aulas saem da sincronização do professor anterior e dos alunos removidos,
+    # e a frequência nela deixa de contar no risco de quem saiu
+    removidos = [_converter_para_objectid(aid, "ID do Aluno") for aid in alunos_a_remover]
+    sincronizacao_service.registrar_saida_de_turma(object_id, professor_id=professor_que_saiu, alunos_ids=removidos)
+    risco_service.sair_das_turmas({object_id: removidos})
+
+    current_app.logger.info("Turma ID %s atualizada com sucesso.", turma_id)
     return True
 
 def deletar_turma(turma_id):
@@ -188,13 +268,18 @@ def deletar_turma(turma_id):
 
     professor_id = str(turma_deletada.get('professor_id'))
     alunos_ids = [str(aid) for aid in turma_deletada.get('alunos_ids', [])]
+    sincronizacao_service.registrar_exclusoes(
+        'turmas', [object_id], 'removido', professor_id=turma_deletada.get('professor_id'),
+        turmas_ids=[object_id], alunos_ids=turma_deletada.get('alunos_ids', [])
+    )
 
     if professor_id:
         _desvincular_professor_de_turmas(professor_id, [turma_id])
     if alunos_ids:
         _desvincular_alunos_de_turma(alunos_ids, turma_id)
+        risco_service.sair_das_turmas({object_id: turma_deletada['alunos_ids']})
 
-    current_app.logger.info(f"Turma ID {turma_id} e suas referências foram deletadas.")
+    current_app.logger.info("Turma ID %s e suas referências foram deletadas.", turma_id)
     return True
 
 # --- Funções de Vinculação ---
@@ -206,7 +291,7 @@ def _vincular_professor_a_turmas(prof_id_str, turmas_ids_str):
     turmas_obj_ids = [_converter_para_objectid(tid, "ID da Turma") for tid in turmas_ids_str]
     mongo.db.usuarios.update_one(
         {'_id': prof_obj_id},
-        {'$addToSet': {'turmas_ids': {'$each': turmas_obj_ids}}}
+        sincronizacao_service.carimbar({'$addToSet': {'turmas_ids': {'$each': turmas_obj_ids}}})
     )
 
 def _desvincular_professor_de_turmas(prof_id_str, turmas_ids_str):
@@ -215,7 +300,7 @@ def _desvincular_professor_de_turmas(prof_id_str, turmas_ids_str):
     turmas_obj_ids = [_converter_para_objectid(tid, "ID da Turma") for tid in turmas_ids_str]
     mongo.db.usuarios.update_one(
         {'_id': prof_obj_id},
-        {'$pullAll': {'turmas_ids': turmas_obj_ids}}
+        sincronizacao_service.carimbar({'$pullAll': {'turmas_ids': turmas_obj_ids}})
     )
 
 def _vincular_alunos_a_turma(alunos_ids_str, turma_id_str):
@@ -224,7 +309,7 @@ def _vincular_alunos_a_turma(alunos_ids_str, turma_id_str):
     turma_obj_id = _converter_para_objectid(turma_id_str, "ID da Turma")
     mongo.db.usuarios.update_many(
         {'_id': {'$in': alunos_obj_ids}},
-        {'$addToSet': {'turma_id': turma_obj_id}} # Assume que um aluno só pode estar em uma turma por vez
+        sincronizacao_service.carimbar({'$addToSet': {'turma_id': turma_obj_id}}) # Assume que um aluno só pode estar em uma turma por vez
     )
 
 def _desvincular_alunos_de_turma(alunos_ids_str, turma_id_str):
@@ -233,27 +318,110 @@ def _desvincular_alunos_de_turma(alunos_ids_str, turma_id_str):
     turma_obj_id = _converter_para_objectid(turma_id_str, "ID da Turma")
     mongo.db.usuarios.update_many(
         {'_id': {'$in': alunos_obj_ids}},
-        {'$pull': {'turma_id': turma_obj_id}}
+        sincronizacao_service.carimbar({'$pull': {'turma_id': turma_obj_id}})
     )
 
-def listar_turmas_por_professor(professor_id_str):
+def mover_alunos_em_lote(movimentos):
+    """
+    Aplica uma lista de movimentações [{"aluno_id": ..., "turma_id": ... ou None}].
+    Cada aluno termina matriculado apenas na turma de destino (ou em nenhuma, se None).
+
+    O estado atual é lido com duas consultas, a diferença é calculada em memória e
+    aplicada com um `bulk_write` em `turmas` e outro em `usuarios`, mantendo
+    `turmas.alunos_ids` e `usuarios.turma_id` consistentes.
+    """
+    destinos = {}
+    for movimento in movimentos:
+        if not isinstance(movimento, dict) or 'aluno_id' not in movimento:
+            raise ValueError("Cada movimentação deve ter 'aluno_id' e 'turma_id'.")
+        aluno_obj_id = _converter_para_objectid(movimento['aluno_id'], "ID do Aluno")
+        turma_id = movimento.get('turma_id')
+        destinos[aluno_obj_id] = _converter_para_objectid(turma_id, "ID da Turma") if turma_id else None
+
+    if not destinos:
+        return {"alunos": 0, "adicionados": 0, "removidos": 0}
+
+    alunos_ids = list(destinos)
+    alunos_encontrados = {
+        u['_id'] for u in mongo.db.usuarios.find({'_id': {'$in': alunos_ids}, 'perfil': 'aluno'}, {'_id': 1})
+    }
+    nao_encontrados = [str(aid) for aid in alunos_ids if aid not in alunos_encontrados]
+    if nao_encontrados:
+        raise ValueError(f"Alunos não encontrados: {', '.join(nao_encontrados)}")
+
+    turmas_destino = {tid for tid in destinos.values() if tid}
+    turmas = {
+        t['_id']: set(t.get('alunos_ids', []))
+        for t in mongo.db.turmas.find(
+            {'$or': [{'_id': {'$in': list(turmas_destino)}}, {'alunos_ids': {'$in': alunos_ids}}]},
+            {'alunos_ids': 1}
+        )
+    }
+    turmas_faltando = [str(tid) for tid in turmas_destino if tid not in turmas]
+    if turmas_faltando:
+        raise ValueError(f"Turmas não encontradas: {', '.join(turmas_faltando)}")
+
+    # Diferença em memória: quem sai e quem entra em cada turma
+    operacoes_turmas = []
+    saidas = {}
+    total_adicionados = total_removidos = 0
+    for turma_obj_id, membros in turmas.items():
+        remover = [aid for aid in alunos_ids if aid in membros and destinos[aid] != turma_obj_id]
+        adicionar = [aid for aid in alunos_ids if destinos[aid] == turma_obj_id and aid not in membros]
+        if remover:
+            operacoes_turmas.append(UpdateOne(
+                {'_id': turma_obj_id}, sincronizacao_service.carimbar({'$pullAll': {'alunos_ids': remover}})
+            ))
+            saidas[turma_obj_id] = remover
+        if adicionar:
+            operacoes_turmas.append(UpdateOne(
+                {'_id': turma_obj_id}, sincronizacao_service.carimbar({'$addToSet': {'alunos_ids': {'$each': adicionar}}})
+            ))
+        total_removidos += len(remover)
+        total_adicionados += len(adicionar)
+
+    # Lado do usuário: um UpdateMany por turma de destino
+    por_destino = {}
+    for aluno_obj_id, turma_obj_id in destinos.items():
+        por_destino.setdefault(turma_obj_id, []).append(aluno_obj_id)
+    operacoes_usuarios = [
+        UpdateMany(
+            {'_id': {'$in': ids}},
+            sincronizacao_service.carimbar(
+                {'$set': {'turma_id': [turma_obj_id]}} if turma_obj_id else {'$unset': {'turma_id': ""}}
+            )
+        )
+        for turma_obj_id, ids in por_destino.items()
+    ]
+
+    if operacoes_turmas:
+        mongo.db.turmas.bulk_write(operacoes_turmas, ordered=False)
+    mongo.db.usuarios.bulk_write(operacoes_usuarios, ordered=False)
+    # A turma antiga e as suas aulas saem da sincronização de quem foi removido
+    for turma_obj_id, removidos in saidas.items():
+        sincronizacao_service.registrar_saida_de_turma(turma_obj_id, alunos_ids=removidos)
+    risco_service.sair_das_turmas(saidas)
+
+    current_app.logger.info(
+        "Matrícula em lote: %s aluno(s), %s adição(ões), %s remoção(ões).", len(destinos), total_adicionados, total_removidos
+    )
+    return {"alunos": len(destinos), "adicionados": total_adicionados, "removidos": total_removidos}
+
+@em_cache('turmas', 'usuarios', 'esportes', 'metadados')
+def listar_turmas_por_professor(professor_id_str, campos=None, expandir=None):
     """
     Lista as turmas de um professor específico com informações agregadas.
     """
     try:
         professor_obj_id = _converter_para_objectid(professor_id_str, "ID do Professor")
     except ValueError as e:
-        current_app.logger.error(f"ID de professor inválido ao listar turmas: {e}")
+        current_app.logger.error("ID de professor inválido ao listar turmas: %s", e)
         return []
+    if campos is not None or expandir is not None:
+        return _turmas_sob_demanda({'professor_id': professor_obj_id}, campos, expandir)
 
     pipeline = [
         {'$match': {'professor_id': professor_obj_id}},  # Filtro principal
-        {'$lookup': {
-            'from': 'esportes', 
-            'localField': 'esporte_id', 
-            'foreignField': '_id', 
-            'as': 'esporte'
-        }},
         {'$lookup': {
             'from': 'usuarios', 
             'localField': 'professor_id', 
@@ -266,12 +434,10 @@ def listar_turmas_por_professor(professor_id_str):
             'foreignField': '_id', 
             'as': 'alunos'
         }},
-        {'$unwind': {'path': '$esporte', 'preserveNullAndEmptyArrays': True}},
         {'$unwind': {'path': '$professor', 'preserveNullAndEmptyArrays': True}},
         {
             '$project': {
-                'nome': 1, 'categoria': 1, 'horarios': 1,
-                'esporte': {'_id': '$esporte._id', 'nome': '$esporte.nome'},
+                'nome': 1, 'categoria': 1, 'horarios': 1, 'esporte_id': 1,
                 'professor': {'_id': '$professor._id', 'nome_completo': '$professor.nome_completo'},
                 'alunos': {
                     '$map': {
@@ -285,6 +451,6 @@ def listar_turmas_por_professor(professor_id_str):
         }
     ]
     
-    turmas = list(mongo.db.turmas.aggregate(pipeline))
-    current_app.logger.info(f"Encontradas {len(turmas)} turmas para o professor ID {professor_id_str}")
+    turmas = _com_esporte(list(mongo.db.turmas.aggregate(pipeline)))
+    current_app.logger.debug("Encontradas %s turmas para o professor ID %s", len(turmas), professor_id_str)
     return turmas
\ No newline at end of file
@@ -1,69 +1,75 @@
 from app import mongo
+import base64
 import bcrypt
 import datetime
-from bson import ObjectId
+from bson import ObjectId, json_util
+from bson.errors import InvalidId
 from dateutil.relativedelta import relativedelta
+from pymongo import UpdateOne
+from app.services import aula_service, busca_service, risco_service, sincronizacao_service, turma_service
 
 def _adicionar_aluno_a_turma(aluno_id, turma_id):
     """Função auxiliar para adicionar/mover um aluno para uma turma."""
     if not turma_id or turma_id == 'Nenhuma': # 'Nenhuma' pode ser um valor enviado pelo frontend
         return
 
-    aluno_obj_id = ObjectId(aluno_id)
-    turma_obj_id = ObjectId(turma_id)
-
-    # Primeiro, remove o aluno de qualquer outra turma em que ele possa estar,
-    # garantindo que um aluno pertença a apenas uma turma.
-    mongo.db.turmas.update_many(
-        {"alunos_ids": aluno_obj_id},
-        {"$pull": {"alunos_ids": aluno_obj_id}}
-    )
-
-    # Adiciona o aluno à nova turma selecionada
-    mongo.db.turmas.update_one(
-        {"_id": turma_obj_id},
-        {"$addToSet": {"alunos_ids": aluno_obj_id}} # $addToSet previne duplicatas
-    )
+    # Remove o aluno de qualquer outra turma e o adiciona à nova, garantindo que
+    # um aluno pertença a apenas uma turma (e atualizando também usuarios.turma_id).
+    turma_service.mover_alunos_em_lote([{"aluno_id": aluno_id, "turma_id": turma_id}])
 
 def _vincular_professor_a_turmas(professor_id, turmas_ids):
     """Função auxiliar para vincular um professor a uma ou mais turmas."""
     prof_obj_id = ObjectId(professor_id)
+    novas_turmas = [ObjectId(tid) for tid in turmas_ids or []]
+
+    # Turmas que mudam de dono saem da sincronização de quem as tinha
+    liberadas = []
+    for turma in mongo.db.turmas.find(
+        {"$or": [{"professor_id": prof_obj_id}, {"_id": {"$in": novas_turmas}}]}, {"professor_id": 1}
+    ):
+        dono_atual = turma.get("professor_id")
+        if dono_atual and (dono_atual != prof_obj_id or turma["_id"] not in novas_turmas):
+            sincronizacao_service.registrar_saida_de_turma(turma["_id"], professor_id=dono_atual)
+        if dono_atual == prof_obj_id and turma["_id"] not in novas_turmas:
+            liberadas.append(turma["_id"])
     
     # Remove este professor de QUALQUER turma para começar do zero.
     # Isso garante que se o admin desmarcar uma turma, o professor seja removido dela.
     mongo.db.turmas.update_many(
         {"professor_id": prof_obj_id},
-        {"$unset": {"professor_id": ""}}
+        sincronizacao_service.carimbar({"$unset": {"professor_id": ""}})
     )
 
     # Se uma lista de turmas foi enviada, vincula o professor a elas.
-    if turmas_ids:
+    if novas_turmas:
         mongo.db.turmas.update_many(
-            {"_id": {"$in": [ObjectId(tid) for tid in turmas_ids]}},
-            {"$set": {"professor_id": prof_obj_id}}
+            {"_id": {"$in": novas_turmas}},
+            sincronizacao_service.carimbar({"$set": {"professor_id": prof_obj_id}})
         )
 
-def criar_usuario(dados_usuario):
-    """
-    Cria um novo usuário e inicializa campos padrão dependendo do perfil.
-    """
-    if mongo.db.usuarios.find_one({"email": dados_usuario['email']}):
-        raise ValueError("O e-mail informado já está em uso.")
-    
-    senha_hash = bcrypt.hashpw(dados_usuario['senha'].encode('utf-8'), bcrypt.gensalt())
-    
-    novo_usuario = {
+    # Aulas de hoje em diante acompanham o professor da turma (aulas.professor_id)
+    aula_service.atualizar_professor_das_aulas(liberadas, None)
+    aula_service.atualizar_professor_das_aulas(novas_turmas, prof_obj_id)
+
+def montar_documento_usuario(dados_usuario, senha_hash):
+    """Monta o documento de um novo usuário, inicializando os campos padrão do perfil."""
+    novo_usuario = sincronizacao_service.novo_documento({
         "nome_completo": dados_usuario['nome_completo'],
+        "nome_normalizado": busca_service.normalizar(dados_usuario['nome_completo']),
+        "busca_chaves": busca_service.chaves_usuario(dados_usuario['nome_completo'], dados_usuario['email']),
         "email": dados_usuario['email'],
-        "senha_hash": senha_hash, # Salva como bytes, é mais seguro
+        "senha_hash": senha_hash,
         "perfil": dados_usuario.get('perfil'),
         "ativo": True,
         "data_criacao": datetime.datetime.utcnow(),
-    }
+    })
 
     if novo_usuario['perfil'] == 'aluno':
-        if 'data_nascimento' in dados_usuario and dados_usuario['data_nascimento']:
-            novo_usuario['data_nascimento'] = datetime.datetime.fromisoformat(dados_usuario['data_nascimento'])
+        data_nascimento = dados_usuario.get('data_nascimento')
+        if data_nascimento:
+            if isinstance(data_nascimento, str):
+                data_nascimento = datetime.datetime.fromisoformat(data_nascimento)
+            novo_usuario['data_nascimento'] = data_nascimento
         
         # Inicializa o status de pagamento para todo novo aluno
         novo_usuario['status_pagamento'] = {
@@ -74,7 +80,24 @@ def criar_usuario(dados_usuario):
         novo_usuario['telefone'] = dados_usuario.get('telefone')
         novo_usuario['responsavel'] = dados_usuario.get('responsavel')
 
+    return novo_usuario
+
+def criar_usuario(dados_usuario):
+    """
+    Cria um novo usuário e inicializa campos padrão dependendo do perfil.
+    """
+    if mongo.db.usuarios.find_one({"email": dados_usuario['email']}):
+        raise ValueError("O e-mail informado já está em uso.")
+    
+    senha_hash = bcrypt.hashpw(dados_usuario['senha'].encode('utf-8'), bcrypt.gensalt())
+    novo_usuario = montar_documento_usuario(dados_usuario, senha_hash) # Salva o hash como bytes
+
     resultado = mongo.db.usuarios.insert_one(novo_usuario)
+    if novo_usuario['perfil'] == 'aluno':
+        # Já entra no risco com a inadimplência, como em risco_service.recalcular_todos
+        risco_service.atualizar_inadimplencia(
+            [resultado.inserted_id], novo_usuario['status_pagamento']['status'] != 'pago'
+        )
     return str(resultado.inserted_id)
 
 def atualizar_usuario(usuario_id, dados_atualizacao):
@@ -91,6 +114,13 @@ def atualizar_usuario(usuario_id, dados_atualizacao):
     for campo in campos_permitidos:
         if campo in dados_atualizacao:
             update_fields[campo] = dados_atualizacao[campo]
+    if 'nome_completo' in update_fields:
+        update_fields['nome_normalizado'] = busca_service.normalizar(update_fields['nome_completo'])
+    if 'nome_completo' in update_fields or 'email' in update_fields:
+        atual = mongo.db.usuarios.find_one({"_id": obj_id}, {"nome_completo": 1, "email": 1}) or {}
+        update_fields['busca_chaves'] = busca_service.chaves_usuario(
+            update_fields.get('nome_completo', atual.get('nome_completo')), update_fields.get('email', atual.get('email'))
+        )
             
     # Converte as strings de data para objetos ISODate de forma segura
     if 'data_nascimento' in dados_atualizacao and dados_atualizacao['data_nascimento']:
@@ -103,7 +133,7 @@ def atualizar_usuario(usuario_id, dados_atualizacao):
         update_fields['senha_hash'] = bcrypt.hashpw(senha_texto_puro, bcrypt.gensalt()).decode('utf-8')
 
     if update_fields:
-        mongo.db.usuarios.update_one({"_id": obj_id}, {"$set": update_fields})
+        mongo.db.usuarios.update_one({"_id": obj_id}, sincronizacao_service.carimbar({"$set": update_fields}))
     
     # Lógica de vínculo com a turma
     perfil_atual = dados_atualizacao.get('perfil') or mongo.db.usuarios.find_one({"_id": obj_id}).get('perfil')
@@ -120,10 +150,54 @@ def atualizar_usuario(usuario_id, dados_atualizacao):
     
     return True # Retorna sucesso
 
-def listar_usuarios(filtros=None):
-    """
-    Retorna uma lista de usuários, com suporte a filtros.
-    """
+# --- ?fields= e ?expand= ---
+# `turmas` sem ?expand sai como ids (turma_id dos alunos, turmas_ids dos professores);
+# expandido, como [{'_id', 'nome'}]. senha_hash nunca é devolvido.
+CAMPOS = (
+    'nome_completo', 'email', 'perfil', 'ativo', 'data_nascimento', 'data_matricula', 'data_criacao',
+    'telefone', 'responsavel', 'contato_responsavel', 'status_pagamento', 'turmas'
+)
+EXPANSOES = ('turmas',)
+PROJECAO_PADRAO = {"senha_hash": 0, "nome_normalizado": 0, "busca_chaves": 0}
+
+def _lista_ou_vazia(campo):
+    return {"$cond": [{"$isArray": campo}, campo, []]}
+
+def _consultar_usuarios(filtro, campos=None, expandir=None, ordenacao=None, pular=0, limite=0):
+    """Usuários do filtro só com os campos pedidos; $lookup em turmas apenas se expandidas."""
+    projecao = {}
+    for campo in campos or ():
+        if campo == 'turmas':
+            projecao.update({"turma_id": 1, "turmas_ids": 1})
+        elif campo not in PROJECAO_PADRAO:
+            projecao[campo] = 1
+    # Os campos internos (senha_hash...) nunca saem, peça-se o que for
+    if not projecao:
+        projecao = dict(PROJECAO_PADRAO)
+
+    if 'turmas' not in (expandir or ()) or 'turmas' not in (campos or CAMPOS):
+        cursor = mongo.db.usuarios.find(filtro, projecao)
+        if ordenacao:
+            cursor = cursor.sort(ordenacao)
+        return list(cursor.skip(pular).limit(limite))
+
+    pipeline = [{"$match": filtro}]
+    if ordenacao:
+        pipeline.append({"$sort": dict(ordenacao)})
+    if pular:
+        pipeline.append({"$skip": pular})
+    if limite:
+        pipeline.append({"$limit": limite})
+    pipeline += [
+        {"$project": projecao},
+        {"$addFields": {"_turmas_ids": {"$concatArrays": [_lista_ou_vazia("$turma_id"), _lista_ou_vazia("$turmas_ids")]}}},
+        {"$lookup": {"from": "turmas", "localField": "_turmas_ids", "foreignField": "_id", "as": "turmas"}},
+        {"$addFields": {"turmas": {"$map": {"input": "$turmas", "as": "turma", "in": {"_id": "$$turma._id", "nome": "$$turma.nome"}}}}},
+        {"$project": {"_turmas_ids": 0, "turma_id": 0, "turmas_ids": 0}},
+    ]
+    return list(mongo.db.usuarios.aggregate(pipeline))
+
+def _filtro_usuarios(filtros):
     query = { 'ativo': True } # Por padrão, sempre busca usuários ativos
     if filtros:
         if 'perfil' in filtros:
@@ -132,12 +206,175 @@ def listar_usuarios(filtros=None):
             query['perfil'] = {"$ne": filtros['perfil_ne']}
         if 'status_pagamento' in filtros:
              query['status_pagamento.status'] = filtros['status_pagamento']
-            
-    return list(mongo.db.usuarios.find(query, {"senha_hash": 0}))
+        if filtros.get('busca'):
+            query.update(busca_service.filtro_prefixo('nome_normalizado', filtros['busca']))
+    return query
+
+def listar_usuarios(filtros=None, campos=None, expandir=None):
+    """
+    Retorna uma lista de usuários, com suporte a filtros e a ?fields=/?expand=.
+    """
+    return _consultar_usuarios(_filtro_usuarios(filtros), campos, expandir)
+
+# --- LISTAGEM PAGINADA ---
+# Ordenações permitidas em ?ordem= (ex.: "-data_criacao,nome"): campo da API → campo no banco.
+# O nome é ordenado pela forma normalizada (sem acentos), a mesma usada na busca.
+ORDENACOES = {
+    'nome': 'nome_normalizado',
+    'email': 'email',
+    'perfil': 'perfil',
+    'data_criacao': 'data_criacao',
+    'status_pagamento': 'status_pagamento.status',
+}
+ORDEM_PADRAO = 'nome'
+
+def ler_ordem(ordem):
+    """[(campo no banco, 1 ou -1), ...] de ?ordem=, sempre terminando em _id (desempate)."""
+    ordenacao = []
+    for item in (ordem or ORDEM_PADRAO).split(','):
+        item = item.strip()
+        campo = ORDENACOES.get(item.lstrip('-'))
+        if not campo:
+            raise ValueError(f"Ordenação inválida: '{item}'. Permitidas: {', '.join(ORDENACOES)}.")
+        if campo not in dict(ordenacao):
+            ordenacao.append((campo, -1 if item.startswith('-') else 1))
+    return ordenacao + [('_id', 1)]
+
+def _valor_ordenacao(usuario, campo):
+    if campo == 'nome_normalizado':
+        # Fora da projeção padrão: recalculado do nome (é a mesma forma gravada)
+        return busca_service.normalizar(usuario.get('nome_completo'))
+    valor = usuario
+    for parte in campo.split('.'):
+        valor = valor.get(parte) if isinstance(valor, dict) else None
+    return valor
+
+def _codificar_cursor(ordenacao, usuario):
+    valores = [_valor_ordenacao(usuario, campo) for campo, _ in ordenacao]
+    return base64.urlsafe_b64encode(json_util.dumps([ordenacao, valores]).encode('utf-8')).decode('ascii')
+
+def _decodificar_cursor(cursor, ordenacao):
+    try:
+        ordem_cursor, valores = json_util.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError("Cursor de paginação inválido.")
+    if [tuple(item) for item in ordem_cursor] != ordenacao or len(valores) != len(ordenacao):
+        raise ValueError("O cursor não corresponde à ordenação pedida.")
+    return valores
+
+def _filtro_apos(ordenacao, valores):
+    """
+    Keyset: documentos depois de `valores` na ordenação. Campos ausentes/nulos vêm antes
+    de qualquer valor (ordem crescente), como no sort do MongoDB.
+    """
+    ramos = []
+    for i, (campo, direcao) in enumerate(ordenacao):
+        anteriores = {c: v for (c, _), v in zip(ordenacao[:i], valores[:i])}
+        valor = valores[i]
+        if direcao == 1:
+            depois = {campo: {"$gt": valor}} if valor is not None else {campo: {"$ne": None}}
+        elif valor is not None:
+            depois = {"$or": [{campo: {"$lt": valor}}, {campo: None}]}
+        else:
+            continue  # em ordem decrescente, nada vem depois de um nulo
+        ramos.append({**anteriores, **depois})
+    return {"$or": ramos} if ramos else {"_id": None}
+
+def _campos_com_ordenacao(campos, ordenacao):
+    """Campos da projeção mais os necessários para o cursor, e os que devem sair da resposta."""
+    if campos is None:
+        return None, ()
+    extras = []
+    for campo, _ in ordenacao:
+        origem = 'nome_completo' if campo == 'nome_normalizado' else campo
+        topo = origem.split('.')[0]
+        if topo != '_id' and topo not in campos:
+            extras.append(topo)
+    return tuple(campos) + tuple(dict.fromkeys(extras)), tuple(dict.fromkeys(extras))
+
+def paginar_usuarios(filtros=None, ordem=None, limite=50, apos=None, pagina=None, campos=None, expandir=None):
+    """
+    Página de usuários ativos em `ordem` (ver ORDENACOES), por cursor (`apos`, keyset:
+    custo constante em qualquer posição) ou por número de página (`pagina`, a partir de 1).
+    `filtros` aceita perfil, status_pagamento e busca (prefixo do nome, sem acentos).
+    Retorna (itens, cursor da próxima página ou None).
+    """
+    if apos and pagina:
+        raise ValueError("Use 'apos' ou 'pagina', não os dois.")
+    ordenacao = ler_ordem(ordem)
+    filtro = _filtro_usuarios(filtros)
+    if apos:
+        filtro = {"$and": [filtro, _filtro_apos(ordenacao, _decodificar_cursor(apos, ordenacao))]}
+    pular = (pagina - 1) * limite if pagina else 0
+
+    campos_consulta, extras = _campos_com_ordenacao(campos, ordenacao)
+    itens = _consultar_usuarios(filtro, campos_consulta, expandir, ordenacao, pular, limite + 1)
+    proximo = _codificar_cursor(ordenacao, itens[limite - 1]) if len(itens) > limite else None
+    itens = itens[:limite]
+    for usuario in itens:
+        for campo in extras:
+            usuario.pop(campo, None)
+    return itens, proximo
+
+def contar_usuarios(filtros=None):
+    """
+    Total e contagens por perfil e por status de pagamento (badges dos filtros) em uma
+    única agregação. Cada contagem ignora o filtro da própria dimensão: com ?perfil=aluno,
+    `perfil` ainda traz quantos professores e admins há para a mesma busca.
+    """
+    filtros = dict(filtros or {})
+    base = _filtro_usuarios({"busca": filtros.get("busca")})
+    dimensoes = {k: v for k, v in _filtro_usuarios(filtros).items() if k in ('perfil', 'status_pagamento.status')}
+    por_perfil = {k: v for k, v in dimensoes.items() if k != 'perfil'}
+    por_status = {k: v for k, v in dimensoes.items() if k != 'status_pagamento.status'}
+
+    def grupo(campo):
+        return {"$group": {"_id": f"${campo}", "total": {"$sum": 1}}}
+
+    resultado = next(mongo.db.usuarios.aggregate([
+        {"$match": base},
+        {"$project": {"perfil": 1, "status_pagamento.status": 1}},
+        {"$facet": {
+            "total": [{"$match": dimensoes}, {"$count": "total"}],
+            "perfil": [{"$match": por_perfil}, grupo("perfil")],
+            "status_pagamento": [{"$match": por_status}, grupo("status_pagamento.status")],
+        }},
+    ]), {})
+    return {
+        "total": (resultado.get("total") or [{}])[0].get("total", 0),
+        "perfil": {g["_id"]: g["total"] for g in resultado.get("perfil", []) if g["_id"] is not None},
+        "status_pagamento": {g["_id"]: g["total"] for g in resultado.get("status_pagamento", []) if g["_id"] is not None},
+    }
+
+def normalizar_nomes():
+    """Grava `nome_normalizado` nos usuários que ainda não o têm (migração). Retorna o total."""
+    operacoes = [
+        UpdateOne({"_id": u["_id"]}, {"$set": {"nome_normalizado": busca_service.normalizar(u.get("nome_completo"))}})
+        for u in mongo.db.usuarios.find({"nome_normalizado": {"$exists": False}}, {"nome_completo": 1})
+    ]
+    for inicio in range(0, len(operacoes), 1000):
+        mongo.db.usuarios.bulk_write(operacoes[inicio:inicio + 1000], ordered=False)
+    return len(operacoes)
+
+def encontrar_usuario_por_id(usuario_id, campos=None, expandir=None):
+    """Busca um usuário pelo ID (sem senha_hash), ou None se o ID for inválido ou não existir."""
+    try:
+        obj_id = ObjectId(usuario_id)
+    except (InvalidId, TypeError):
+        return None
+    usuarios = _consultar_usuarios({"_id": obj_id}, campos, expandir)
+    return usuarios[0] if usuarios else None
 
 def encontrar_usuario_por_email(email):
-    """Busca um usuário pelo seu e-mail."""
-    return mongo.db.usuarios.find_one({"email": email})
+    """
+    Busca um usuário pelo seu e-mail. Os importados são gravados em minúsculas
+    (importacao_service), então sem correspondência exata tenta a forma normalizada.
+    """
+    usuario = mongo.db.usuarios.find_one({"email": email})
+    normalizado = str(email).strip().lower()
+    if usuario is None and normalizado != email:
+        usuario = mongo.db.usuarios.find_one({"email": normalizado})
+    return usuario
 
 def verificar_senha(senha_hash, senha_fornecida):
     """Verifica se a senha fornecida corresponde ao hash armazenado."""
@@ -150,19 +387,27 @@ def deletar_usuario(usuario_id):
         # Além de desativar, também remove o aluno de qualquer turma
         mongo.db.turmas.update_many(
             {"alunos_ids": obj_id},
-            {"$pull": {"alunos_ids": obj_id}}
+            sincronizacao_service.carimbar({"$pull": {"alunos_ids": obj_id}})
         )
         # E desvincula o professor
         mongo.db.turmas.update_many(
             {"professor_id": obj_id},
-            {"$unset": {"professor_id": ""}}
+            sincronizacao_service.carimbar({"$unset": {"professor_id": ""}})
         )
+        aula_service.desvincular_professor_das_aulas(obj_id)
         
-        resultado = mongo.db.usuarios.update_one(
-            {"_id": obj_id},
-            {"$set": {"ativo": False}}
+        usuario = mongo.db.usuarios.find_one_and_update(
+            {"_id": obj_id, "ativo": {"$ne": False}},
+            sincronizacao_service.carimbar({"$set": {"ativo": False}}),
+            projection={"turma_id": 1}
+        )
+        risco_service.remover_aluno(obj_id)
+        if not usuario:
+            return 0
+        sincronizacao_service.registrar_exclusoes(
+            'usuarios', [obj_id], 'desativado', turmas_ids=usuario.get('turma_id') or [], alunos_ids=[obj_id]
         )
-        return resultado.modified_count
+        return 1
     except Exception:
         return 0
 
@@ -193,11 +438,19 @@ def atualizar_status_pagamento(usuario_id, dados_pagamento):
         update_fields['status_pagamento.data_ultimo_pagamento'] = hoje
         update_fields['status_pagamento.data_vencimento'] = proximo_vencimento
     
-    resultado = mongo.db.usuarios.update_one(
+    usuario_anterior = mongo.db.usuarios.find_one_and_update(
         {"_id": obj_id},
-        {"$set": update_fields}
+        sincronizacao_service.carimbar({"$set": update_fields}),
+        projection={"perfil": 1, "status_pagamento": 1}
     )
-    return resultado.modified_count
+    if not usuario_anterior:
+        return 0
+
+    if usuario_anterior.get('perfil') == 'aluno':
+        risco_service.atualizar_inadimplencia([obj_id], status != 'pago')
+
+    status_anterior = (usuario_anterior.get('status_pagamento') or {}).get('status')
+    return 1 if status == 'pago' or status_anterior != status else 0
 
 def verificar_e_atualizar_vencimentos():
     """
@@ -205,13 +458,19 @@ def verificar_e_atualizar_vencimentos():
     se a data de vencimento já passou e o status ainda é 'pago'.
     """
     hoje = datetime.datetime.utcnow()
+    filtro = {
+        "perfil": "aluno",
+        "ativo": True,
+        "status_pagamento.status": "pago",
+        "status_pagamento.data_vencimento": {"$lt": hoje}
+    }
+    vencidos = [u['_id'] for u in mongo.db.usuarios.find(filtro, {"_id": 1})]
+    if not vencidos:
+        return 0
+
     resultado = mongo.db.usuarios.update_many(
-        {
-            "perfil": "aluno",
-            "ativo": True,
-            "status_pagamento.status": "pago",
-            "status_pagamento.data_vencimento": {"$lt": hoje}
-        },
-        {"$set": {"status_pagamento.status": "pendente"}}
+        {"_id": {"$in": vencidos}, **filtro},
+        sincronizacao_service.carimbar({"$set": {"status_pagamento.status": "pendente"}})
     )
+    risco_service.atualizar_inadimplencia(vencidos, True)
     return resultado.modified_count
\ No newline at end of file
@@ -0,0 +1,10 @@
+"""
+Benchmarks e verificações de desempenho (executados com `python -m benchmarks.<modulo>`).
+
+- servicos: latência das funções de serviço sobre a escola sintética, em várias escalas.
+- armazenamento_presenca: compara os formatos de armazenamento de presença.
+- orcamento_operacoes: orçamento de operações do MongoDB por endpoint (N+1).
+- planos: índices e razões de exame dos planos de consulta das funções de serviço.
+- tempo_importacao: orçamento de tempo de importação do criar_app() (sem bibliotecas pesadas).
+- carga: teste de carga HTTP com professores e admins simultâneos contra um servidor local.
+"""
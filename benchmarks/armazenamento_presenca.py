@@ -0,0 +1,111 @@
+"""
+Compara os formatos de armazenamento de presença ('documentos' x 'embutido'):
+latência de gravação da chamada, latência das leituras e tamanho em disco.
+
+Uso (com um MongoDB local):
+    BENCH_MONGO_URI=mongodb://localhost:27017/ciaf_benchmark \
+        python -m benchmarks.armazenamento_presenca --alunos 30 --aulas 200
+
+ATENÇÃO: as coleções do banco indicado são apagadas. O nome do banco precisa conter 'bench'.
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from benchmarks.comum import cronometrar, resumo, uri_de_benchmark
+
+
+def _tamanho(db, colecao):
+    try:
+        stats = db.command("collStats", colecao)
+    except Exception:
+        return {"documentos": 0, "tamanho_bytes": 0, "armazenamento_bytes": 0, "indices_bytes": 0}
+    return {
+        "documentos": stats.get("count", 0),
+        "tamanho_bytes": stats.get("size", 0),
+        "armazenamento_bytes": stats.get("storageSize", 0),
+        "indices_bytes": stats.get("totalIndexSize", 0),
+    }
+
+
+def _semear(db, total_alunos, total_aulas):
+    """Cria um esporte, uma turma com `total_alunos` alunos e `total_aulas` aulas (uma por dia)."""
+    for colecao in ("usuarios", "turmas", "aulas", "presencas", "esportes"):
+        db[colecao].drop()
+
+    esporte_id = db.esportes.insert_one({"nome": "Futebol", "descricao": ""}).inserted_id
+    alunos_ids = db.usuarios.insert_many([
+        {"nome_completo": f"Aluno {i}", "email": f"aluno{i}@bench.local", "perfil": "aluno", "ativo": True}
+        for i in range(total_alunos)
+    ]).inserted_ids
+    turma_id = db.turmas.insert_one({
+        "nome": "Turma Benchmark", "categoria": "Sub-11", "horarios": [],
+        "esporte_id": esporte_id, "professor_id": ObjectId(), "alunos_ids": alunos_ids
+    }).inserted_id
+
+    inicio = datetime(2024, 1, 1, 18, 0)
+    aulas_ids = db.aulas.insert_many([
+        {"turma_id": turma_id, "data": inicio + timedelta(days=i), "status": "agendada"}
+        for i in range(total_aulas)
+    ]).inserted_ids
+    return alunos_ids, aulas_ids, inicio
+
+
+def executar(total_alunos, total_aulas, repeticoes_leitura):
+    os.environ["MONGO_URI"] = uri_de_benchmark()
+
+    from app import criar_app, mongo
+    from app.services import aula_service, indices_service
+
+    app = criar_app()
+    resultados = {"parametros": {"alunos": total_alunos, "aulas": total_aulas}, "modos": {}}
+
+    for modo in ("documentos", "embutido"):
+        app.config["PRESENCA_STORAGE"] = modo
+        with app.test_request_context():
+            alunos_ids, aulas_ids, inicio = _semear(mongo.db, total_alunos, total_aulas)
+            indices_service.garantir_indices()
+
+            chamada = [
+                {"aluno_id": str(aluno_id), "status": "presente" if i % 4 else "ausente"}
+                for i, aluno_id in enumerate(alunos_ids)
+            ]
+            escrita = []
+            for aula_id in aulas_ids:
+                escrita.extend(cronometrar(lambda: aula_service.marcar_presenca_lote(str(aula_id), chamada), 1))
+
+            aula_meio = str(aulas_ids[len(aulas_ids) // 2])
+            dia_meio = inicio + timedelta(days=len(aulas_ids) // 2)
+            leituras = {
+                "buscar_detalhes_aula": cronometrar(lambda: aula_service.buscar_detalhes_aula(aula_meio), repeticoes_leitura),
+                "listar_aulas_por_data": cronometrar(lambda: aula_service.listar_aulas_por_data(dia_meio), repeticoes_leitura),
+                "listar_historico_aulas": cronometrar(lambda: aula_service.listar_historico_aulas(), max(1, repeticoes_leitura // 10)),
+            }
+
+            resultados["modos"][modo] = {
+                "escrita_chamada": resumo(escrita),
+                "leitura": {nome: resumo(tempos) for nome, tempos in leituras.items()},
+                "armazenamento": {
+                    "aulas": _tamanho(mongo.db, "aulas"),
+                    "presencas": _tamanho(mongo.db, "presencas"),
+                },
+            }
+
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alunos", type=int, default=30)
+    parser.add_argument("--aulas", type=int, default=200)
+    parser.add_argument("--repeticoes", type=int, default=50, help="Repetições de cada leitura.")
+    args = parser.parse_args()
+    print(json.dumps(executar(args.alunos, args.aulas, args.repeticoes), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Teste de carga HTTP com usuários sintéticos simultâneos.
+
+Simula o início das aulas: `--professores` professores fazem login ao mesmo tempo e,
+em laço até o fim de `--duracao`, cada um:
+  1. abre as suas turmas (GET /api/turmas/professor/me) e as aulas do dia (GET /api/aulas/por-data);
+  2. busca ou cria a próxima aula de uma das turmas (POST /api/aulas/get-or-create);
+  3. abre a lista de chamada (GET /api/presencas/aula/<id>) e registra a chamada
+     (POST /api/aulas/<id>/presencas);
+  4. a cada `--pdf-a-cada` iterações, exporta a lista em PDF (GET /api/aulas/<id>/exportar).
+Em paralelo, `--admins` administradores consultam o dashboard, a lista de turmas e os
+alunos em risco.
+
+Ao final, imprime a vazão e os percentis p50/p95/p99 de cada endpoint (ou JSON com --json).
+Usa apenas a biblioteca padrão (http.client + threads).
+
+Uso, com o servidor rodando contra o banco de benchmark:
+    BENCH_MONGO_URI=mongodb://localhost:27017/ciaf_benchmark python -m benchmarks.carga --semear --professores 50
+    MONGO_URI=mongodb://localhost:27017/ciaf_benchmark gunicorn wsgi:app   # em outro terminal
+    python -m benchmarks.carga --url http://127.0.0.1:8000 --professores 50 --duracao 60
+
+`--semear` (re)cria a escola sintética em BENCH_MONGO_URI com professores suficientes e
+sai; os usuários são professor<N>@bench.local / admin@bench.local com a senha padrão.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+from benchmarks import escola_sintetica
+from benchmarks.comum import identificacao, percentil, uri_de_benchmark
+
+DIAS_SEMANA = escola_sintetica.DIAS_SEMANA
+
+
+class Cliente:
+    """Conexão HTTP persistente de um usuário virtual, registrando a latência de cada chamada."""
+
+    def __init__(self, url_base, medicoes, timeout=30):
+        partes = urlsplit(url_base)
+        self._classe = http.client.HTTPSConnection if partes.scheme == "https" else http.client.HTTPConnection
+        self._endereco = (partes.hostname, partes.port)
+        self._timeout = timeout
+        self._conexao = None
+        self._medicoes = medicoes
+        self.token = None
+
+    def _conectar(self):
+        self._conexao = self._classe(*self._endereco, timeout=self._timeout)
+
+    def requisitar(self, metodo, caminho, rotulo, corpo=None):
+        """Envia a requisição e devolve (status, corpo decodificado ou None)."""
+        cabecalhos = {"Accept": "application/json"}
+        dados = None
+        if corpo is not None:
+            dados = json.dumps(corpo).encode("utf-8")
+            cabecalhos["Content-Type"] = "application/json"
+        if self.token:
+            cabecalhos["Authorization"] = f"Bearer {self.token}"
+
+        for tentativa in range(2):
+            if self._conexao is None:
+                self._conectar()
+            inicio = time.perf_counter()
+            try:
+                self._conexao.request(metodo, caminho, body=dados, headers=cabecalhos)
+                resposta = self._conexao.getresponse()
+                conteudo = resposta.read()
+            except (http.client.HTTPException, OSError) as e:
+                self._conexao.close()
+                self._conexao = None
+                if tentativa == 0 and isinstance(e, (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)):
+                    continue  # conexão keep-alive fechada pelo servidor: reconecta uma vez
+                self._medicoes.registrar(rotulo, (time.perf_counter() - inicio) * 1000, f"erro:{type(e).__name__}")
+                return None, None
+            duracao = (time.perf_counter() - inicio) * 1000
+            self._medicoes.registrar(rotulo, duracao, resposta.status)
+            if resposta.getheader("Connection", "").lower() == "close":
+                self._conexao.close()
+                self._conexao = None
+            if "json" in (resposta.getheader("Content-Type") or ""):
+                return resposta.status, json.loads(conteudo or b"null")
+            return resposta.status, None
+        return None, None
+
+    def login(self, email, senha):
+        status, corpo = self.requisitar("POST", "/api/auth/login", "POST /api/auth/login", {"email": email, "senha": senha})
+        if status != 200:
+            raise RuntimeError(f"Falha no login de {email}: HTTP {status}")
+        self.token = corpo["access_token"]
+        return corpo["user"]
+
+
+class Medicoes:
+    """Latências e status por endpoint, com um lock (as threads gravam em paralelo)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = defaultdict(list)
+        self.status = defaultdict(lambda: defaultdict(int))
+
+    def registrar(self, rotulo, duracao_ms, status):
+        with self._lock:
+            self.latencias[rotulo].append(duracao_ms)
+            self.status[rotulo][str(status)] += 1
+
+    def relatorio(self, duracao_s):
+        endpoints = {}
+        for rotulo, tempos in sorted(self.latencias.items()):
+            tempos = sorted(tempos)
+            erros = sum(n for s, n in self.status[rotulo].items() if not s.startswith(("2", "3")))
+            endpoints[rotulo] = {
+                "requisicoes": len(tempos),
+                "vazao_rps": round(len(tempos) / duracao_s, 2),
+                "p50_ms": round(percentil(tempos, 0.50), 2),
+                "p95_ms": round(percentil(tempos, 0.95), 2),
+                "p99_ms": round(percentil(tempos, 0.99), 2),
+                "max_ms": round(tempos[-1], 2),
+                "erros": erros,
+                "status": dict(self.status[rotulo]),
+            }
+        total = sum(e["requisicoes"] for e in endpoints.values())
+        return {"duracao_s": round(duracao_s, 2), "requisicoes": total,
+                "vazao_rps": round(total / duracao_s, 2), "endpoints": endpoints}
+
+
+def _oid(valor):
+    return valor["$oid"] if isinstance(valor, dict) else valor
+
+
+def _proximas_aulas(turmas, a_partir_de):
+    """Gera (turma, data) em ordem cronológica a partir de `a_partir_de`, pelos horários das turmas."""
+    dia = a_partir_de
+    while True:
+        for turma in turmas:
+            if any(h.get("dia_semana") == DIAS_SEMANA[dia.weekday()] for h in turma.get("horarios", [])):
+                yield turma, dia
+        dia += timedelta(days=1)
+
+
+def _professor(cliente, email, senha, inicio, fim, pdf_a_cada, pausa_s, deslocamento):
+    cliente.login(email, senha)
+    inicio.wait()
+    hoje = date.today().isoformat()
+
+    status, turmas = cliente.requisitar("GET", "/api/turmas/professor/me", "GET /api/turmas/professor/me")
+    turmas = [t for t in (turmas or []) if t.get("horarios") and t.get("alunos")]
+    if not turmas:
+        return
+    # Cada professor começa em um dia diferente no futuro, para não disputar as mesmas aulas
+    proximas = _proximas_aulas(turmas, date.today() + timedelta(days=1 + deslocamento))
+
+    iteracao = 0
+    while time.monotonic() < fim[0]:
+        iteracao += 1
+        cliente.requisitar("GET", "/api/turmas/professor/me", "GET /api/turmas/professor/me")
+        cliente.requisitar("GET", f"/api/aulas/por-data?data={hoje}", "GET /api/aulas/por-data")
+
+        turma, dia = next(proximas)
+        status, aula = cliente.requisitar(
+            "POST", "/api/aulas/get-or-create", "POST /api/aulas/get-or-create",
+            {"turma_id": _oid(turma["_id"]), "data": dia.isoformat()}
+        )
+        if status != 200 or not aula:
+            continue
+        aula_id = _oid(aula["_id"])
+
+        cliente.requisitar("GET", f"/api/presencas/aula/{aula_id}", "GET /api/presencas/aula/<id>")
+        chamada = [
+            {"aluno_id": _oid(aluno["_id"]), "status": "presente" if random.random() < 0.85 else "ausente"}
+            for aluno in turma["alunos"]
+        ]
+        cliente.requisitar("POST", f"/api/aulas/{aula_id}/presencas", "POST /api/aulas/<id>/presencas", chamada)
+
+        if pdf_a_cada and iteracao % pdf_a_cada == 0:
+            cliente.requisitar("GET", f"/api/aulas/{aula_id}/exportar?formato=pdf", "GET /api/aulas/<id>/exportar (pdf)")
+        if pausa_s:
+            time.sleep(random.uniform(0, pausa_s))
+
+
+def _admin(cliente, email, senha, inicio, fim, pausa_s):
+    cliente.login(email, senha)
+    inicio.wait()
+    while time.monotonic() < fim[0]:
+        cliente.requisitar("GET", "/api/dashboard/stats", "GET /api/dashboard/stats")
+        cliente.requisitar("GET", "/api/turmas/", "GET /api/turmas/")
+        cliente.requisitar("GET", "/api/dashboard/alunos-em-risco", "GET /api/dashboard/alunos-em-risco")
+        if pausa_s:
+            time.sleep(random.uniform(0, pausa_s))
+
+
+def semear(professores, alunos_por_turma, anos):
+    """(Re)cria a escola sintética no banco de benchmark com `professores` professores."""
+    os.environ["MONGO_URI"] = uri_de_benchmark()
+    from app import criar_app, mongo
+    from app.services import frequencia_service, indices_service, risco_service
+
+    app = criar_app()
+    turmas = professores * escola_sintetica.PROFESSOR_A_CADA
+    with app.app_context():
+        from app import timezone
+        escola = escola_sintetica.semear(
+            mongo.db, timezone, esportes=4, categorias=3, turmas=turmas,
+            alunos=turmas * alunos_por_turma, anos=anos, modo=app.config["PRESENCA_STORAGE"]
+        )
+        indices_service.garantir_indices()
+        frequencia_service.reconstruir_indice()
+        risco_service.recalcular_todos()
+    return escola["totais"]
+
+
+def executar(url, professores, admins, duracao, pdf_a_cada, pausa_s):
+    medicoes = Medicoes()
+    total_threads = professores + admins
+    fim = [0.0]
+    comeco = [0.0]
+
+    def largar():
+        comeco[0] = time.monotonic()
+        fim[0] = comeco[0] + duracao
+
+    # As threads fazem login e aguardam juntas na barreira: todos começam ao mesmo tempo
+    inicio = threading.Barrier(total_threads, action=largar)
+    erros = []
+
+    def alvo(funcao, *args):
+        try:
+            funcao(*args)
+        except threading.BrokenBarrierError:
+            pass
+        except Exception as e:
+            erros.append(f"{type(e).__name__}: {e}")
+            inicio.abort()
+
+    senha = escola_sintetica.SENHA_PADRAO
+    threads = []
+    for i in range(professores):
+        cliente = Cliente(url, medicoes)
+        threads.append(threading.Thread(target=alvo, args=(
+            lambda c=cliente, i=i: _professor(c, f"professor{i}@bench.local", senha, inicio, fim, pdf_a_cada, pausa_s, i * 7),
+        )))
+    for _ in range(admins):
+        cliente = Cliente(url, medicoes)
+        threads.append(threading.Thread(target=alvo, args=(
+            lambda c=cliente: _admin(c, "admin@bench.local", senha, inicio, fim, pausa_s),
+        )))
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if erros:
+        raise SystemExit(f"Falha nos usuários virtuais: {erros[:3]}")
+    return medicoes.relatorio(time.monotonic() - comeco[0])
+
+
+def _imprimir(relatorio):
+    print(f"Duração: {relatorio['duracao_s']} s  |  Requisições: {relatorio['requisicoes']}"
+          f"  |  Vazão: {relatorio['vazao_rps']} req/s\n")
+    print(f"{'endpoint':<42} {'req':>6} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'erros':>6}")
+    for rotulo, e in relatorio["endpoints"].items():
+        print(f"{rotulo:<42} {e['requisicoes']:>6} {e['vazao_rps']:>8} {e['p50_ms']:>8} "
+              f"{e['p95_ms']:>8} {e['p99_ms']:>8} {e['erros']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--professores", type=int, default=50)
+    parser.add_argument("--admins", type=int, default=2)
+    parser.add_argument("--duracao", type=float, default=60, help="Segundos de carga após os logins.")
+    parser.add_argument("--pdf-a-cada", type=int, default=5, help="Exporta o PDF a cada N iterações (0 desativa).")
+    parser.add_argument("--pausa", type=float, default=0, help="Pausa aleatória máxima entre iterações (s).")
+    parser.add_argument("--semear", action="store_true", help="Recria a escola sintética em BENCH_MONGO_URI e sai.")
+    parser.add_argument("--alunos-por-turma", type=int, default=20)
+    parser.add_argument("--anos", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Imprime o relatório em JSON.")
+    args = parser.parse_args()
+
+    if args.semear:
+        totais = semear(args.professores, args.alunos_por_turma, args.anos)
+        print(json.dumps(totais, ensure_ascii=False))
+        return
+
+    relatorio = executar(args.url, args.professores, args.admins, args.duracao, args.pdf_a_cada, args.pausa)
+    if args.json:
+        print(json.dumps({"execucao": {**identificacao(), "url": args.url, "professores": args.professores,
+                                       "admins": args.admins}, **relatorio}, indent=2, ensure_ascii=False))
+    else:
+        _imprimir(relatorio)
+    if not relatorio["requisicoes"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
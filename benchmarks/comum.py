@@ -0,0 +1,73 @@
+"""
+Utilitários compartilhados pelos benchmarks: cronometragem, resumo estatístico,
+identificação da execução (commit, versões) e proteção do banco de testes.
+"""
+
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+
+from pymongo import uri_parser
+
+URI_PADRAO = "mongodb://localhost:27017/ciaf_benchmark"
+RAIZ_REPOSITORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def cronometrar(funcao, repeticoes):
+    """Executa `funcao` `repeticoes` vezes e devolve as latências em milissegundos."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return tempos
+
+
+def percentil(ordenados, fracao):
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * fracao))]
+
+
+def resumo(tempos):
+    tempos = sorted(tempos)
+    return {
+        "n": len(tempos),
+        "media_ms": round(statistics.fmean(tempos), 3),
+        "p50_ms": round(tempos[len(tempos) // 2], 3),
+        "p95_ms": round(percentil(tempos, 0.95), 3),
+        "p99_ms": round(percentil(tempos, 0.99), 3),
+        "max_ms": round(tempos[-1], 3),
+    }
+
+
+def _git(*args):
+    try:
+        return subprocess.run(
+            ["git", *args], cwd=RAIZ_REPOSITORIO, capture_output=True, text=True, timeout=10, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def identificacao():
+    """Metadados para comparar resultados entre commits e máquinas."""
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "commit_curto": _git("rev-parse", "--short", "HEAD"),
+        "alteracoes_locais": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def uri_de_benchmark():
+    """URI de BENCH_MONGO_URI, exigindo 'bench' no nome do banco (as coleções serão apagadas)."""
+    uri = os.environ.get("BENCH_MONGO_URI", URI_PADRAO)
+    banco = uri_parser.parse_uri(uri)["database"]
+    if not banco or "bench" not in banco:
+        raise SystemExit("O banco de BENCH_MONGO_URI deve conter 'bench' no nome (as coleções serão apagadas).")
+    return uri
@@ -0,0 +1,194 @@
+"""
+Gera uma escola sintética e determinística para os benchmarks.
+
+`semear()` apaga as coleções da aplicação no banco informado e cria:
+- `esportes` esportes, cada um com `categorias` categorias;
+- professores (um para cada PROFESSOR_A_CADA turmas) e um admin;
+- `turmas` turmas com dois horários semanais, distribuídas entre esportes e categorias;
+- `alunos` alunos, repartidos entre as turmas, com status de pagamento variados;
+- `anos` anos de aulas (uma por horário por semana) até `hoje`. As aulas passadas ficam
+  com o status de aula realizada do app e presenças de todos os alunos da turma, gravadas no formato
+  de PRESENCA_STORAGE ('documentos', 'embutido' ou 'duplo').
+
+Todos os usuários têm a senha SENHA_PADRAO (um único hash bcrypt, reaproveitado).
+A mesma `semente` produz sempre a mesma escola (a menos dos ObjectIds).
+"""
+
+import random
+from datetime import date, datetime, time, timedelta
+
+import bcrypt
+from bson import ObjectId
+
+COLECOES = (
+    "usuarios", "turmas", "aulas", "presencas", "esportes", "categorias",
+    "frequencia_alunos", "alunos_risco", "consultas_lentas", "metadados", "exclusoes",
+)
+SENHA_PADRAO = "senha-benchmark"
+PROFESSOR_A_CADA = 4
+TAMANHO_LOTE = 5000
+
+NOMES_ESPORTES = ["Futebol", "Vôlei", "Basquete", "Natação", "Judô", "Handebol", "Atletismo", "Tênis"]
+NOMES_CATEGORIAS = ["Sub-7", "Sub-9", "Sub-11", "Sub-13", "Sub-15", "Sub-17", "Adulto"]
+PRENOMES = ["Ana", "João", "Maria", "José", "Luíza", "Pedro", "Júlia", "Lucas", "Beatriz", "Caio",
+            "Letícia", "Mateus", "Sofia", "Gabriel", "Helena", "Tomás", "Íris", "Otávio", "Cecília", "Ênio"]
+SOBRENOMES = ["Silva", "Souza", "Conceição", "Araújo", "Gonçalves", "Simões", "Magalhães", "Brandão",
+              "Fontes", "Ribeiro", "Estêvão", "Assunção", "Lima", "Antunes", "Peçanha"]
+DIAS_SEMANA = ["segunda", "terca", "quarta", "quinta", "sexta", "sabado", "domingo"]
+
+# Escalas usadas por padrão nos benchmarks
+ESCALAS = {
+    "pequena": {"esportes": 3, "categorias": 2, "turmas": 10, "alunos": 200, "anos": 1},
+    "media": {"esportes": 5, "categorias": 3, "turmas": 40, "alunos": 1000, "anos": 2},
+    "grande": {"esportes": 8, "categorias": 4, "turmas": 120, "alunos": 5000, "anos": 3},
+}
+
+
+def _inserir_em_lotes(colecao, documentos):
+    for inicio in range(0, len(documentos), TAMANHO_LOTE):
+        colecao.insert_many(documentos[inicio:inicio + TAMANHO_LOTE], ordered=False)
+
+
+def _nome(aleatorio):
+    return f"{aleatorio.choice(PRENOMES)} {aleatorio.choice(SOBRENOMES)} {aleatorio.choice(SOBRENOMES)}"
+
+
+def semear(db, fuso, esportes, categorias, turmas, alunos, anos, modo="documentos", semente=42, hoje=None):
+    """
+    Popula `db` com a escola sintética. `fuso` é o timezone pytz da aplicação (as datas
+    das aulas são gravadas como na agenda real). Retorna um dicionário com os ids e
+    datas úteis para escolher os alvos dos benchmarks.
+    """
+    from app.services.busca_service import chaves_turma, chaves_usuario, normalizar
+    from app.services.chamada_service import STATUS_AULA_REALIZADA
+
+    aleatorio = random.Random(semente)
+    hoje = hoje or date.today()
+    senha_hash = bcrypt.hashpw(SENHA_PADRAO.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    agora = datetime.utcnow()
+
+    for colecao in COLECOES:
+        db[colecao].drop()
+
+    # Esportes e categorias
+    docs_esportes = [
+        {"_id": ObjectId(), "nome": NOMES_ESPORTES[i] if i < len(NOMES_ESPORTES) else f"Esporte {i + 1}",
+         "descricao": ""}
+        for i in range(esportes)
+    ]
+    docs_categorias = [
+        {"_id": ObjectId(), "nome": NOMES_CATEGORIAS[j % len(NOMES_CATEGORIAS)], "esporte_id": esporte["_id"]}
+        for esporte in docs_esportes for j in range(categorias)
+    ]
+    db.esportes.insert_many(docs_esportes)
+    db.categorias.insert_many(docs_categorias)
+
+    # Usuários
+    def usuario(nome, email, perfil, **extra):
+        return {"_id": ObjectId(), "nome_completo": nome, "nome_normalizado": normalizar(nome),
+                "busca_chaves": chaves_usuario(nome, email), "email": email, "senha_hash": senha_hash, "perfil": perfil, "ativo": True, "data_criacao": agora, **extra}
+
+    admin = usuario("Administrador Benchmark", "admin@bench.local", "admin")
+    professores = [
+        usuario(_nome(aleatorio), f"professor{i}@bench.local", "professor", turmas_ids=[])
+        for i in range(max(1, -(-turmas // PROFESSOR_A_CADA)))
+    ]
+    docs_alunos = []
+    for i in range(alunos):
+        status = aleatorio.choices(["pago", "pendente", "atrasado"], weights=[75, 15, 10])[0]
+        docs_alunos.append(usuario(
+            _nome(aleatorio), f"aluno{i}@bench.local", "aluno",
+            data_nascimento=datetime(2008 + aleatorio.randrange(12), aleatorio.randrange(1, 13), aleatorio.randrange(1, 29)),
+            status_pagamento={"status": status, "data_vencimento": None, "data_ultimo_pagamento": None},
+            telefone=None, responsavel=None,
+        ))
+
+    # Turmas: dois horários por semana, alunos repartidos em ordem
+    docs_turmas = []
+    for i in range(turmas):
+        categoria = docs_categorias[i % len(docs_categorias)]
+        professor = professores[i // PROFESSOR_A_CADA]
+        dia = i % 5
+        horarios = [
+            {"dia_semana": DIAS_SEMANA[dia], "hora_inicio": f"{8 + i % 10:02d}:00", "hora_fim": f"{9 + i % 10:02d}:00"},
+            {"dia_semana": DIAS_SEMANA[dia + 2], "hora_inicio": f"{8 + i % 10:02d}:00", "hora_fim": f"{9 + i % 10:02d}:00"},
+        ]
+        docs_turmas.append({
+            "_id": ObjectId(), "nome": f"{categoria['nome']} Turma {i + 1:03d}", "categoria": categoria["nome"],
+            "busca_chaves": chaves_turma(f"{categoria['nome']} Turma {i + 1:03d}"),
+            "esporte_id": categoria["esporte_id"], "professor_id": professor["_id"], "horarios": horarios,
+            "alunos_ids": [],
+        })
+        professor["turmas_ids"].append(docs_turmas[-1]["_id"])
+    for i, aluno in enumerate(docs_alunos):
+        turma = docs_turmas[i % turmas]
+        turma["alunos_ids"].append(aluno["_id"])
+        aluno["turma_id"] = [turma["_id"]]
+
+    _inserir_em_lotes(db.usuarios, [admin, *professores, *docs_alunos])
+    db.turmas.insert_many(docs_turmas)
+
+    # Aulas e presenças
+    grava_documentos = modo in ("documentos", "duplo")
+    grava_embutido = modo in ("embutido", "duplo")
+    inicio = hoje - timedelta(days=365 * anos)
+    docs_aulas, docs_presencas, realizadas = [], [], []
+    for turma in docs_turmas:
+        dias = {DIAS_SEMANA.index(h["dia_semana"]): h["hora_inicio"] for h in turma["horarios"]}
+        dia = inicio
+        while dia <= hoje:
+            hora_inicio = dias.get(dia.weekday())
+            if hora_inicio:
+                hora, minuto = map(int, hora_inicio.split(":"))
+                data_aula = fuso.localize(datetime.combine(dia, time(hora, minuto)))
+                aula = {"_id": ObjectId(), "turma_id": turma["_id"], "professor_id": turma["professor_id"],
+                        "data": data_aula, "data_criacao": agora}
+                if dia < hoje:
+                    aula["status"] = STATUS_AULA_REALIZADA
+                    chamada = {}
+                    for aluno_id in turma["alunos_ids"]:
+                        status = "presente" if aleatorio.random() < 0.85 else "ausente"
+                        registro = {"status": status, "data_registro": agora, "data_modificacao": agora}
+                        if grava_embutido:
+                            chamada[str(aluno_id)] = registro
+                        if grava_documentos:
+                            docs_presencas.append({"aula_id": aula["_id"], "aluno_id": aluno_id,
+                                                   "turma_id": turma["_id"], **registro})
+                    if grava_embutido:
+                        aula["chamada"] = chamada
+                        aula["chamada_migrada_em"] = agora
+                    realizadas.append(aula["_id"])
+                else:
+                    aula["status"] = "agendada"
+                docs_aulas.append(aula)
+            dia += timedelta(days=1)
+
+        if len(docs_presencas) >= TAMANHO_LOTE:
+            _inserir_em_lotes(db.presencas, docs_presencas)
+            docs_presencas = []
+    _inserir_em_lotes(db.aulas, docs_aulas)
+    if docs_presencas:
+        _inserir_em_lotes(db.presencas, docs_presencas)
+
+    # Um dia útil recente com aulas de todas as turmas daquele dia da semana
+    dia_recente = hoje - timedelta(days=1)
+    while dia_recente.weekday() > 4:
+        dia_recente -= timedelta(days=1)
+
+    return {
+        "admin_id": admin["_id"],
+        "professores_ids": [p["_id"] for p in professores],
+        "turmas_ids": [t["_id"] for t in docs_turmas],
+        "turmas_nomes": [t["nome"] for t in docs_turmas],
+        "alunos_ids": [a["_id"] for a in docs_alunos],
+        "aulas_realizadas_ids": realizadas,
+        "dia_recente": dia_recente,
+        "emails": {"admin": admin["email"], "professor": professores[0]["email"],
+                   "aluno": docs_alunos[0]["email"] if docs_alunos else None},
+        "senha": SENHA_PADRAO,
+        "totais": {
+            "esportes": len(docs_esportes), "categorias": len(docs_categorias), "turmas": len(docs_turmas),
+            "professores": len(professores), "alunos": len(docs_alunos), "aulas": len(docs_aulas),
+            "aulas_realizadas": len(realizadas),
+        },
+    }
@@ -0,0 +1,178 @@
+"""
+Orçamento de idas ao MongoDB por endpoint (detector de N+1).
+
+Sobe a aplicação com DB_OPS_TRACKING ativo, semeia um banco descartável e chama cada
+cenário de CENARIOS pelo cliente de testes do Flask. Falha (código de saída 1) quando:
+- o cabeçalho X-Db-Ops passa do orçamento declarado para o endpoint; ou
+- o endpoint envia o mesmo comando mais de uma vez na requisição (X-Db-Ops-Repetidas).
+
+Uso (com um MongoDB local):
+    BENCH_MONGO_URI=mongodb://localhost:27017/ciaf_benchmark \
+        python -m benchmarks.orcamento_operacoes --alunos 25
+
+Os orçamentos refletem o número de operações atual de cada caminho; ao otimizar um
+endpoint, reduza o orçamento correspondente para travar o ganho.
+
+ATENÇÃO: as coleções do banco indicado são apagadas. O nome do banco precisa conter 'bench'.
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import namedtuple
+from datetime import datetime
+
+from benchmarks.comum import uri_de_benchmark
+
+COLECOES = (
+    "usuarios", "turmas", "aulas", "presencas", "esportes", "categorias", "frequencia_alunos", "alunos_risco",
+    "metadados", "exclusoes",
+)
+
+# corpo: função (ids semeados) -> JSON enviado; caminho: formatado com os ids semeados
+Cenario = namedtuple("Cenario", "nome metodo caminho perfil orcamento corpo", defaults=(None,))
+
+CENARIOS = [
+    Cenario("listar_turmas", "GET", "/api/turmas/", "admin", 1),
+    Cenario("detalhe_turma", "GET", "/api/turmas/{turma_id}", "admin", 1),
+    Cenario("turmas_do_professor", "GET", "/api/turmas/professor/me", "professor", 1),
+    Cenario("aulas_do_dia", "GET", "/api/aulas/por-data?data={hoje}", "professor", 1),
+    # aula + permissão (turma) + agregação
+    Cenario("detalhes_aula", "GET", "/api/aulas/{aula_id}/detalhes", "professor", 3),
+    Cenario("historico_aulas", "GET", "/api/aulas/historico", "admin", 1),
+    Cenario("get_or_create_aula", "POST", "/api/aulas/get-or-create", "professor", 4, lambda ids: {
+        "turma_id": str(ids["turma_id"]), "data": ids["hoje"],
+    }),
+    # aula + permissão + chamada (aula e presenças) + frequência (leitura e escrita) + risco
+    Cenario("marcar_chamada", "POST", "/api/aulas/{aula_id}/presencas", "professor", 7, lambda ids: [
+        {"aluno_id": str(a), "status": "presente" if i % 3 else "ausente"} for i, a in enumerate(ids["alunos_ids"])
+    ]),
+    Cenario("presencas_da_aula", "GET", "/api/presencas/aula/{aula_id}", "professor", 1),
+    Cenario("listar_usuarios", "GET", "/api/usuarios/", "admin", 1),
+    Cenario("dashboard", "GET", "/api/dashboard/stats", "admin", 3),
+    Cenario("alunos_em_risco", "GET", "/api/dashboard/alunos-em-risco", "admin", 2),
+    # Servido pelo cache de referência
+    Cenario("esportes_com_categorias", "GET", "/api/esportes/com-categorias", "admin", 0),
+    Cenario("frequencia_turma", "GET", "/api/frequencia/turma/{turma_id}", "admin", 3),
+    # turmas, aulas do dia, alunos e presenças (a aula de hoje já existe)
+    Cenario("professor_hoje", "GET", "/api/professor/hoje", "professor", 4),
+    # Por último, pois troca o professor da turma e remove um aluno.
+    # find, update, professor das aulas, vínculos de professor (2) e alunos (2) e as lápides
+    # de quem saiu da turma (aulas da turma e uma inserção para a turma e outra para as
+    # aulas), mais o risco de quem saiu; a categoria vem do cache
+    Cenario("atualizar_turma", "PUT", "/api/turmas/{turma_id}", "admin", 11, lambda ids: {
+        "categoria": str(ids["categoria_id"]),
+        "professor_id": str(ids["professor2_id"]),
+        "alunos_ids": [str(a) for a in ids["alunos_ids"][1:]] + [str(ids["aluno_extra_id"])],
+    }),
+]
+
+
+def _semear(db, total_alunos):
+    """Cria um esporte, uma categoria, dois professores, alunos e uma turma com aula hoje."""
+    for colecao in COLECOES:
+        db[colecao].drop()
+
+    esporte_id = db.esportes.insert_one({"nome": "Futebol", "descricao": ""}).inserted_id
+    categoria_id = db.categorias.insert_one({"nome": "Sub-11", "esporte_id": esporte_id}).inserted_id
+    admin_id, professor_id, professor2_id = db.usuarios.insert_many([
+        {"nome_completo": nome, "email": f"{perfil}{i}@bench.local", "perfil": perfil, "ativo": True, "turmas_ids": []}
+        for i, (nome, perfil) in enumerate([("Admin", "admin"), ("Professor", "professor"), ("Professor 2", "professor")])
+    ]).inserted_ids
+    alunos_ids = db.usuarios.insert_many([
+        {"nome_completo": f"Aluno {i}", "email": f"aluno{i}@bench.local", "perfil": "aluno", "ativo": True,
+         "status_pagamento": {"status": "pago" if i % 4 else "pendente"}}
+        for i in range(total_alunos + 1)
+    ]).inserted_ids
+
+    agora = datetime.now()
+    turma_id = db.turmas.insert_one({
+        "nome": "Turma Orçamento", "categoria": "Sub-11", "esporte_id": esporte_id, "professor_id": professor_id,
+        "alunos_ids": alunos_ids[:-1],
+        "horarios": [{"dia_semana": agora.strftime("%A").lower(), "hora_inicio": "18:00", "hora_fim": "19:00"}],
+    }).inserted_id
+    db.usuarios.update_one({"_id": professor_id}, {"$set": {"turmas_ids": [turma_id]}})
+    db.usuarios.update_many({"_id": {"$in": alunos_ids[:-1]}}, {"$set": {"turma_id": [turma_id]}})
+    aula_id = db.aulas.insert_one({
+        "turma_id": turma_id, "professor_id": professor_id, "data": agora.replace(hour=18, minute=0, second=0, microsecond=0), "status": "agendada"
+    }).inserted_id
+
+    return {
+        "admin": admin_id, "professor": professor_id, "professor2_id": professor2_id,
+        "categoria_id": categoria_id, "turma_id": turma_id, "aula_id": aula_id,
+        "alunos_ids": alunos_ids[:-1], "aluno_extra_id": alunos_ids[-1], "hoje": agora.strftime("%Y-%m-%d"),
+    }
+
+
+def _tokens(ids):
+    from flask_jwt_extended import create_access_token
+    return {
+        perfil: create_access_token(identity=str(ids[perfil]), additional_claims={"perfil": perfil, "nome_completo": perfil})
+        for perfil in ("admin", "professor")
+    }
+
+
+def executar(total_alunos):
+    os.environ["MONGO_URI"] = uri_de_benchmark()
+    os.environ["DB_OPS_TRACKING"] = "true"
+    # Cache de referência carregado antes dos cenários e sem verificações de versão no meio
+    os.environ["REFERENCIA_VERIFICACAO_S"] = "3600"
+
+    from app import criar_app, mongo
+    from app.services import indices_service, referencia_service
+
+    app = criar_app()
+    cliente = app.test_client()
+    with app.app_context():
+        ids = _semear(mongo.db, total_alunos)
+        indices_service.garantir_indices()
+        referencia_service.listar_esportes()
+        tokens = _tokens(ids)
+
+    resultados = []
+    for cenario in CENARIOS:
+        resposta = cliente.open(
+            cenario.caminho.format(**ids),
+            method=cenario.metodo,
+            json=cenario.corpo(ids) if cenario.corpo else None,
+            headers={"Authorization": f"Bearer {tokens[cenario.perfil]}"},
+        )
+        operacoes = int(resposta.headers.get("X-Db-Ops", -1))
+        repetidas = resposta.headers.get("X-Db-Ops-Repetidas")
+        falhas = []
+        if resposta.status_code >= 400:
+            falhas.append(f"status HTTP {resposta.status_code}")
+        if operacoes > cenario.orcamento:
+            falhas.append(f"{operacoes} operações (orçamento: {cenario.orcamento})")
+        if repetidas:
+            falhas.append(f"consultas repetidas: {repetidas}")
+        resultados.append({
+            "cenario": cenario.nome, "status": resposta.status_code, "operacoes": operacoes,
+            "orcamento": cenario.orcamento, "falhas": falhas,
+        })
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alunos", type=int, default=25)
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON.")
+    args = parser.parse_args()
+
+    resultados = executar(args.alunos)
+    if args.json:
+        print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    else:
+        for r in resultados:
+            situacao = "FALHOU: " + "; ".join(r["falhas"]) if r["falhas"] else "ok"
+            print(f"{r['cenario']:<26} {r['operacoes']:>3}/{r['orcamento']:<3} {situacao}")
+
+    reprovados = [r["cenario"] for r in resultados if r["falhas"]]
+    if reprovados:
+        print(f"\n{len(reprovados)} endpoint(s) fora do orçamento: {', '.join(reprovados)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
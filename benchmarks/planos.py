@@ -0,0 +1,307 @@
+"""
+Verificação dos planos de consulta das funções de serviço (regressões de índice).
+
+Semeia a escola sintética, cria os índices de `indices_service.INDICES` e executa cada
+caso de CASOS capturando os comandos de leitura enviados ao MongoDB (find, aggregate,
+count, distinct). Cada comando é reexecutado com `explain("executionStats")` e falha
+(código de saída 1) quando:
+- o plano vencedor não usa o índice declarado para a coleção (ou a coleção não foi declarada);
+- um `$lookup` varre a coleção estrangeira em vez de usar um índice;
+- documentos examinados / documentos retornados passa do limite do caso;
+- chaves examinadas / documentos examinados passa de MAX_CHAVES_POR_DOCUMENTO.
+
+Uso (com um MongoDB local; requer servidor real, o mongomock não tem explain):
+    BENCH_MONGO_URI=mongodb://localhost:27017/ciaf_benchmark python -m benchmarks.planos --escala media
+
+Ao alterar um pipeline ou índice, ajuste o caso correspondente: `None` declara que a
+varredura da coleção é aceita (listagens completas e contagens sem índice).
+
+ATENÇÃO: as coleções do banco indicado são apagadas. O nome do banco precisa conter 'bench'.
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import namedtuple
+from datetime import datetime, timezone as dt_timezone
+
+from pymongo import monitoring
+
+from benchmarks import escola_sintetica
+from benchmarks.comum import uri_de_benchmark
+
+COMANDOS_DE_LEITURA = ("find", "aggregate", "count", "distinct")
+ESTAGIOS_DE_INDICE = ("IXSCAN", "EXPRESS_IXSCAN", "DISTINCT_SCAN", "COUNT_SCAN")
+ESTAGIOS_DE_ID = ("IDHACK", "EXPRESS_IDHACK", "CLUSTERED_IXSCAN")
+ESTRATEGIAS_COM_VARREDURA = ("NestedLoopJoin", "HashJoin")
+VARREDURA = "COLLSCAN"
+MAX_CHAVES_POR_DOCUMENTO = 2.0
+
+# indices: {colecao: nome do índice esperado no plano vencedor (ou tupla de nomes, quando o caso
+#          consulta a coleção por caminhos diferentes), ou None se a varredura é aceita}
+# docs_por_retornado: limite de documentos examinados por documento retornado (None = sem limite)
+Caso = namedtuple("Caso", "nome chamar indices docs_por_retornado", defaults=(1.5,))
+
+
+def _casos():
+    from bson import ObjectId
+    from app.services import (
+        aula_service, busca_service, dashboard_service, frequencia_service, presenca_service, professor_service,
+        risco_service, turma_service, usuario_service,
+    )
+
+    return [
+        # Aulas
+        Caso("listar_aulas_por_turma", lambda e: aula_service.listar_aulas_por_turma(e["turma_id"]),
+             {"aulas": "turma_data"}),
+        Caso("listar_aulas_por_data", lambda e: aula_service.listar_aulas_por_data(e["dia"]),
+             {"aulas": "data"}),
+        Caso("buscar_ou_criar_aula_existente",
+             lambda e: aula_service.buscar_ou_criar_aula_por_data(e["turma_id"], e["data_aula"]),
+             {"aulas": "turma_data"}),
+        Caso("buscar_detalhes_aula", lambda e: aula_service.buscar_detalhes_aula(e["aula_id"]),
+             {"aulas": "_id_"}),
+        Caso("listar_historico_aulas", lambda e: aula_service.listar_historico_aulas(),
+             {"aulas": None}),
+        Caso("listar_historico_aulas_por_data", lambda e: aula_service.listar_historico_aulas(e["dia"]),
+             {"aulas": "data"}),
+        # O nome é resolvido antes em turmas (busca_chaves), depois aulas por turma_id
+        Caso("listar_historico_aulas_por_turma",
+             lambda e: aula_service.listar_historico_aulas(None, e["nome_turma"]),
+             {"turmas": "busca_chaves", "aulas": "turma_data"}),
+        Caso("obter_presencas_por_aula", lambda e: presenca_service.obter_presencas_por_aula(e["aula_id"]),
+             {"aulas": "_id_"}),
+        # Turmas
+        Caso("listar_turmas", lambda e: turma_service.listar_turmas(), {"turmas": None}),
+        Caso("buscar_turma_por_id", lambda e: turma_service.buscar_turma_por_id(e["turma_id"]),
+             {"turmas": "_id_"}),
+        Caso("listar_turmas_por_professor",
+             lambda e: turma_service.listar_turmas_por_professor(e["professor_id"]),
+             {"turmas": "professor"}),
+        # Carga do dia do professor (cria as aulas que faltarem no dia); as turmas sem aula
+        # do professor no dia são conferidas pela turma, antes da criação
+        Caso("resumo_do_dia_do_professor",
+             lambda e: professor_service.resumo_do_dia(ObjectId(e["professor_id"]), e["dia"].date()),
+             {"turmas": "professor", "aulas": ("professor_data", "turma_data"), "usuarios": "_id_",
+              "presencas": "aula_aluno"}),
+        # Usuários
+        Caso("encontrar_usuario_por_email",
+             lambda e: usuario_service.encontrar_usuario_por_email(e["email"]),
+             {"usuarios": "email"}),
+        Caso("listar_alunos", lambda e: usuario_service.listar_usuarios({"perfil": "aluno"}),
+             {"usuarios": None}),
+        Caso("paginar_alunos", lambda e: usuario_service.paginar_usuarios({"perfil": "aluno"}, limite=50),
+             {"usuarios": "ativo_perfil_nome"}),
+        Caso("buscar_usuarios_por_nome", lambda e: usuario_service.paginar_usuarios({"busca": e["prefixo_nome"]}, limite=20),
+             {"usuarios": "ativo_nome"}),
+        Caso("busca_typeahead", lambda e: busca_service.buscar(e["prefixo_nome"]),
+             {"usuarios": "busca_chaves", "turmas": "busca_chaves"}),
+        # Contagens dos filtros: agrupam todos os usuários ativos
+        Caso("contar_usuarios", lambda e: usuario_service.contar_usuarios({"perfil": "aluno"}),
+             {"usuarios": None}, None),
+        # Contagens do dashboard: varrem as coleções pequenas
+        Caso("dashboard", lambda e: dashboard_service.get_summary_data(),
+             {"usuarios": None, "turmas": None}, None),
+        # Risco e frequência
+        Caso("listar_alunos_em_risco", lambda e: risco_service.listar_alunos_em_risco(),
+             {"alunos_risco": "score", "usuarios": "_id_"}, 2.0),
+        Caso("frequencia_resumo_turma", lambda e: frequencia_service.resumo_turma(e["turma_id"]),
+             {"frequencia_alunos": "turma_aluno", "usuarios": "_id_"}),
+        Caso("frequencia_resumo_aluno", lambda e: frequencia_service.resumo_aluno(e["aluno_id"]),
+             {"frequencia_alunos": "aluno"}),
+        Caso("faltas_consecutivas_da_turma",
+             lambda e: frequencia_service.alunos_com_faltas_consecutivas(turma_id=e["turma_id"]),
+             {"frequencia_alunos": "turma_aluno"}),
+    ]
+
+
+class CapturaComandos(monitoring.CommandListener):
+    """Guarda os comandos de leitura enviados enquanto `ativa` estiver ligada."""
+
+    def __init__(self):
+        self.ativa = False
+        self.comandos = []
+
+    def started(self, event):
+        if self.ativa and event.command_name in COMANDOS_DE_LEITURA:
+            self.comandos.append((event.database_name, event.command_name, event.command))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def _percorrer_plano(plano, indices, lookups):
+    """Coleta os índices (ou COLLSCAN) do lado local e a estratégia dos EQ_LOOKUP do plano."""
+    if isinstance(plano, list):
+        for item in plano:
+            _percorrer_plano(item, indices, lookups)
+        return
+    if not isinstance(plano, dict):
+        return
+    estagio = plano.get("stage")
+    if estagio in ESTAGIOS_DE_INDICE:
+        indices.add(plano.get("indexName"))
+    elif estagio in ESTAGIOS_DE_ID:
+        indices.add("_id_")
+    elif estagio == VARREDURA:
+        indices.add(VARREDURA)
+    elif estagio == "EQ_LOOKUP":
+        lookups.append({"colecao": plano.get("foreignCollection"), "estrategia": plano.get("strategy"),
+                        "varredura": plano.get("strategy") in ESTRATEGIAS_COM_VARREDURA})
+        _percorrer_plano(plano.get("inputStage"), indices, lookups)
+        return
+    for chave, valor in plano.items():
+        if chave not in ("rejectedPlans", "slotBasedPlan"):
+            _percorrer_plano(valor, indices, lookups)
+
+
+def analisar_explain(explain):
+    """Resume o explain: índices do plano vencedor, $lookups e contadores de execução."""
+    from app.observabilidade.consultas_lentas import _estatisticas_execucao, _plano_vencedor
+
+    indices, lookups = set(), []
+    _percorrer_plano(_plano_vencedor(explain), indices, lookups)
+
+    # $lookup executado pelo motor clássico: as estatísticas ficam ao lado do estágio
+    for estagio in explain.get("stages", []):
+        if "$lookup" in estagio:
+            lookups.append({"colecao": estagio["$lookup"].get("from"), "indices": estagio.get("indexesUsed"),
+                            "varredura": bool(estagio.get("collectionScans"))})
+
+    estatisticas = _estatisticas_execucao(explain)
+    stats = explain.get("executionStats") or next(
+        (e["$cursor"].get("executionStats") for e in explain.get("stages", []) if "$cursor" in e), {}
+    )
+    estatisticas["retornados"] = stats.get("nReturned")
+    return {"indices": sorted(i for i in indices if i), "lookups": lookups, **estatisticas}
+
+
+def _explicar(db, nome_comando, comando):
+    from app.observabilidade.consultas_lentas import CAMPOS_DE_SESSAO
+
+    comando_limpo = {chave: valor for chave, valor in comando.items() if chave not in CAMPOS_DE_SESSAO}
+    return db.command({"explain": comando_limpo, "verbosity": "executionStats"})
+
+
+def avaliar(caso, analise, colecao):
+    """Lista as falhas de um comando em relação ao caso."""
+    falhas = []
+    if colecao not in caso.indices:
+        return [f"consulta em '{colecao}' não declarada no caso"]
+
+    esperado = caso.indices[colecao]
+    aceitos = (esperado,) if isinstance(esperado, str) else esperado
+    if esperado is not None and not set(aceitos) & set(analise["indices"]):
+        falhas.append(f"{colecao}: esperado o índice '{' ou '.join(aceitos)}', plano usou {analise['indices'] or '?'}")
+    for lookup in analise["lookups"]:
+        if lookup["varredura"]:
+            falhas.append(f"{colecao}: $lookup em '{lookup['colecao']}' varre a coleção")
+
+    chaves = analise["chaves_examinadas"] or 0
+    documentos = analise["documentos_examinados"] or 0
+    retornados = analise["retornados"] or 0
+    if caso.docs_por_retornado is not None and documentos > caso.docs_por_retornado * max(retornados, 1):
+        falhas.append(f"{colecao}: {documentos} documentos examinados para {retornados} retornados "
+                      f"(limite: {caso.docs_por_retornado}x)")
+    if esperado is not None and documentos and chaves > MAX_CHAVES_POR_DOCUMENTO * documentos:
+        falhas.append(f"{colecao}: {chaves} chaves examinadas para {documentos} documentos")
+    return falhas
+
+
+def _hora_local(data, fuso):
+    # O driver devolve datas ingênuas em UTC (tz_aware=False)
+    if data.tzinfo is None:
+        data = data.replace(tzinfo=dt_timezone.utc)
+    return data.astimezone(fuso)
+
+
+def executar(parametros):
+    os.environ["MONGO_URI"] = uri_de_benchmark()
+    os.environ.setdefault("SLOW_QUERY_MS", "0")
+    # Cache de referência carregado antes dos casos: só as consultas dos serviços são capturadas
+    os.environ["REFERENCIA_VERIFICACAO_S"] = "3600"
+    # Sem cache de resultados: cada caso precisa enviar as suas consultas
+    os.environ["CACHE_RESULTADOS"] = "false"
+
+    captura = CapturaComandos()
+    # Registro global: vale para o MongoClient criado em criar_app()
+    monitoring.register(captura)
+
+    from app import criar_app, mongo, timezone
+    from app.services import frequencia_service, indices_service, referencia_service, risco_service
+
+    app = criar_app()
+    resultados = []
+    with app.test_request_context():
+        escola = escola_sintetica.semear(mongo.db, timezone, modo=app.config["PRESENCA_STORAGE"], **parametros)
+        indices_service.garantir_indices()
+        frequencia_service.reconstruir_indice()
+        risco_service.recalcular_todos()
+        referencia_service.listar_esportes()
+
+        turma_id = escola["turmas_ids"][0]
+        realizadas = escola["aulas_realizadas_ids"]
+        alvos = {
+            "turma_id": str(turma_id),
+            "professor_id": str(escola["professores_ids"][0]),
+            "aluno_id": str(escola["alunos_ids"][0]),
+            "aula_id": str(realizadas[len(realizadas) // 2]),
+            "data_aula": _hora_local(mongo.db.aulas.find_one({"turma_id": turma_id})["data"], timezone),
+            "dia": datetime.combine(escola["dia_recente"], datetime.min.time()),
+            "nome_turma": escola["turmas_nomes"][-1].split()[-1],
+            "email": escola["emails"]["aluno"],
+            "prefixo_nome": mongo.db.usuarios.find_one({"_id": escola["alunos_ids"][0]})["nome_completo"][:3],
+        }
+
+        for caso in _casos():
+            captura.comandos = []
+            captura.ativa = True
+            try:
+                caso.chamar(alvos)
+            finally:
+                captura.ativa = False
+
+            comandos, falhas = [], []
+            for banco, nome_comando, comando in captura.comandos:
+                colecao = comando.get(nome_comando)
+                analise = analisar_explain(_explicar(mongo.cx[banco], nome_comando, comando))
+                falhas_comando = avaliar(caso, analise, colecao)
+                comandos.append({"colecao": colecao, "comando": nome_comando, **analise, "falhas": falhas_comando})
+                falhas.extend(falhas_comando)
+            if not comandos:
+                falhas.append("nenhuma consulta capturada")
+            resultados.append({"caso": caso.nome, "comandos": comandos, "falhas": falhas})
+    return escola["totais"], resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escala", default="media", choices=list(escola_sintetica.ESCALAS))
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON.")
+    args = parser.parse_args()
+
+    parametros = {**escola_sintetica.ESCALAS[args.escala], "semente": args.semente}
+    totais, resultados = executar(parametros)
+    if args.json:
+        print(json.dumps({"totais": totais, "casos": resultados}, indent=2, ensure_ascii=False, default=str))
+    else:
+        for r in resultados:
+            for c in r["comandos"]:
+                print(f"{r['caso']:<34} {c['colecao']:<18} {','.join(c['indices']) or '-':<14} "
+                      f"chaves={c['chaves_examinadas']} docs={c['documentos_examinados']} ret={c['retornados']}")
+            for falha in r["falhas"]:
+                print(f"{'':<34} FALHOU: {falha}")
+
+    reprovados = [r["caso"] for r in resultados if r["falhas"]]
+    if reprovados:
+        print(f"\n{len(reprovados)} caso(s) com regressão de plano: {', '.join(reprovados)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Benchmark das funções de serviço sobre a escola sintética, em várias escalas.
+
+Para cada escala, o banco é semeado (benchmarks.escola_sintetica), os índices são
+criados e cada função é executada `--repeticoes` vezes. O resultado é um JSON com o
+commit, a versão do servidor e o resumo das latências, pensado para ser guardado e
+comparado entre commits (`--comparar resultado_anterior.json`).
+
+Uso (com um MongoDB local):
+    BENCH_MONGO_URI=mongodb://localhost:27017/ciaf_benchmark \
+        python -m benchmarks.servicos --escalas pequena,media --saida resultado.json
+
+Sem MongoDB, `--mongomock` usa o mongomock (se instalado) como substituto em processo.
+Os números servem apenas para comparação relativa: operadores não suportados pelo
+mongomock aparecem como erro na função correspondente.
+
+ATENÇÃO: as coleções do banco indicado são apagadas. O nome do banco precisa conter 'bench'.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from benchmarks import escola_sintetica
+from benchmarks.comum import cronometrar, identificacao, resumo, uri_de_benchmark
+
+
+def _preparar_app(usar_mongomock):
+    os.environ["MONGO_URI"] = uri_de_benchmark()
+    os.environ.setdefault("SLOW_QUERY_MS", "0")
+    # Mede o caminho até o banco, não o cache de resultados
+    os.environ["CACHE_RESULTADOS"] = "false"
+
+    from app import criar_app, mongo
+    app = criar_app()
+    if usar_mongomock:
+        try:
+            import mongomock
+        except ImportError:
+            raise SystemExit("--mongomock requer o pacote 'mongomock' (pip install mongomock).")
+        cliente = mongomock.MongoClient()
+        mongo.cx = cliente
+        mongo.db = cliente[mongo.db.name]
+    return app, mongo
+
+
+def _versao_servidor(mongo, usar_mongomock):
+    if usar_mongomock:
+        return "mongomock"
+    try:
+        return mongo.cx.server_info().get("version")
+    except Exception:
+        return None
+
+
+def _funcoes(escola, cliente_http):
+    """Pares (nome, função sem argumentos, fator de repetições) a cronometrar."""
+    from datetime import datetime
+    from app.services import aula_service, export_service, turma_service
+
+    turma_id = str(escola["turmas_ids"][0])
+    professor_id = str(escola["professores_ids"][0])
+    realizadas = escola["aulas_realizadas_ids"]
+    aula_id = str(realizadas[len(realizadas) // 2]) if realizadas else None
+    dia = datetime.combine(escola["dia_recente"], datetime.min.time())
+    nome_turma = escola["turmas_nomes"][-1].split()[-1]
+
+    def login():
+        resposta = cliente_http.post("/api/auth/login", json={"email": escola["emails"]["professor"], "senha": escola["senha"]})
+        if resposta.status_code != 200:
+            raise RuntimeError(f"login retornou HTTP {resposta.status_code}")
+
+    funcoes = [
+        ("listar_turmas", turma_service.listar_turmas, 1),
+        ("listar_turmas_por_professor", lambda: turma_service.listar_turmas_por_professor(professor_id), 1),
+        ("buscar_turma_por_id", lambda: turma_service.buscar_turma_por_id(turma_id), 1),
+        ("listar_aulas_por_data", lambda: aula_service.listar_aulas_por_data(dia), 1),
+        ("listar_historico_aulas", aula_service.listar_historico_aulas, 0.1),
+        ("listar_historico_aulas_por_data", lambda: aula_service.listar_historico_aulas(dia), 1),
+        ("listar_historico_aulas_por_turma", lambda: aula_service.listar_historico_aulas(None, nome_turma), 1),
+        ("login", login, 0.5),
+    ]
+    if aula_id:
+        funcoes += [
+            ("buscar_detalhes_aula", lambda: aula_service.buscar_detalhes_aula(aula_id), 1),
+            ("exportar_xlsx", lambda: export_service.gerar_planilha_presenca_aula(aula_id), 0.5),
+            ("exportar_pdf", lambda: export_service.gerar_pdf_presenca_aula(aula_id), 0.2),
+        ]
+    return funcoes
+
+
+def executar_escala(app, mongo, parametros, repeticoes, usar_mongomock):
+    from app import timezone
+    from app.services import frequencia_service, indices_service
+
+    with app.test_request_context():
+        inicio = time.perf_counter()
+        escola = escola_sintetica.semear(
+            mongo.db, timezone, modo=app.config["PRESENCA_STORAGE"], **parametros
+        )
+        indices_service.garantir_indices()
+        if not usar_mongomock:
+            frequencia_service.reconstruir_indice()
+        semeadura = time.perf_counter() - inicio
+
+        resultados = {}
+        cliente_http = app.test_client()
+        for funcao_nome, funcao, fator in _funcoes(escola, cliente_http):
+            try:
+                funcao()  # aquecimento (cache do servidor, imports tardios)
+                resultados[funcao_nome] = resumo(cronometrar(funcao, max(1, int(repeticoes * fator))))
+            except Exception as e:
+                resultados[funcao_nome] = {"erro": f"{type(e).__name__}: {e}"}
+
+    return {
+        "parametros": parametros,
+        "totais": escola["totais"],
+        "semeadura_s": round(semeadura, 2),
+        "funcoes": resultados,
+    }
+
+
+def comparar(atual, anterior):
+    """Variação do p50 de cada função em relação a um resultado anterior (positivo = mais lento)."""
+    variacoes = {}
+    for escala, dados in atual["escalas"].items():
+        base = anterior.get("escalas", {}).get(escala, {}).get("funcoes", {})
+        for funcao, resumo_atual in dados["funcoes"].items():
+            p50_base = base.get(funcao, {}).get("p50_ms")
+            if p50_base and "p50_ms" in resumo_atual:
+                variacoes.setdefault(escala, {})[funcao] = round((resumo_atual["p50_ms"] / p50_base - 1) * 100, 1)
+    return {"commit_base": anterior.get("execucao", {}).get("commit_curto"), "variacao_p50_pct": variacoes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escalas", default="pequena,media",
+                        help=f"Escalas separadas por vírgula ({', '.join(escola_sintetica.ESCALAS)}).")
+    parser.add_argument("--repeticoes", type=int, default=20, help="Repetições de cada função.")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--mongomock", action="store_true", help="Usa o mongomock em vez de um MongoDB real.")
+    parser.add_argument("--saida", help="Grava o JSON neste arquivo (padrão: saída padrão).")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para calcular a variação.")
+    args = parser.parse_args()
+
+    escalas = [e.strip() for e in args.escalas.split(",") if e.strip()]
+    desconhecidas = [e for e in escalas if e not in escola_sintetica.ESCALAS]
+    if desconhecidas:
+        parser.error(f"Escala(s) desconhecida(s): {', '.join(desconhecidas)}")
+
+    app, mongo = _preparar_app(args.mongomock)
+    resultado = {
+        "execucao": {
+            **identificacao(),
+            "servidor_mongo": _versao_servidor(mongo, args.mongomock),
+            "presenca_storage": app.config["PRESENCA_STORAGE"],
+            "repeticoes": args.repeticoes,
+            "semente": args.semente,
+        },
+        "escalas": {},
+    }
+    for escala in escalas:
+        print(f"Executando escala '{escala}'...", file=sys.stderr)
+        parametros = {**escola_sintetica.ESCALAS[escala], "semente": args.semente}
+        resultado["escalas"][escala] = executar_escala(app, mongo, parametros, args.repeticoes, args.mongomock)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            resultado["comparacao"] = comparar(resultado, json.load(arquivo))
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False, default=str)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto + "\n")
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
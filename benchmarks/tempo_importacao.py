@@ -0,0 +1,106 @@
+"""
+Orçamento de tempo de importação do `criar_app()` (partida a frio dos workers).
+
+Executa `python -X importtime -c "from app import criar_app; criar_app()"` em um processo
+novo e falha (código de saída 1) quando:
+- algum módulo de MODULOS_PROIBIDOS é importado na partida (bibliotecas de relatório e
+  as suas dependências devem ser importadas dentro das funções que as usam); ou
+- o tempo cumulativo de importação passa de `--orcamento-ms`.
+
+A checagem de módulos é determinística; o tempo varia com a máquina e o cache de disco,
+por isso o orçamento padrão é folgado e cada execução é repetida `--repeticoes` vezes
+(vale a menor medida).
+
+Uso (não precisa de MongoDB: o cliente só conecta no primeiro comando):
+    python -m benchmarks.tempo_importacao --orcamento-ms 1000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.comum import RAIZ_REPOSITORIO
+
+CODIGO = "from app import criar_app; criar_app()"
+MODULOS_PROIBIDOS = (
+    "weasyprint", "openpyxl", "PIL", "fontTools", "pyphen", "pydyf", "cssselect2", "tinycss2",
+    "tinyhtml5", "brotli", "zopfli",
+)
+
+
+def medir():
+    """Roda o import em um processo novo e devolve {modulo: (proprio_us, cumulativo_us)}."""
+    ambiente = {
+        **os.environ,
+        "MONGO_URI": os.environ.get("MONGO_URI", "mongodb://localhost:27017/ciaf_importacao"),
+        "JWT_SECRET_KEY": os.environ.get("JWT_SECRET_KEY", "tempo-importacao"),
+        "LOG_LEVEL": "WARNING",
+    }
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CODIGO],
+        cwd=RAIZ_REPOSITORIO, env=ambiente, capture_output=True, text=True, timeout=120,
+    )
+    if processo.returncode != 0:
+        raise SystemExit(f"Falha ao criar o app:\n{processo.stderr[-2000:]}")
+
+    modulos = {}
+    for linha in processo.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not linha.startswith("import time:") or "imported package" in linha:
+            continue
+        proprio, cumulativo, nome = linha[len("import time:"):].split("|", 2)
+        modulos[nome.strip()] = (int(proprio), int(cumulativo))
+    return modulos
+
+
+def _raiz(nome):
+    return nome.split(".", 1)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orcamento-ms", type=float, default=1500, help="Tempo total de importação permitido.")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15, help="Quantos pacotes mais lentos listar.")
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON.")
+    args = parser.parse_args()
+
+    medicoes = [medir() for _ in range(max(1, args.repeticoes))]
+    totais = [sum(proprio for proprio, _ in m.values()) / 1000 for m in medicoes]
+    total_ms = min(totais)
+    modulos = medicoes[totais.index(total_ms)]
+
+    proibidos = sorted({_raiz(nome) for nome in modulos if _raiz(nome) in MODULOS_PROIBIDOS})
+    por_pacote = {}
+    for nome, (proprio, _) in modulos.items():
+        por_pacote[_raiz(nome)] = por_pacote.get(_raiz(nome), 0) + proprio
+    mais_lentos = sorted(por_pacote.items(), key=lambda item: item[1], reverse=True)[:args.top]
+
+    falhas = []
+    if proibidos:
+        falhas.append(f"módulos pesados importados na partida: {', '.join(proibidos)}")
+    if total_ms > args.orcamento_ms:
+        falhas.append(f"importação levou {total_ms:.0f} ms (orçamento: {args.orcamento_ms:.0f} ms)")
+
+    if args.json:
+        print(json.dumps({
+            "total_ms": round(total_ms, 1), "orcamento_ms": args.orcamento_ms, "modulos": len(modulos),
+            "proibidos": proibidos, "mais_lentos_ms": {nome: round(us / 1000, 1) for nome, us in mais_lentos},
+            "falhas": falhas,
+        }, indent=2, ensure_ascii=False))
+    else:
+        print(f"Importação de criar_app(): {total_ms:.0f} ms em {len(modulos)} módulos "
+              f"(orçamento: {args.orcamento_ms:.0f} ms)\n")
+        for nome, us in mais_lentos:
+            print(f"{nome:<30} {us / 1000:>8.1f} ms")
+        for falha in falhas:
+            print(f"\nFALHOU: {falha}")
+
+    if falhas:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
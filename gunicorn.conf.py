@@ -0,0 +1,69 @@
+"""
+Configuração do gunicorn para produção: `gunicorn -c gunicorn.conf.py wsgi:app`.
+
+Modelo de workers:
+- processos (`workers`) para o trabalho de CPU — a geração de PDF segura o GIL;
+- threads por processo (`threads`, worker gthread) para as esperas de E/S no MongoDB.
+Padrão: 2 × CPUs + 1 processos com 4 threads cada, ajustáveis por GUNICORN_WORKERS e
+GUNICORN_THREADS.
+
+O app é carregado uma vez no processo mestre (`preload_app`) e compartilhado pelos
+workers; como o MongoClient não é seguro entre forks, cada worker cria o seu em
+`post_fork`. Cada worker tem um pool próprio: o padrão é uma conexão por thread mais
+folga para o explain das consultas lentas, e o total de conexões no servidor é
+workers × MONGO_MAX_POOL_SIZE.
+
+No SIGTERM (deploy, escala), o worker deixa de aceitar conexões e termina as requisições
+em andamento — inclusive exportações de PDF/XLSX — por até GUNICORN_GRACEFUL_TIMEOUT segundos.
+"""
+
+import logging
+import multiprocessing
+import os
+
+CPUS = multiprocessing.cpu_count()
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+workers = int(os.getenv("GUNICORN_WORKERS", 2 * CPUS + 1))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_class = "gthread"
+preload_app = True
+
+# Uma exportação de PDF grande leva alguns segundos; o timeout cobre com folga
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "90"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+# Recicla os workers periodicamente (com jitter, para não reiniciarem juntos)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+# Pool do MongoDB por worker, lido por criar_app() durante o preload
+os.environ.setdefault("MONGO_MAX_POOL_SIZE", str(threads + 2))
+os.environ.setdefault("MONGO_MIN_POOL_SIZE", "1")
+# Falha rápido (erro 500) em vez de segurar a thread até o timeout do worker
+os.environ.setdefault("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000")
+os.environ.setdefault("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")
+
+logger = logging.getLogger("gunicorn.error")
+
+
+def post_fork(server, worker):
+    """
+    Recria o MongoClient no worker (o herdado do mestre não pode ser usado após o fork)
+    e inicia o aquecimento e o ping de fundo lidos por /api/health/ready.
+    """
+    from app import conectar_mongo
+    from app.observabilidade import saude
+    from wsgi import app
+
+    conectar_mongo(app)
+    saude.iniciar(app)
+
+
+def worker_exit(server, worker):
+    """Última chance para exportações que ainda estejam gerando o arquivo."""
+    from app.services import export_service
+
+    restantes = export_service.aguardar_exportacoes(timeout=5)
+    if restantes:
+        logger.warning("Worker %s encerrado com %s exportação(ões) em andamento.", worker.pid, restantes)
@@ -7,6 +7,8 @@ if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
 
 
+# Servidor de desenvolvimento. Em produção: gunicorn -c gunicorn.conf.py wsgi:app (ver gunicorn.conf.py)
+
 #.\venv\Scripts\Activate.ps1
 #pip install -r requirements.txt
 #python run.py
@@ -0,0 +1,3 @@
+"""
+Testes de regressão (pytest), executados sobre o mongomock: `python -m pytest -q`.
+"""
@@ -0,0 +1,106 @@
+"""
+App de testes sobre o mongomock, como em `python -m benchmarks.servicos --mongomock`.
+
+Cada teste recebe um app novo com um banco vazio, dentro de um app_context.
+"""
+
+import os
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017/ciaf_testes")
+os.environ.setdefault("JWT_SECRET_KEY", "chave-de-testes-com-pelo-menos-32-bytes")
+os.environ["SLOW_QUERY_MS"] = "0"
+os.environ["HEALTH_PING_INTERVALO_S"] = "3600"
+os.environ["REFERENCIA_CHANGE_STREAM"] = "false"
+
+
+def _compatibilizar_bulk_write():
+    """
+    O PyMongo 4.9+ passa `sort` às operações de bulk_write, que o BulkOperationBuilder do
+    mongomock 4.x não aceita. O argumento é descartado (nenhuma operação do app o usa).
+    """
+    import mongomock.collection as colecao
+    construtor = colecao.BulkOperationBuilder
+    if getattr(construtor, '_aceita_sort', False):
+        return
+    for nome in ('add_update', 'add_replace', 'add_delete'):
+        original = getattr(construtor, nome)
+
+        def sem_sort(self, *args, _original=original, sort=None, **kwargs):
+            return _original(self, *args, **kwargs)
+        setattr(construtor, nome, sem_sort)
+    construtor._aceita_sort = True
+
+
+_compatibilizar_bulk_write()
+
+
+def pytest_configure(config):
+    # Os serviços importam `timezone` do pacote app ao serem carregados (no servidor, isso
+    # acontece dentro de criar_app): cria um app antes de coletar os módulos de teste
+    from app import criar_app
+    criar_app()
+
+
+@pytest.fixture
+def app():
+    from app import criar_app, mongo
+    aplicacao = criar_app()
+    aplicacao.config["TESTING"] = True
+    cliente = mongomock.MongoClient()
+    mongo.cx = cliente
+    mongo.db = cliente[mongo.db.name]
+    with aplicacao.app_context():
+        # Os caches do processo não passam de um teste para outro: cada banco novo recomeça
+        # as versões, e um dado antigo com a mesma versão seria servido como atual
+        from app import cache
+        from app.services import referencia_service
+        cache.backend().limpar()
+        referencia_service._dados = None
+        yield aplicacao
+
+
+@pytest.fixture
+def db(app):
+    from app import mongo
+    return mongo.db
+
+
+
+@pytest.fixture
+def cliente(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def token(app):
+    """Cabeçalhos com um access token do perfil informado: client.get(url, headers=token('admin'))."""
+    from flask_jwt_extended import create_access_token
+
+    def gerar(perfil, identidade="000000000000000000000001"):
+        acesso = create_access_token(identity=identidade, additional_claims={"perfil": perfil})
+        return {"Authorization": f"Bearer {acesso}"}
+    return gerar
+
+
+def _sem_round(expressao):
+    # O mongomock não implementa $round (nem $max sobre arrays: o score não é conferido nos
+    # testes, só os componentes de que ele é calculado)
+    if isinstance(expressao, dict):
+        if '$round' in expressao:
+            return _sem_round(expressao['$round'][0])
+        return {chave: _sem_round(valor) for chave, valor in expressao.items()}
+    if isinstance(expressao, list):
+        return [_sem_round(item) for item in expressao]
+    return expressao
+
+
+@pytest.fixture
+def score_sem_round(monkeypatch):
+    """Escritas em alunos_risco que rodam no mongomock."""
+    from app.services import risco_service
+    original = risco_service._estagio_score
+    monkeypatch.setattr(risco_service, '_estagio_score', lambda: _sem_round(original()))
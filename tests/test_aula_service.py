@@ -0,0 +1,54 @@
+from datetime import date, datetime
+
+from bson import ObjectId
+from bson.timestamp import Timestamp
+
+from app.services import aula_service, chamada_service
+
+SEGUNDA = date(2025, 3, 3)
+
+
+def _turma(db):
+    turma = {"_id": ObjectId(), "professor_id": ObjectId(),
+             "horarios": [{"dia_semana": "segunda", "hora_inicio": "08:00", "hora_fim": "09:00"}]}
+    db.turmas.insert_one(turma)
+    return turma
+
+
+def test_criar_aulas_do_dia_carimba_so_as_aulas_criadas(db):
+    turma = _turma(db)
+
+    aula_id = aula_service.criar_aulas_do_dia([turma], SEGUNDA)[turma["_id"]]["_id"]
+    assert isinstance(db.aulas.find_one({"_id": aula_id}).get("updated_at"), Timestamp)
+
+    # Uma nova execução encontra a aula: o carimbo não pode mudar (não há o que sincronizar)
+    antigo = Timestamp(1, 1)
+    db.aulas.update_one({"_id": aula_id}, {"$set": {"updated_at": antigo}})
+    aula_service.criar_aulas_do_dia([turma], SEGUNDA)
+
+    assert db.aulas.count_documents({}) == 1
+    assert db.aulas.find_one({"_id": aula_id})["updated_at"] == antigo
+
+
+def test_reagendar_nao_recarimba_aulas_existentes(db):
+    turma = _turma(db)
+    assert aula_service.agendar_aulas_para_turma(str(turma["_id"])) > 0
+
+    antigo = Timestamp(1, 1)
+    db.aulas.update_many({}, {"$set": {"updated_at": antigo}})
+    assert aula_service.agendar_aulas_para_turma(str(turma["_id"])) == 0
+
+    assert db.aulas.count_documents({"updated_at": {"$ne": antigo}}) == 0
+
+
+def test_chamada_em_lote_entra_no_historico(db, score_sem_round):
+    aluno_id = ObjectId()
+    turma_id = db.turmas.insert_one({"nome": "Sub-11", "alunos_ids": [aluno_id]}).inserted_id
+    aula_id = db.aulas.insert_one({"turma_id": turma_id, "data": datetime(2025, 3, 3, 11), "status": "agendada"}).inserted_id
+
+    aula_service.marcar_presenca_lote(str(aula_id), [{"aluno_id": str(aluno_id), "status": "presente"}])
+
+    [aula] = aula_service.listar_historico_aulas()
+    assert aula["_id"] == aula_id
+    assert aula["status"] == chamada_service.STATUS_AULA_REALIZADA
+    assert aula["totalPresentes"] == 1
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app import cache
+from app.cache import resultados
+
+
+@pytest.fixture(params=['memoria', 'sqlite'])
+def cache_resultados(request, app, tmp_path):
+    app.config["CACHE_BACKEND"] = request.param
+    app.config["CACHE_SQLITE_PATH"] = str(tmp_path / "cache.sqlite3")
+    app.config["CACHE_RESULTADOS"] = True
+    cache.configurar(app)
+    yield
+    cache.backend().limpar()
+
+
+def test_escrita_durante_a_leitura_nao_deixa_resultado_antigo(cache_resultados, db):
+    """
+    A leitura consulta o banco, uma escrita acontece (o ouvinte invalida ao fim do comando)
+    e só então a leitura termina: o resultado antigo não pode ficar no cache.
+    """
+    db.testes_cache.insert_one({"_id": 1, "valor": "antigo"})
+    escrever_no_meio = []
+
+    @resultados.em_cache('testes_cache')
+    def ler():
+        valor = db.testes_cache.find_one({"_id": 1})["valor"]
+        if escrever_no_meio:
+            escrever_no_meio.clear()
+            db.testes_cache.update_one({"_id": 1}, {"$set": {"valor": "novo"}})
+            resultados.invalidar_colecao('testes_cache')
+        return valor
+
+    escrever_no_meio.append(True)
+    assert ler() == "antigo"
+    assert ler() == "novo"
+
+
+def test_resultado_fica_em_cache_sem_escritas(cache_resultados, db):
+    db.testes_cache.insert_one({"_id": 1, "valor": "a"})
+    chamadas = []
+
+    @resultados.em_cache('testes_cache')
+    def ler():
+        chamadas.append(True)
+        return db.testes_cache.find_one({"_id": 1})["valor"]
+
+    assert ler() == ler() == "a"
+    assert len(chamadas) == 1
+
+    resultados.invalidar_colecao('testes_cache')
+    assert ler() == "a"
+    assert len(chamadas) == 2
+
+
+@pytest.mark.parametrize("backend, ligado", [("memoria", False), ("sqlite", True)])
+def test_resultados_ligados_por_padrao_so_com_backend_compartilhado(monkeypatch, tmp_path, backend, ligado):
+    from app import criar_app
+    monkeypatch.delenv("CACHE_RESULTADOS", raising=False)
+    monkeypatch.setenv("CACHE_BACKEND", backend)
+    monkeypatch.setenv("CACHE_SQLITE_PATH", str(tmp_path / "cache.sqlite3"))
+    assert criar_app().config["CACHE_RESULTADOS"] is ligado
+
+
+def test_ouvinte_invalida_uma_vez_ao_fim_da_escrita(monkeypatch):
+    invalidadas = []
+    monkeypatch.setattr(resultados, 'invalidar_colecao', invalidadas.append)
+    monkeypatch.setitem(resultados._dependentes, 'testes_cache', {'resultado:teste'})
+    ouvinte = resultados.OuvinteEscritas()
+
+    for fim in ('succeeded', 'failed'):
+        evento = SimpleNamespace(command_name='update', command={'update': 'testes_cache'}, request_id=1, connection_id=('h', 1))
+        ouvinte.started(evento)
+        assert invalidadas == []
+        getattr(ouvinte, fim)(evento)
+        assert invalidadas == ['testes_cache']
+        invalidadas.clear()
@@ -0,0 +1,16 @@
+from app.services import categoria_service, referencia_service
+
+
+def test_categorias_sem_nome_vem_primeiro_como_no_sort_do_banco(db):
+    esporte_id = db.esportes.insert_one({"nome": "Futebol"}).inserted_id
+    db.categorias.insert_many([
+        {"nome": "Sub-13", "esporte_id": esporte_id},
+        {"nome": None, "esporte_id": esporte_id},
+        {"esporte_id": esporte_id},
+        {"nome": "Sub-11", "esporte_id": esporte_id},
+    ])
+    referencia_service.invalidar()
+
+    nomes = [c.get('nome') for c in categoria_service.listar_categorias_por_esporte(str(esporte_id))]
+    assert nomes[2:] == ["Sub-11", "Sub-13"]
+    assert set(nomes[:2]) == {None}
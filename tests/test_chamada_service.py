@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from bson import ObjectId
+
+from app.services import chamada_service
+
+
+def test_migracao_nao_sobrescreve_chamada_mais_nova(app, db):
+    """
+    No modo 'duplo', uma chamada gravada entre a leitura de `presencas` e a escrita da
+    migração já está no mapa com data_modificacao mais nova: o status antigo não volta.
+    """
+    app.config["PRESENCA_STORAGE"] = chamada_service.MODO_DUPLO
+    antes, depois = datetime(2024, 3, 4, 12), datetime(2024, 3, 4, 13)
+    corrigido, pendente = ObjectId(), ObjectId()
+    aula_id = db.aulas.insert_one({
+        "chamada": {str(corrigido): {"status": "presente", "data_modificacao": depois, "data_registro": depois}},
+    }).inserted_id
+    db.presencas.insert_many([
+        {"aula_id": aula_id, "aluno_id": corrigido, "status": "ausente", "data_modificacao": antes, "data_registro": antes},
+        {"aula_id": aula_id, "aluno_id": pendente, "status": "ausente", "data_modificacao": antes, "data_registro": antes},
+    ])
+
+    assert chamada_service.migrar_presencas_para_chamada() == 1
+
+    aula = db.aulas.find_one(aula_id)
+    assert "updated_at" in aula
+    chamada = aula["chamada"]
+    assert chamada[str(corrigido)] == {"status": "presente", "data_modificacao": depois, "data_registro": antes}
+    assert chamada[str(pendente)] == {"status": "ausente", "data_modificacao": antes, "data_registro": antes}
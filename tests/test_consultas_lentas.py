@@ -0,0 +1,39 @@
+from app.observabilidade.consultas_lentas import formato_comando
+
+
+def test_formato_mantem_colecoes_e_campos_e_redige_os_valores():
+    comando = {
+        "aggregate": "usuarios",
+        "pipeline": [
+            {"$match": {"email": "ana@exemplo.com", "perfil": {"$in": ["aluno", "professor"]}, "path": "/segredo"}},
+            {"$lookup": {"from": "turmas", "localField": "turma_id", "foreignField": "_id", "as": "turmas"}},
+            {"$unwind": {"path": "$turmas", "preserveNullAndEmptyArrays": True}},
+            {"$project": {"nome_completo": 1, "senha_hash": 0, "turma": "$turmas.nome"}},
+            {"$sort": {"nome_normalizado": 1, "_id": -1}},
+            {"$limit": 20},
+            {"$count": "total"},
+        ],
+        "cursor": {},
+        "lsid": {"id": "sessao"},
+    }
+
+    assert formato_comando(comando, "aggregate") == {
+        "pipeline": [
+            {"$match": {"email": "?", "perfil": {"$in": "?"}, "path": "?"}},
+            {"$lookup": {"from": "turmas", "localField": "turma_id", "foreignField": "_id", "as": "turmas"}},
+            {"$unwind": {"path": "$turmas", "preserveNullAndEmptyArrays": "?"}},
+            {"$project": {"nome_completo": 1, "senha_hash": 0, "turma": "$turmas.nome"}},
+            {"$sort": {"nome_normalizado": 1, "_id": -1}},
+            {"$limit": "?"},
+            {"$count": "total"},
+        ],
+        "cursor": {},
+    }
+
+
+def test_formato_de_find_mantem_projecao_e_ordenacao():
+    comando = {"find": "aulas", "filter": {"turma_id": "x", "status": "Realizada"},
+               "projection": {"chamada": 1}, "sort": {"data": -1}, "limit": 5}
+    assert formato_comando(comando, "find") == {
+        "filter": {"turma_id": "?", "status": "?"}, "projection": {"chamada": 1}, "sort": {"data": -1}, "limit": "?",
+    }
@@ -0,0 +1,21 @@
+import pytest
+
+
+def test_metricas_exigem_admin(cliente, token):
+    assert cliente.get('/api/metrics').status_code == 401
+    assert cliente.get('/api/metrics', headers=token('aluno')).status_code == 403
+    assert cliente.get('/api/metrics', headers=token('admin')).status_code == 200
+
+
+def test_metricas_com_token_do_coletor(app, cliente):
+    app.config["METRICS_TOKEN"] = "segredo-do-coletor"
+    assert cliente.get('/api/metrics', headers={"Authorization": "Bearer segredo-do-coletor"}).status_code == 200
+    assert cliente.get('/api/metrics', headers={"Authorization": "Bearer outro"}).status_code == 422
+
+
+@pytest.mark.parametrize("valor, perfilado", [("1", True), ("true", True), ("sim", True), ("0", False), ("false", False)])
+def test_x_profile_aceita_apenas_valores_de_flag(app, cliente, token, tmp_path, valor, perfilado):
+    app.config["PROFILE_DIR"] = str(tmp_path)
+    resposta = cliente.get('/api/diagnostico/perfis', headers={**token('admin'), "X-Profile": valor})
+    assert resposta.status_code == 200
+    assert ('X-Profile-Id' in resposta.headers) is perfilado
@@ -0,0 +1,77 @@
+from datetime import datetime
+
+from bson import ObjectId
+
+from app.services import chamada_service, frequencia_service
+
+
+def _bits(db, turma_id, aluno_id):
+    doc = db.frequencia_alunos.find_one({"turma_id": turma_id, "aluno_id": aluno_id})
+    return frequencia_service._para_int(doc["presentes"]), frequencia_service._para_int(doc["faltas"])
+
+
+def test_registrar_chamada_cria_documento(db):
+    turma_id, aluno_id = ObjectId(), ObjectId()
+    data = datetime(2024, 3, 4, 12)
+
+    frequencia_service.registrar_chamada(turma_id, data, [(aluno_id, 'presente')])
+
+    assert _bits(db, turma_id, aluno_id) == (1 << frequencia_service._dia(data), 0)
+
+
+def test_criacao_concorrente_nao_perde_registro(db, monkeypatch):
+    """
+    Dois escritores leem "sem documento" para o mesmo aluno × turma. O segundo upsert
+    encontra o documento do primeiro: o seu registro deve ser reaplicado, não descartado.
+    """
+    turma_id, aluno_id = ObjectId(), ObjectId()
+    dia_a, dia_b = datetime(2024, 3, 4, 12), datetime(2024, 3, 6, 12)
+    colecao = db.frequencia_alunos
+    find_original = colecao.find
+    intercalado = []
+
+    def find_intercalado(*args, **kwargs):
+        documentos = list(find_original(*args, **kwargs))
+        if not intercalado:
+            # O escritor B grava entre a leitura e a escrita do escritor A
+            intercalado.append(True)
+            frequencia_service.registrar_chamada(turma_id, dia_b, [(aluno_id, 'ausente')])
+        return iter(documentos)
+
+    monkeypatch.setattr(colecao, 'find', find_intercalado)
+    resultado = frequencia_service.registrar_chamada(turma_id, dia_a, [(aluno_id, 'presente')])
+
+    presentes, faltas = _bits(db, turma_id, aluno_id)
+    assert presentes == 1 << frequencia_service._dia(dia_a)
+    assert faltas == 1 << frequencia_service._dia(dia_b)
+    assert resultado[aluno_id]["versao"] == 2
+
+
+def test_duas_aulas_no_mesmo_dia_falta_prevalece(db):
+    """
+    O bit é do dia: com duas aulas da turma no mesmo dia, a falta em qualquer uma conta
+    como falta no dia, e a segunda chamada não apaga a primeira.
+    """
+    turma_id, aluno_id = ObjectId(), ObjectId()
+    manha, tarde = datetime(2024, 3, 4, 12), datetime(2024, 3, 4, 20)
+    aula_manha = db.aulas.insert_one({"turma_id": turma_id, "data": manha}).inserted_id
+    aula_tarde = db.aulas.insert_one({"turma_id": turma_id, "data": tarde}).inserted_id
+    bit = 1 << frequencia_service._dia(manha)
+
+    def chamada(aula_id, data, status):
+        chamada_service.gravar_presencas(aula_id, [(aluno_id, status)], datetime.utcnow(), "realizada")
+        frequencia_service.registrar_chamada(turma_id, data, [(aluno_id, status)], aula_id)
+
+    chamada(aula_manha, manha, 'ausente')
+    chamada(aula_tarde, tarde, 'presente')
+    assert _bits(db, turma_id, aluno_id) == (0, bit)
+
+    # Corrigida a falta da manhã, o aluno esteve em todas as aulas do dia
+    chamada(aula_manha, manha, 'presente')
+    assert _bits(db, turma_id, aluno_id) == (bit, 0)
+
+    frequencia_service.reconstruir_indice()
+    assert _bits(db, turma_id, aluno_id) == (bit, 0)
+    chamada(aula_tarde, tarde, 'ausente')
+    frequencia_service.reconstruir_indice()
+    assert _bits(db, turma_id, aluno_id) == (0, bit)
@@ -0,0 +1,39 @@
+import pytest
+
+from app.services import importacao_service, usuario_service
+
+pytestmark = pytest.mark.usefixtures('score_sem_round')
+
+
+def _csv(*linhas):
+    cabecalho = "nome_completo,email,senha,perfil,data_nascimento"
+    return "\n".join([cabecalho, *linhas]).encode()
+
+
+def test_emails_repetidos_sem_diferenciar_maiusculas(db):
+    db.usuarios.insert_one({"nome_completo": "Bia", "email": "Bia@Exemplo.com", "perfil": "aluno"})
+
+    relatorio = importacao_service.importar_usuarios(_csv(
+        "Ana,Ana@Exemplo.com,s1,aluno,2015-01-01",
+        "Ana B, ana@exemplo.com ,s2,aluno,2015-01-01",
+        "Bia,bia@exemplo.com,s3,aluno,2015-01-01",
+    ), "alunos.csv")
+
+    assert relatorio["criados"] == 1
+    assert [(e["linha"], e["erros"]) for e in relatorio["erros"]] == [
+        (3, ["E-mail repetido no arquivo (linha 2)."]),
+        (4, ["O e-mail informado já está em uso."]),
+    ]
+    assert db.usuarios.count_documents({"email": "ana@exemplo.com"}) == 1
+    # O login com a grafia da planilha encontra o e-mail normalizado
+    assert usuario_service.encontrar_usuario_por_email("Ana@Exemplo.com")["nome_completo"] == "Ana"
+
+
+def test_alunos_importados_entram_na_lista_de_risco(db):
+    relatorio = importacao_service.importar_usuarios(_csv(
+        "Ana,ana@exemplo.com,s1,aluno,2015-01-01",
+        "Prof,prof@exemplo.com,s2,professor,",
+    ), "usuarios.csv")
+
+    [aluno] = [u["usuario_id"] for u in relatorio["usuarios"] if db.usuarios.find_one(u["usuario_id"])["perfil"] == "aluno"]
+    assert [(r["_id"], r["inadimplente"]) for r in db.alunos_risco.find()] == [(aluno, True)]
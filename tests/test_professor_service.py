@@ -0,0 +1,38 @@
+from datetime import date, datetime, time
+
+from bson import ObjectId
+
+from app import timezone
+from app.services import professor_service
+
+SEGUNDA = date(2025, 3, 3)
+
+
+def test_resumo_do_dia_usa_aula_sem_professor_id_em_outro_horario(db):
+    professor_id = ObjectId()
+    turma_id = db.turmas.insert_one({
+        "nome": "Sub-11", "professor_id": professor_id, "alunos_ids": [],
+        "horarios": [{"dia_semana": "segunda", "hora_inicio": "08:00", "hora_fim": "09:00"}],
+    }).inserted_id
+    # Aula criada antes de aulas.professor_id existir, quando o horário era outro
+    aula_id = db.aulas.insert_one({
+        "turma_id": turma_id, "data": timezone.localize(datetime.combine(SEGUNDA, time(18, 0))), "status": "agendada",
+    }).inserted_id
+
+    resumo = professor_service.resumo_do_dia(professor_id, SEGUNDA)
+
+    assert resumo["turmas"][0]["aula"]["_id"] == aula_id
+    assert db.aulas.count_documents({"turma_id": turma_id}) == 1
+
+
+def test_resumo_do_dia_cria_aula_que_falta(db):
+    professor_id = ObjectId()
+    turma_id = db.turmas.insert_one({
+        "nome": "Sub-11", "professor_id": professor_id, "alunos_ids": [],
+        "horarios": [{"dia_semana": "segunda", "hora_inicio": "08:00", "hora_fim": "09:00"}],
+    }).inserted_id
+
+    resumo = professor_service.resumo_do_dia(professor_id, SEGUNDA)
+
+    assert resumo["turmas"][0]["aula"] is not None
+    assert db.aulas.count_documents({"turma_id": turma_id, "professor_id": professor_id}) == 1
@@ -0,0 +1,66 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.services import frequencia_service, risco_service, turma_service, usuario_service
+
+pytestmark = pytest.mark.usefixtures('score_sem_round')
+
+
+def _aluno(nome):
+    return usuario_service.criar_usuario({
+        "nome_completo": nome, "email": f"{nome.lower()}@exemplo.com", "senha": "segredo", "perfil": "aluno",
+    })
+
+
+def _faltas(turma_id, aluno_id, dias):
+    for dia in range(1, dias + 1):
+        frequencia = frequencia_service.registrar_chamada(turma_id, datetime(2024, 3, dia, 12), [(aluno_id, 'ausente')])
+        risco_service.atualizar_frequencia(turma_id, frequencia)
+
+
+def _componentes(db):
+    return {doc['_id']: (doc.get('inadimplente'), doc.get('turmas')) for doc in db.alunos_risco.find()}
+
+
+def test_aluno_novo_entra_inadimplente_e_o_incremental_concorda_com_o_recalculo(db):
+    aluno_id = ObjectId(_aluno("Ana"))
+    turma_id = db.turmas.insert_one({"nome": "Sub-11", "alunos_ids": [aluno_id]}).inserted_id
+
+    _faltas(turma_id, aluno_id, 3)
+    incremental = _componentes(db)
+    inadimplente, turmas = incremental[aluno_id]
+    assert inadimplente is True
+    assert turmas[str(turma_id)]["faltas_consecutivas"] == 3
+
+    risco_service.recalcular_todos()
+    assert _componentes(db) == incremental
+
+
+def test_saida_da_turma_tira_as_faltas_dela_do_score(db):
+    aluno_id = ObjectId(_aluno("Bia"))
+    antiga = db.turmas.insert_one({"nome": "Antiga", "alunos_ids": [aluno_id]}).inserted_id
+    nova = db.turmas.insert_one({"nome": "Nova", "alunos_ids": []}).inserted_id
+    _faltas(antiga, aluno_id, 4)
+
+    turma_service.mover_alunos_em_lote([{"aluno_id": str(aluno_id), "turma_id": str(nova)}])
+
+    assert _componentes(db)[aluno_id] == (True, {})
+
+    risco_service.recalcular_todos()
+    assert _componentes(db)[aluno_id] == (True, {})
+
+
+def test_turma_excluida_sai_do_risco_dos_alunos(db):
+    aluno_id = ObjectId(_aluno("Caio"))
+    professor_id = db.usuarios.insert_one({"nome_completo": "Prof", "perfil": "professor"}).inserted_id
+    turma_id = db.turmas.insert_one(
+        {"nome": "Sub-13", "alunos_ids": [aluno_id], "professor_id": professor_id, "horarios": []}
+    ).inserted_id
+    _faltas(turma_id, aluno_id, 2)
+
+    turma_service.deletar_turma(str(turma_id))
+
+    assert _componentes(db)[aluno_id] == (True, {})
+
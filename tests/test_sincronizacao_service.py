@@ -0,0 +1,98 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app import timezone
+from app.services import referencia_service, sincronizacao_service, turma_service
+
+
+@pytest.fixture(autouse=True)
+def relogio_do_banco(monkeypatch):
+    # O mongomock não tem o comando `hello`
+    monkeypatch.setattr(sincronizacao_service, '_agora_no_banco', lambda: int(time.time()))
+
+
+def _turma(db, nome, alunos_ids=(), professor_id=None):
+    return db.turmas.insert_one(
+        {"nome": nome, "alunos_ids": list(alunos_ids), "professor_id": professor_id, "horarios": []}
+    ).inserted_id
+
+
+def _aluno(db, turma_id=None):
+    documento = {"nome_completo": "Aluno", "perfil": "aluno", "ativo": True}
+    if turma_id:
+        documento["turma_id"] = [turma_id]
+    return db.usuarios.insert_one(documento).inserted_id
+
+
+def test_carga_completa_recusada_com_documentos_sem_carimbo_alem_do_limite(app, db):
+    app.config["SYNC_LIMITE"] = 2
+    for numero in range(3):
+        _turma(db, f"Turma {numero}")
+    admin_id = str(ObjectId())
+
+    with pytest.raises(sincronizacao_service.MigracaoPendente):
+        sincronizacao_service.alteracoes(admin_id, 'admin')
+
+
+def test_rota_de_sync_responde_503_sem_a_migracao(app, db, cliente, token):
+    app.config["SYNC_LIMITE"] = 1
+    _turma(db, "A")
+    _turma(db, "B")
+    resposta = cliente.get('/api/sync', headers=token('admin'))
+    assert resposta.status_code == 503
+    assert "carimbar-atualizacoes" in resposta.get_json()["mensagem"]
+
+
+def test_carga_completa_com_poucos_documentos_sem_carimbo(app, db):
+    app.config["SYNC_LIMITE"] = 5
+    _turma(db, "A")
+    resposta = sincronizacao_service.alteracoes(str(ObjectId()), 'admin')
+    assert len(resposta["turmas"]) == 1
+    assert resposta["mais"] is False
+
+
+def test_aluno_movido_recebe_lapides_da_turma_antiga_e_das_aulas(db):
+    antiga, nova = _turma(db, "Antiga"), _turma(db, "Nova")
+    movido, colega = _aluno(db, antiga), _aluno(db, antiga)
+    db.turmas.update_one({"_id": antiga}, {"$set": {"alunos_ids": [movido, colega]}})
+    recente = db.aulas.insert_one({"turma_id": antiga, "data": datetime.now(timezone) - timedelta(days=1)}).inserted_id
+    db.aulas.insert_one({"turma_id": antiga, "data": datetime.now(timezone) - timedelta(days=400)})
+
+    turma_service.mover_alunos_em_lote([{"aluno_id": str(movido), "turma_id": str(nova)}])
+
+    _, filtro_movido = sincronizacao_service._escopo(movido, 'aluno')
+    lapides = {(l["colecao"], l["documento_id"]) for l in db.exclusoes.find(filtro_movido)}
+    assert lapides == {("turmas", antiga), ("aulas", recente)}
+
+    _, filtro_colega = sincronizacao_service._escopo(colega, 'aluno')
+    assert db.exclusoes.count_documents(filtro_colega) == 0
+
+
+def test_professor_e_aluno_que_saem_na_edicao_da_turma_recebem_lapide(db):
+    esporte_id = db.esportes.insert_one({"nome": "Futebol"}).inserted_id
+    categoria_id = db.categorias.insert_one({"nome": "Sub-11", "esporte_id": esporte_id}).inserted_id
+    referencia_service.invalidar()
+    professor_id = db.usuarios.insert_one({"nome_completo": "Prof", "perfil": "professor"}).inserted_id
+    turma_id = db.turmas.insert_one({
+        "nome": "Sub-11", "categoria": "Sub-11", "esporte_id": esporte_id, "professor_id": professor_id,
+        "horarios": [{"dia_semana": "segunda", "hora_inicio": "08:00", "hora_fim": "09:00"}], "alunos_ids": [],
+    }).inserted_id
+    removido, mantido = _aluno(db, turma_id), _aluno(db, turma_id)
+    db.turmas.update_one({"_id": turma_id}, {"$set": {"alunos_ids": [removido, mantido]}})
+
+    novo_professor_id = db.usuarios.insert_one({"nome_completo": "Prof 2", "perfil": "professor"}).inserted_id
+
+    turma_service.atualizar_turma(str(turma_id), {
+        "categoria": str(categoria_id), "professor_id": str(novo_professor_id), "alunos_ids": [str(mantido)],
+    })
+
+    # Uma lápide para o professor anterior e o aluno removido; quem ficou não a recebe
+    lapides = list(db.exclusoes.find({"colecao": "turmas", "documento_id": turma_id}))
+    assert len(lapides) == 1
+    assert lapides[0]["motivo"] == 'fora_do_escopo'
+    assert lapides[0]["professor_id"] == professor_id
+    assert lapides[0]["alunos_ids"] == [removido]
+    assert lapides[0]["turmas_ids"] == []
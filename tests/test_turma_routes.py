@@ -0,0 +1,20 @@
+import pytest
+
+
+@pytest.fixture
+def turma(db):
+    aluno_id = db.usuarios.insert_one({
+        "nome_completo": "Ana", "perfil": "aluno", "ativo": True,
+        "senha_hash": "hash", "nome_normalizado": "ana", "busca_chaves": ["ana"],
+    }).inserted_id
+    return db.turmas.insert_one({"nome": "Sub-11", "alunos_ids": [aluno_id], "horarios": []}).inserted_id
+
+
+@pytest.mark.parametrize("rota", ["/api/turmas/", "/api/turmas/{turma}"])
+def test_alunos_da_turma_saem_sem_senha_nem_campos_de_busca(cliente, token, turma, rota):
+    resposta = cliente.get(rota.format(turma=turma), headers=token('admin'))
+    assert resposta.status_code == 200
+    corpo = resposta.get_json()
+    [aluno] = (corpo[0] if isinstance(corpo, list) else corpo)["alunos"]
+    assert aluno["nome_completo"] == "Ana"
+    assert not {"senha_hash", "nome_normalizado", "busca_chaves"} & aluno.keys()
@@ -0,0 +1,32 @@
+import pytest
+
+
+@pytest.fixture
+def usuario(db):
+    turma_id = db.turmas.insert_one({"nome": "Sub-11"}).inserted_id
+    return db.usuarios.insert_one({
+        "nome_completo": "Ana", "email": "ana@exemplo.com", "perfil": "aluno", "ativo": True,
+        "senha_hash": "hash", "nome_normalizado": "ana", "busca_chaves": ["ana"], "turma_id": [turma_id],
+    }).inserted_id
+
+
+@pytest.mark.parametrize("consulta", ["?fields=", "?fields=%20,", "?fields=&expand=turmas", "?expand=turmas"])
+def test_fields_vazio_devolve_o_formato_padrao_sem_campos_internos(cliente, token, usuario, consulta):
+    resposta = cliente.get(f'/api/usuarios/{consulta}', headers=token('admin'))
+    assert resposta.status_code == 200
+    [documento] = resposta.get_json()
+    assert documento["email"] == "ana@exemplo.com"
+    assert not {"senha_hash", "nome_normalizado", "busca_chaves"} & documento.keys()
+
+
+def test_fields_vazio_no_detalhe(cliente, token, usuario):
+    resposta = cliente.get(f'/api/usuarios/{usuario}?fields=', headers=token('admin'))
+    assert resposta.status_code == 200
+    assert "senha_hash" not in resposta.get_json()
+
+
+def test_fields_pedidos_trazem_so_os_campos(cliente, token, usuario):
+    resposta = cliente.get('/api/usuarios/?fields=nome_completo,turmas&expand=turmas', headers=token('admin'))
+    [documento] = resposta.get_json()
+    assert set(documento) == {"_id", "nome_completo", "turmas"}
+    assert [turma["nome"] for turma in documento["turmas"]] == ["Sub-11"]
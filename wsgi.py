@@ -0,0 +1,11 @@
+"""
+Ponto de entrada WSGI de produção.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+O `run.py` continua sendo o servidor de desenvolvimento (debug, recarga automática).
+"""
+
+from app import criar_app
+
+app = criar_app()